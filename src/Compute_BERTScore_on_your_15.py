@@ -1,34 +1,63 @@
+import os
 import pandas as pd
-from evaluate import load
+import torch
+from bert_score import BERTScorer
 
-# Load the saved CSVs (created earlier)
-led = pd.read_csv("led_table_15.csv")
-peg = pd.read_csv("pegasus_table_15.csv")
-t5  = pd.read_csv("t5_table_15.csv")
+from table_io import read_table
 
-bertscore = load("bertscore")
+MODELS = {"LED": "led_table_15.csv", "PEGASUS": "pegasus_table_15.csv", "T5": "t5_table_15.csv"}
 
-def compute_bertscore(df, model_name):
-    refs = df["reference_abstract"].tolist()
-    cands = df["generated_summary"].tolist()
-    res = bertscore.compute(predictions=cands, references=refs, lang="en")
-    # Average across the 15 papers
+# Same scorer evaluate.load("bertscore") builds for lang="en" (roberta-large,
+# layer 17, no idf), loaded once. All models are scored in a single call:
+# bert_score de-duplicates the texts and embeds each unique one once, in
+# length-sorted batches, so the shared reference abstracts are not re-embedded per model.
+BATCH_SIZE = 64
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
+def make_scorer():
+    torch.set_num_threads(os.cpu_count() or 1)
+    return BERTScorer(lang="en", batch_size=BATCH_SIZE, device=DEVICE)
+
+def compute_bertscore(df, P, R, F, start):
+    """Per-paper scores for one model's slice of the joint call, plus the
+    mean over its papers (as percentages)."""
+    end = start + len(df)
+    per_paper = pd.DataFrame({
+        "arxiv_id": df["arxiv_id"].values,
+        "precision": P[start:end],
+        "recall": R[start:end],
+        "f1": F[start:end],
+    })
     out = {
-        "precision": round(sum(res["precision"]) / len(res["precision"]) * 100, 2),
-        "recall":    round(sum(res["recall"])    / len(res["recall"])    * 100, 2),
-        "f1":        round(sum(res["f1"])        / len(res["f1"])        * 100, 2),
+        "precision": round(sum(P[start:end]) / len(df) * 100, 2),
+        "recall":    round(sum(R[start:end]) / len(df) * 100, 2),
+        "f1":        round(sum(F[start:end]) / len(df) * 100, 2),
     }
-    return out
+    return out, per_paper
+
+if __name__ == "__main__":
+    # Load the saved CSVs (created earlier)
+    tables = {label: read_table(path, ["arxiv_id", "reference_abstract", "generated_summary"])
+              for label, path in MODELS.items()}
+    scorer = make_scorer()
+
+    cands, refs = [], []
+    for df in tables.values():
+        cands += df["generated_summary"].tolist()
+        refs += df["reference_abstract"].tolist()
+    P, R, F = (x.tolist() for x in scorer.score(cands, refs, batch_size=BATCH_SIZE))
 
-led_scores = compute_bertscore(led, "LED")
-peg_scores = compute_bertscore(peg, "PEGASUS")
-t5_scores  = compute_bertscore(t5,  "T5")
+    scores, start = {}, 0
+    for label, df in tables.items():
+        scores[label], per_paper = compute_bertscore(df, P, R, F, start)
+        per_paper.to_csv(f"bertscore_per_paper_{label}.csv", index=False, encoding="utf-8")
+        start += len(df)
 
-summary = pd.DataFrame([led_scores, peg_scores, t5_scores],
-                       index=["LED", "PEGASUS", "T5"])
+    summary = pd.DataFrame(list(scores.values()), index=list(scores))
 
-print("\nBERTScore (mean over 15 papers):")
-print(summary)
+    counts = ", ".join(f"{label} {len(df)}" for label, df in tables.items())
+    print(f"\nBERTScore (mean over each model's papers: {counts}):")
+    print(summary)
 
-# Save for Chapter IV, Section 4.2
-summary.to_csv("bertscore_summary.csv", encoding="utf-8")
+    # Save for Chapter IV, Section 4.2
+    summary.to_csv("bertscore_summary.csv", encoding="utf-8")
@@ -0,0 +1,68 @@
+"""
+Compare inference backends of run_summary_with_HF_model.py against the fp32 run.
+Usage:
+    python src/Compute_Backend_Comparison.py <fp32_baseline.jsonl> <other_backend.jsonl> [...]
+Every file must come from the same model and input set; rows are matched on arxiv_id.
+Reports latency, peak RSS and ROUGE-L / BERTScore F1 drift vs. the baseline.
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import evaluate
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "data_collection"))
+from record_io import read_records
+
+OUT_CSV = "backend_comparison.csv"
+
+def load_run(path):
+    df = pd.DataFrame(read_records(path))
+    if "backend" not in df.columns:
+        df["backend"] = "torch"  # runs from before --backend existed
+    return df
+
+def summarize_run(df, base_df, rouge, bertscore):
+    """Latency/memory/quality for one run, restricted to papers in the baseline."""
+    df = df[df["arxiv_id"].isin(base_df["arxiv_id"])].set_index("arxiv_id")
+    base = base_df.set_index("arxiv_id").loc[df.index]
+    refs = df["reference_abstract"].tolist()
+    cands = df["generated_summary"].tolist()
+
+    rl = rouge.compute(predictions=cands, references=refs, use_stemmer=True)["rougeL"]
+    bs = bertscore.compute(predictions=cands, references=refs, lang="en")["f1"]
+    # how far the summaries themselves moved away from the fp32 ones
+    agree = rouge.compute(predictions=cands, references=base["generated_summary"].tolist(),
+                          use_stemmer=True)["rougeL"]
+    return {
+        "Backend": df["backend"].iloc[0],
+        "Papers": len(df),
+        "Avg_Runtime_sec": round(float(df["time_sec"].mean()), 2),
+        "P95_Runtime_sec": round(float(df["time_sec"].quantile(0.95)), 2),
+        "Peak_RSS_MB": round(float(df["peak_rss_bytes"].max()) / (1024**2), 1) if "peak_rss_bytes" in df else None,
+        "ROUGE_L": round(rl * 100, 2),
+        "BERTScore_F1": round(sum(bs) / len(bs) * 100, 2),
+        "ROUGE_L_vs_fp32_output": round(agree * 100, 2),
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python src/Compute_Backend_Comparison.py <fp32_baseline.jsonl> <other_backend.jsonl> [...]")
+        sys.exit(1)
+
+    base_df = load_run(sys.argv[1])
+    rouge = evaluate.load("rouge")
+    bertscore = evaluate.load("bertscore")
+
+    rows = [summarize_run(load_run(p), base_df, rouge, bertscore) for p in sys.argv[1:]]
+    report = pd.DataFrame(rows).set_index("Backend")
+
+    # speed-up and quality drift relative to the fp32 baseline (first row)
+    base = report.iloc[0]
+    report["Speedup_x"] = (base["Avg_Runtime_sec"] / report["Avg_Runtime_sec"]).round(2)
+    report["ROUGE_L_drift"] = (report["ROUGE_L"] - base["ROUGE_L"]).round(2)
+    report["BERTScore_F1_drift"] = (report["BERTScore_F1"] - base["BERTScore_F1"]).round(2)
+
+    print(f"\nBackend comparison ({base_df['model_name'].iloc[0]}):")
+    print(report)
+    report.to_csv(OUT_CSV, encoding="utf-8")
@@ -1,45 +1,81 @@
 import pandas as pd
 
+from table_io import read_table
+
 # Inputs: the 15-paper tables you already saved
 LED_CSV = "led_table_15.csv"
 PEG_CSV = "pegasus_table_15.csv"
 T5_CSV  = "t5_table_15.csv"
 
+# Per-record CPU instrumentation written by run_summary_with_HF_model.py
+# (older tables only have the first four columns)
+NUMERIC_COLS = ["time_sec", "gpu_mem_bytes", "input_tokens", "output_tokens",
+                "peak_rss_bytes", "encoder_time_sec", "decoder_time_sec", "ttft_sec",
+                "chunks", "map_time_sec", "reduce_time_sec",  # --chunked runs only
+                "acceptance_rate", "baseline_time_sec"]       # --assistant_model runs only
+
 def load(name):
-    df = pd.read_csv(name)
+    df = read_table(name, NUMERIC_COLS)  # the summary never touches the text columns
     # Defensive cast in case any field came in as string
-    for col in ["time_sec", "gpu_mem_bytes", "input_tokens", "output_tokens"]:
+    for col in NUMERIC_COLS:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce")
     return df
 
+def mean_or_none(df, col, ndigits=3):
+    if col not in df.columns or df[col].isna().all():
+        return None
+    return round(float(df[col].mean()), ndigits)
+
 def summarize(df):
-    """Return averages in the shape your report expects."""
+    """Return averages in the shape your report expects, plus latency
+    percentiles, throughput and CPU memory."""
     avg_time = df["time_sec"].mean()
     avg_mem_mb = (df["gpu_mem_bytes"].max() / (1024**2)) if "gpu_mem_bytes" in df else None
     # ^ peak memory across 15 runs is more informative than mean for GPU footprint
     avg_in_tok = df["input_tokens"].mean()
     avg_out_tok = df["output_tokens"].mean()
+    # time_sec is each record's share of its batch, so the sum is wall time
+    total_time = df["time_sec"].sum()
+    has_rss = "peak_rss_bytes" in df.columns and not df["peak_rss_bytes"].isna().all()
+    has_baseline = "baseline_time_sec" in df.columns and df["baseline_time_sec"].notna().all()
     return {
         "Avg_Runtime_sec": round(float(avg_time), 2),
         "Peak_GPU_Memory_MB": round(float(avg_mem_mb), 1) if avg_mem_mb is not None else None,
         "Avg_Input_Tokens": round(float(avg_in_tok), 1),
         "Avg_Output_Tokens": round(float(avg_out_tok), 1),
+        "P50_Runtime_sec": round(float(df["time_sec"].quantile(0.50)), 2),
+        "P90_Runtime_sec": round(float(df["time_sec"].quantile(0.90)), 2),
+        "P99_Runtime_sec": round(float(df["time_sec"].quantile(0.99)), 2),
+        "Papers_per_min": round(60 * len(df) / float(total_time), 2),
+        "Output_Tokens_per_sec": round(float(df["output_tokens"].sum() / total_time), 1),
+        "Peak_RSS_MB": round(float(df["peak_rss_bytes"].max()) / (1024**2), 1) if has_rss else None,
+        "Avg_Encoder_sec": mean_or_none(df, "encoder_time_sec"),
+        "Avg_Decoder_sec": mean_or_none(df, "decoder_time_sec"),
+        "Avg_TTFT_sec": mean_or_none(df, "ttft_sec"),
+        "Avg_Chunks": mean_or_none(df, "chunks", 2),
+        "Avg_Map_sec": mean_or_none(df, "map_time_sec"),
+        "Avg_Reduce_sec": mean_or_none(df, "reduce_time_sec"),
+        "Avg_Acceptance_Rate": mean_or_none(df, "acceptance_rate"),
+        # wall time of the plain greedy runs over the assisted ones, for the whole table
+        "Assisted_Speedup_x": (round(float(df["baseline_time_sec"].sum() / total_time), 2)
+                               if has_baseline else None),
     }
 
-# Load
-led = load(LED_CSV)
-peg = load(PEG_CSV)
-t5  = load(T5_CSV)
+if __name__ == "__main__":
+    # Load
+    led = load(LED_CSV)
+    peg = load(PEG_CSV)
+    t5  = load(T5_CSV)
 
-# Summaries
-led_sum = summarize(led)
-peg_sum = summarize(peg)
-t5_sum  = summarize(t5)
+    # Summaries
+    led_sum = summarize(led)
+    peg_sum = summarize(peg)
+    t5_sum  = summarize(t5)
 
-# Combine + save
-eff_summary = pd.DataFrame([led_sum, peg_sum, t5_sum], index=["LED", "PEGASUS", "T5"])
-print("\nEfficiency Summary (15 papers):")
-print(eff_summary)
+    # Combine + save
+    eff_summary = pd.DataFrame([led_sum, peg_sum, t5_sum], index=["LED", "PEGASUS", "T5"])
+    print("\nEfficiency Summary (15 papers):")
+    print(eff_summary)
 
-eff_summary.to_csv("efficiency_summary.csv", encoding="utf-8")
+    eff_summary.to_csv("efficiency_summary.csv", encoding="utf-8")
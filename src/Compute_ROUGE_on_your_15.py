@@ -1,35 +1,42 @@
 import pandas as pd
-import evaluate
-
-# Load CSVs created earlier
-led_table_full = pd.read_csv("led_table_15.csv")
-pegasus_table_full = pd.read_csv("pegasus_table_15.csv")
-t5_table_full = pd.read_csv("t5_table_15.csv")
-
-# Load ROUGE
-rouge = evaluate.load("rouge")
-
-def compute_rouge(df, model_name):
-    refs = df["reference_abstract"].tolist()
-    cands = df["generated_summary"].tolist()
-    results = rouge.compute(predictions=cands, references=refs, use_stemmer=True)
-    scores = {k: round(v * 100, 2) for k, v in results.items()}  # percentages
-    return scores
-
-# Run for each model
-led_scores = compute_rouge(led_table_full, "LED")
-pegasus_scores = compute_rouge(pegasus_table_full, "PEGASUS")
-t5_scores = compute_rouge(t5_table_full, "T5")
-
-# Build summary DataFrame
-rouge_summary = pd.DataFrame(
-    [led_scores, pegasus_scores, t5_scores],
-    index=["LED", "PEGASUS", "T5"]
-)
-
-print("\nSummary ROUGE Table:")
-print(rouge_summary)
-
-# ---- Save results as CSV ----
-rouge_summary.to_csv("rouge_summary.csv", index=True, encoding="utf-8")
 
+from rouge_engine import score_models, aggregate
+from table_io import read_table
+
+MODELS = {"LED": "led_table_15.csv", "PEGASUS": "pegasus_table_15.csv", "T5": "t5_table_15.csv"}
+
+# Local engine (rouge_engine.py): same numbers as evaluate's rouge with
+# use_stemmer=True, each reference tokenized once, papers scored in parallel
+def rouge_per_paper(tables: dict, workers=None) -> dict:
+    """{model: table} -> {model: per-paper scores with arxiv_id}, over the papers
+    every table has (in the first table's order); they share the references."""
+    common = set.intersection(*(set(df["arxiv_id"]) for df in tables.values()))
+    ref_df = next(iter(tables.values()))
+    ref_df = ref_df[ref_df["arxiv_id"].isin(common)].drop_duplicates("arxiv_id")
+    cands = {label: df.drop_duplicates("arxiv_id").set_index("arxiv_id")
+                      .loc[ref_df["arxiv_id"], "generated_summary"].tolist()
+             for label, df in tables.items()}
+    per_paper = score_models(ref_df["reference_abstract"].tolist(), cands, workers)
+    for df in per_paper.values():
+        df.insert(0, "arxiv_id", ref_df["arxiv_id"].values)
+    return per_paper
+
+if __name__ == "__main__":
+    # Load CSVs created earlier
+    tables = {label: read_table(path, ["arxiv_id", "reference_abstract", "generated_summary"])
+              for label, path in MODELS.items()}
+    per_paper = rouge_per_paper(tables)
+
+    scores = {}
+    for label, df in per_paper.items():
+        df.to_csv(f"rouge_per_paper_{label}.csv", index=False, encoding="utf-8")
+        scores[label] = {k: round(v * 100, 2) for k, v in aggregate(df).items()}  # percentages
+
+    # Build summary DataFrame
+    rouge_summary = pd.DataFrame(list(scores.values()), index=list(scores))
+
+    print("\nSummary ROUGE Table:")
+    print(rouge_summary)
+
+    # ---- Save results as CSV ----
+    rouge_summary.to_csv("rouge_summary.csv", index=True, encoding="utf-8")
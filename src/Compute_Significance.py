@@ -0,0 +1,117 @@
+"""
+Confidence intervals and paired significance tests for every metric table.
+Usage (after the Compute_* scripts, from the same folder):
+    python src/Compute_Significance.py
+Reads the per-paper CSVs (rouge_per_paper_<MODEL>.csv, bertscore_per_paper_<MODEL>.csv,
+topk_per_paper_<MODEL>.csv), builds a papers x models matrix per metric, and runs
+- a paired bootstrap: N_BOOT resamples of the papers, drawn once as a
+  (N_BOOT x papers) count matrix and applied to every metric with one matmul
+- approximate randomization: N_PERM random sign flips of the per-paper
+  differences, again one (N_PERM x papers) matrix for all model pairs
+Writes <table>_summary_ci.csv next to each summary table (point estimate as in
+the summary, plus the CI) and significance_pairwise.csv (difference, its CI,
+bootstrap and randomization p-values for every metric and model pair).
+"""
+import itertools
+import os
+import numpy as np
+import pandas as pd
+
+# --------- Config ---------
+MODELS = ["LED", "PEGASUS", "T5"]
+N_BOOT = 10000
+N_PERM = 10000
+CONFIDENCE = 0.95
+SEED = 12345
+# table -> (per-paper file pattern, {summary column: per-paper column}, scale, statistic)
+# the statistic matches how the summary table aggregates papers
+TABLES = {
+    "rouge": ("rouge_per_paper_{}.csv",
+              {t: f"{t}_fmeasure" for t in ("rouge1", "rouge2", "rougeL", "rougeLsum")}, 100, "mean"),
+    "bertscore": ("bertscore_per_paper_{}.csv",
+                  {"precision": "precision", "recall": "recall", "f1": "f1"}, 100, "mean"),
+    "topk": ("topk_per_paper_{}.csv", {"TopK_cumulative_sum": "paper_score_topk_mean"}, 1, "sum"),
+}
+
+def load_matrices(pattern, columns):
+    """{summary column: (papers x models) array}, rows aligned on arxiv_id; None if a file is missing."""
+    paths = [pattern.format(m) for m in MODELS]
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing:
+        print(f"[skip] missing {', '.join(missing)}")
+        return None
+    frames = [pd.read_csv(p).set_index("arxiv_id") for p in paths]
+    ids = frames[0].index
+    for f in frames[1:]:
+        ids = ids.intersection(f.index)
+    return {col: np.column_stack([f.loc[ids, src].to_numpy(dtype=float) for f in frames])
+            for col, src in columns.items()}
+
+def resample_weights(n, rng):
+    """(N_BOOT x n) bootstrap counts; row b times a per-paper column = that column's sum in resample b."""
+    return rng.multinomial(n, np.full(n, 1.0 / n), size=N_BOOT).astype(float)
+
+def sign_flips(n, rng):
+    return rng.choice([-1.0, 1.0], size=(N_PERM, n))
+
+def percentile_ci(samples):
+    lo = (1 - CONFIDENCE) / 2 * 100
+    return np.percentile(samples, [lo, 100 - lo], axis=0)
+
+# --------- Main ---------
+if __name__ == "__main__":
+    rng = np.random.default_rng(SEED)
+    pairs = list(itertools.combinations(range(len(MODELS)), 2))
+    pairwise = []
+
+    for table, (pattern, columns, scale, stat) in TABLES.items():
+        mats = load_matrices(pattern, columns)
+        if mats is None:
+            continue
+        n = next(iter(mats.values())).shape[0]
+        factor = scale / n if stat == "mean" else scale
+
+        # every metric and every model pair as one column block: (n x metrics*models), (n x metrics*pairs)
+        X = np.column_stack(list(mats.values())) * factor
+        D = np.column_stack([X[:, k * len(MODELS) + a] - X[:, k * len(MODELS) + b]
+                             for k in range(len(mats)) for a, b in pairs])
+
+        point = X.sum(axis=0)
+        boot = resample_weights(n, rng) @ X            # (N_BOOT x metrics*models)
+        lo, hi = percentile_ci(boot)
+
+        d_obs = D.sum(axis=0)
+        d_boot = resample_weights(n, rng) @ D          # paired: both models share the resample
+        d_lo, d_hi = percentile_ci(d_boot)
+        # bootstrap p: how often the resampled difference, re-centred on H0, is as extreme as observed
+        p_boot = (1 + (np.abs(d_boot - d_obs) >= np.abs(d_obs)).sum(axis=0)) / (N_BOOT + 1)
+        # approximate randomization: randomly swap the two models' scores per paper
+        p_perm = (1 + (np.abs(sign_flips(n, rng) @ D) >= np.abs(d_obs) - 1e-12).sum(axis=0)) / (N_PERM + 1)
+
+        digits = 4 if stat == "sum" else 2
+        ci = pd.DataFrame(index=MODELS)
+        for k, col in enumerate(mats):
+            sl = slice(k * len(MODELS), (k + 1) * len(MODELS))
+            ci[col] = point[sl].round(digits)
+            ci[f"{col}_ci_low"] = lo[sl].round(digits)
+            ci[f"{col}_ci_high"] = hi[sl].round(digits)
+            for j, (a, b) in enumerate(pairs):
+                c = k * len(pairs) + j
+                pairwise.append({
+                    "table": table, "metric": col,
+                    "model_a": MODELS[a], "model_b": MODELS[b],
+                    "diff": round(d_obs[c], digits),
+                    "diff_ci_low": round(d_lo[c], digits),
+                    "diff_ci_high": round(d_hi[c], digits),
+                    "p_bootstrap": round(p_boot[c], 4),
+                    "p_randomization": round(p_perm[c], 4),
+                })
+
+        print(f"\n{table}: {stat} over {n} papers with {int(CONFIDENCE * 100)}% bootstrap CIs")
+        print(ci)
+        ci.to_csv(f"{table}_summary_ci.csv", encoding="utf-8")
+
+    pairwise = pd.DataFrame(pairwise)
+    print(f"\nPaired tests ({N_BOOT} bootstrap resamples, {N_PERM} randomization rounds):")
+    print(pairwise.to_string(index=False))
+    pairwise.to_csv("significance_pairwise.csv", index=False, encoding="utf-8")
@@ -3,12 +3,20 @@ import numpy as np
 import pandas as pd
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+from embedding_store import EmbeddingStore
+from table_io import read_table
 
 # --------- Config ---------
 CSV_LED = "led_table_15.csv"
 CSV_PEG = "pegasus_table_15.csv"
 CSV_T5  = "t5_table_15.csv"
+MODELS = {"LED": CSV_LED, "PEGASUS": CSV_PEG, "T5": CSV_T5}  # add a summarizer here
 EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"  # small, stable
+# sentence embeddings are cached on disk (see embedding_store.py), so
+# reference sentences shared by all models and earlier runs are never re-encoded
+TOPK_CHUNK = 4096  # max papers per batched similarity block in topk_means
 
 # --------- Helpers ---------
 def split_sentences(text: str):
@@ -18,9 +26,9 @@ def split_sentences(text: str):
     parts = re.split(r'(?<=[.!?])\s+', text.strip())
     return [p.strip() for p in parts if p.strip()]
 
-def paper_topk_mean(ref_text: str, gen_text: str, embedder: SentenceTransformer):
+def paper_topk_mean(ref_text: str, gen_text: str, embedder: EmbeddingStore):
     """
-    For a single paper:
+    Reference definition for a single paper (topk_means computes the same in bulk):
       - build S (m x n) cosine matrix
       - k = min(m, n)
       - paper_score = mean of top-k similarities
@@ -32,8 +40,8 @@ def paper_topk_mean(ref_text: str, gen_text: str, embedder: SentenceTransformer)
     if m == 0 or n == 0:
         return 0.0, m, n, 0
 
-    ref_emb = embedder.encode(ref_sents, convert_to_numpy=True, normalize_embeddings=True)
-    gen_emb = embedder.encode(gen_sents, convert_to_numpy=True, normalize_embeddings=True)
+    ref_emb = embedder.encode(ref_sents)
+    gen_emb = embedder.encode(gen_sents)
 
     S = cosine_similarity(ref_emb, gen_emb)  # shape (m, n)
     k = min(m, n)
@@ -43,53 +51,96 @@ def paper_topk_mean(ref_text: str, gen_text: str, embedder: SentenceTransformer)
     paper_score = float(np.mean(topk_vals))  # <-- mean over k top similarities
     return paper_score, m, n, k
 
-def evaluate_model(df: pd.DataFrame, model_label: str, embedder: SentenceTransformer) -> pd.DataFrame:
+def topk_means(ref_texts, gen_texts, embedder: EmbeddingStore):
+    """
+    paper_topk_mean for many papers at once, without a Python loop per paper:
+      - one embedder call over every unique sentence
+      - papers with the same (m, n) form one group; each group gathers its
+        sentences by segment offsets into (C, m, d) / (C, n, d) arrays and
+        takes one batched matmul for all its S matrices. Stacking only
+        same-shaped matrices keeps BLAS on the kernel the per-paper call
+        uses, so the similarities (and scores) match bit for bit
+      - each flattened S is sorted; k = min(m, n) is the same for the whole
+        group, so the top k of every row form one contiguous block whose
+        row-wise mean is the same reduction np.mean runs on one paper
+    Returns (scores, m, n, k) as arrays, in input order.
     """
-    Compute paper_score (TopK mean) for each of the 15 rows in df.
+    ref_sents = [split_sentences(t) for t in ref_texts]
+    gen_sents = [split_sentences(t) for t in gen_texts]
+    m = np.array([len(x) for x in ref_sents], dtype=np.int64)
+    n = np.array([len(x) for x in gen_sents], dtype=np.int64)
+    k = np.minimum(m, n)
+    scores = np.zeros(len(m), dtype=np.float32)
+
+    # every sentence as a row id into one embedding matrix
+    vocab = {}
+    rows = np.array([vocab.setdefault(x, len(vocab)) for sents in ref_sents + gen_sents for x in sents],
+                    dtype=np.int64)
+    if not len(rows):
+        return scores, m, n, k
+    # same re-normalization cosine_similarity applies to its inputs
+    E = normalize(embedder.encode(list(vocab)))
+    ref_off = np.concatenate([[0], np.cumsum(m)[:-1]])
+    gen_off = m.sum() + np.concatenate([[0], np.cumsum(n)[:-1]])
+
+    papers = np.flatnonzero(k > 0)
+    shapes, group = np.unique(np.stack([m[papers], n[papers]], axis=1), axis=0, return_inverse=True)
+    for g, (mm, nn) in enumerate(shapes):
+        members = papers[group.ravel() == g]
+        for start in range(0, len(members), TOPK_CHUNK):
+            idx = members[start:start + TOPK_CHUNK]
+            R = E[rows[ref_off[idx, None] + np.arange(mm)]]           # (C, m, d)
+            G = E[rows[gen_off[idx, None] + np.arange(nn)]]           # (C, n, d)
+            S = np.sort(np.matmul(R, G.transpose(0, 2, 1)).reshape(len(idx), -1), axis=1)
+            kk = min(mm, nn)
+            scores[idx] = np.ascontiguousarray(S[:, -kk:]).mean(axis=1)
+    return scores, m, n, k
+
+def evaluate_model(df: pd.DataFrame, model_label: str, embedder: EmbeddingStore) -> pd.DataFrame:
+    """
+    Compute paper_score (TopK mean) for each row in df (batched, see topk_means).
     Returns a dataframe with columns: arxiv_id, title, paper_score, m, n, k, model
     """
-    rows = []
-    for arxiv_id, title, ref, gen in zip(df["arxiv_id"], df["title"], df["reference_abstract"], df["generated_summary"]):
-        score, m, n, k = paper_topk_mean(ref, gen, embedder)
-        rows.append({
-            "arxiv_id": arxiv_id,
-            "title": title,
-            "paper_score_topk_mean": score,
-            "ref_sent_count_m": m,
-            "gen_sent_count_n": n,
-            "k_min_mn": k,
-            "model": model_label
-        })
-    return pd.DataFrame(rows)
+    scores, m, n, k = topk_means(df["reference_abstract"].tolist(), df["generated_summary"].tolist(), embedder)
+    return pd.DataFrame({
+        "arxiv_id": df["arxiv_id"].values,
+        "title": df["title"].values,
+        "paper_score_topk_mean": [float(x) for x in scores],
+        "ref_sent_count_m": m,
+        "gen_sent_count_n": n,
+        "k_min_mn": k,
+        "model": model_label
+    })
 
 # --------- Main ---------
 if __name__ == "__main__":
     # Load your fixed 15-paper tables
-    led_df = pd.read_csv(CSV_LED)
-    peg_df = pd.read_csv(CSV_PEG)
-    t5_df  = pd.read_csv(CSV_T5)
+    tables = {label: read_table(path, ["arxiv_id", "title", "reference_abstract", "generated_summary"])
+              for label, path in MODELS.items()}
+
+    # Embedding store; the embedder itself is only loaded if a sentence is missing
+    embedder = EmbeddingStore(EMBED_MODEL, lambda: SentenceTransformer(EMBED_MODEL))
+    cached = len(embedder)
 
-    # Load embedder once
-    embedder = SentenceTransformer(EMBED_MODEL)
+    # Embed every unseen sentence of every model in one batch up front
+    all_sents = [s for df in tables.values()
+                 for col in ("reference_abstract", "generated_summary")
+                 for text in df[col] for s in split_sentences(text)]
+    embedder.encode(all_sents)
+    print(f"[embed] {len(all_sents)} sentences | {embedder.encoded} newly encoded | "
+          f"{cached} already in {embedder.dir}")
 
     # Per-paper evaluations
-    led_eval = evaluate_model(led_df, "LED", embedder)
-    peg_eval = evaluate_model(peg_df, "PEGASUS", embedder)
-    t5_eval  = evaluate_model(t5_df,  "T5", embedder)
+    evals = {label: evaluate_model(df, label, embedder) for label, df in tables.items()}
 
     # Save per-paper (useful for appendix/audit)
-    led_eval.to_csv("topk_per_paper_LED.csv", index=False, encoding="utf-8")
-    peg_eval.to_csv("topk_per_paper_PEGASUS.csv", index=False, encoding="utf-8")
-    t5_eval.to_csv("topk_per_paper_T5.csv", index=False, encoding="utf-8")
+    for label, ev in evals.items():
+        ev.to_csv(f"topk_per_paper_{label}.csv", index=False, encoding="utf-8")
 
     # ---- Model-level cumulative sums (YOUR FINAL VALUES) ----
     summary = pd.DataFrame({
-        "TopK_cumulative_sum": [
-            float(led_eval["paper_score_topk_mean"].sum()),
-            float(peg_eval["paper_score_topk_mean"].sum()),
-            float(t5_eval["paper_score_topk_mean"].sum())
-        ]
-    }, index=["LED", "PEGASUS", "T5"])
+        "TopK_cumulative_sum": [float(ev["paper_score_topk_mean"].sum()) for ev in evals.values()]
+    }, index=list(evals))
 
     print("\nCumulative Top-K (sum of 15 per-paper means) per model:")
     print(summary.round(4))
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+bench_record_io.py
+Microbenchmark for record_io.py against the stdlib json loops it replaced.
+Usage:
+  python src/data_collection/bench_record_io.py
+  python src/data_collection/bench_record_io.py led_cpu_25.jsonl data/processed/arxiv_csAI_csLG.jsonl --min_mb 256
+- Each input is repeated into a scratch file of at least --min_mb, so small
+  output files give stable timings
+- parse: old loop (text lines + json.loads into a list) vs iter_records
+  with the stdlib and the orjson backend
+- serialize: json.dumps + write per line vs RecordWriter
+- gz / zst: write and read throughput through record_io, with the file size
+  (flattering for the repeated small files; use a real corpus for ratios)
+- peak Python heap (tracemalloc) of a full load vs a lazy scan
+Prints one table per input and writes it to --out (CSV).
+"""
+
+import argparse, json, shutil, tempfile, time, tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+import record_io
+
+DEFAULT_INPUTS = ["led_cpu_25.jsonl", "pegasus_cpu_25.jsonl", "t5_large_cpu_test.jsonl",
+                  "data/processed/fixed25.jsonl", "data/processed/arxiv_csAI_csLG.jsonl"]
+
+
+def old_load(path):
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rows.append(json.loads(line))
+    return rows
+
+
+def old_write(path, rows):
+    with open(path, "w", encoding="utf-8") as w:
+        for r in rows:
+            w.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+
+def use_backend(name):
+    """Point record_io's loads/dumps at one backend for a measurement."""
+    if name == "orjson":
+        record_io.loads, record_io.dumps = record_io.orjson.loads, record_io.orjson.dumps
+    else:
+        record_io.loads, record_io.dumps = record_io.json_loads, record_io.json_dumps
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def peak_heap(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def scan(path):
+    n = 0
+    for rec in record_io.iter_records(path):
+        n += len(rec)
+    return n
+
+
+def make_scratch(src: Path, dst: Path, min_bytes: int):
+    with open(src, "rb") as f:
+        data = f.read()
+    if not data.endswith(b"\n"):
+        data += b"\n"
+    copies = max(1, -(-min_bytes // max(len(data), 1)))
+    with open(dst, "wb") as w:
+        for _ in range(copies):
+            w.write(data)
+    return copies
+
+
+def bench_file(src: Path, work: Path, args):
+    plain = work / "plain.jsonl"
+    copies = make_scratch(src, plain, int(args.min_mb * 2**20))
+    mb = plain.stat().st_size / 2**20
+    rows = old_load(plain)
+    n = len(rows)
+    out = []
+
+    def add(op, variant, sec, path=None):
+        out.append({"file": src.name, "op": op, "variant": variant, "records": n, "MB": round(mb, 1),
+                    "sec": round(sec, 4), "MB_per_s": round(mb / sec, 1), "records_per_s": round(n / sec),
+                    "file_MB": round(Path(path).stat().st_size / 2**20, 2) if path else None})
+
+    add("parse", "json list (old)", timed(lambda: old_load(plain), args.repeat))
+    add("serialize", "json.dumps per line (old)", timed(lambda: old_write(work / "old.jsonl", rows), args.repeat),
+        work / "old.jsonl")
+    backends = ["json"] + (["orjson"] if record_io.orjson else [])
+    for b in backends:
+        use_backend(b)
+        add("parse", f"iter_records [{b}]", timed(lambda: scan(plain), args.repeat))
+        add("serialize", f"RecordWriter [{b}]",
+            timed(lambda: record_io.write_records(work / "new.jsonl", rows), args.repeat), work / "new.jsonl")
+
+    use_backend(backends[-1])
+    for suffix in (".gz", ".zst"):
+        path = work / f"new.jsonl{suffix}"
+        try:
+            add("serialize", f"RecordWriter {suffix}", timed(lambda: record_io.write_records(path, rows), args.repeat), path)
+            add("parse", f"iter_records {suffix}", timed(lambda: scan(path), args.repeat))
+        except ImportError as e:
+            print(f"[skip] {suffix}: {e}")
+
+    rows.clear()  # drop the parsed copy before measuring load memory
+    full = peak_heap(lambda: old_load(plain))
+    lazy = peak_heap(lambda: scan(plain))
+    print(f"[memory] {src.name}: full load peak {full / 2**20:.1f} MiB vs lazy scan {lazy / 2**20:.2f} MiB "
+          f"({n} records, {copies} copies of the input)")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("inputs", nargs="*", default=None, help="JSONL files (default: the repo's run and corpus files)")
+    ap.add_argument("--min_mb", type=float, default=64, help="scratch file size per input")
+    ap.add_argument("--repeat", type=int, default=3, help="timings are the best of this many runs")
+    ap.add_argument("--out", default="record_io_bench.csv")
+    args = ap.parse_args()
+
+    inputs = [Path(p) for p in (args.inputs or DEFAULT_INPUTS) if Path(p).exists()]
+    if not inputs:
+        raise SystemExit("[error] none of the input files exist")
+    print(f"[info] record_io backend={record_io.BACKEND} | inputs: {', '.join(map(str, inputs))}")
+
+    work = Path(tempfile.mkdtemp(prefix="record_io_bench_"))
+    rows = []
+    try:
+        for src in inputs:
+            rows += bench_file(src, work, args)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    df = pd.DataFrame(rows)
+    for name, g in df.groupby("file", sort=False):
+        base = {op: g[(g["op"] == op) & g["variant"].str.endswith("(old)")]["sec"].iloc[0] for op in ("parse", "serialize")}
+        g = g.assign(speedup=[round(base[op] / s, 2) for op, s in zip(g["op"], g["sec"])])
+        print(f"\n== {name} ({g['records'].iloc[0]} records, {g['MB'].iloc[0]} MB)")
+        print(g.drop(columns=["file", "records", "MB"]).to_string(index=False))
+    df.to_csv(args.out, index=False, encoding="utf-8")
+    print(f"\n[done] -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
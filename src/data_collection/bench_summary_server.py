@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+bench_summary_server.py
+Load generator for summary_server.py: throughput and latency percentiles at
+several client concurrency levels.
+Usage:
+  python src/data_collection/bench_summary_server.py --url http://127.0.0.1:8080 \
+    --input data/processed/fixed25.jsonl --concurrency 1 2 4 8 --requests 32
+  python src/data_collection/bench_summary_server.py --stream --model t5-large
+- Closed loop: --concurrency c keeps c requests in flight, each client sending
+  the next introduction of --input as soon as its reply is complete
+- Per level: requests/s and output tokens/s over the level's wall time,
+  p50/p90/p99 client-side latency, time to first streamed line (--stream),
+  and the mean micro-batch size the server formed (from /metrics deltas)
+Prints the table and writes it to --out (CSV).
+"""
+
+import argparse, itertools, json, threading, time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from record_io import iter_records
+
+
+def get_json(url: str):
+    with urllib.request.urlopen(url, timeout=30) as resp:
+        return json.loads(resp.read())
+
+
+def one_request(url: str, text: str, model, stream: bool, timeout: float):
+    """(latency sec, seconds to the first streamed line or None, reply dict or None on error)."""
+    body = json.dumps({"text": text, "model": model, "stream": stream}).encode("utf-8")
+    req = urllib.request.Request(f"{url}/summarize", data=body, headers={"Content-Type": "application/json"})
+    t0 = time.perf_counter()
+    first, reply = None, None
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            if stream:
+                for line in resp:  # NDJSON, one event per line as it is produced
+                    if first is None:
+                        first = time.perf_counter() - t0
+                    event = json.loads(line)
+                    if event.get("done"):
+                        reply = event
+            else:
+                reply = json.loads(resp.read())
+    except (urllib.error.URLError, OSError, ValueError):
+        reply = None
+    return time.perf_counter() - t0, first, reply
+
+
+def lane_counts(url: str, model, lane: str):
+    """(requests, batches) the server has served so far on one lane."""
+    stats = get_json(f"{url}/metrics")["models"]
+    lane_stats = stats[model or next(iter(stats))][lane]
+    return lane_stats["requests"], lane_stats["batches"]
+
+
+def run_level(args, texts, concurrency: int):
+    lane = "stream" if args.stream else "beam"
+    req0, batch0 = lane_counts(args.url, args.model, lane)
+    feed = itertools.cycle(texts)
+    lock = threading.Lock()
+    results = []
+
+    def client(n: int):
+        for _ in range(n):
+            with lock:
+                text = next(feed)
+            results.append(one_request(args.url, text, args.model, args.stream, args.timeout))
+
+    per_client = [args.requests // concurrency + (k < args.requests % concurrency) for k in range(concurrency)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, per_client))
+    wall = time.perf_counter() - t0
+    req1, batch1 = lane_counts(args.url, args.model, lane)
+
+    ok = [(lat, first, r) for lat, first, r in results if r is not None]
+    lat = np.array([x[0] for x in ok]) if ok else np.array([np.nan])
+    firsts = [x[1] for x in ok if x[1] is not None]
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "wall_sec": round(wall, 2),
+        "requests_per_sec": round(len(ok) / wall, 3),
+        "output_tokens_per_sec": round(sum(r["output_tokens"] for _, _, r in ok) / wall, 1),
+        "p50_latency_sec": round(float(np.percentile(lat, 50)), 3),
+        "p90_latency_sec": round(float(np.percentile(lat, 90)), 3),
+        "p99_latency_sec": round(float(np.percentile(lat, 99)), 3),
+        "mean_first_line_sec": round(float(np.mean(firsts)), 3) if firsts else None,
+        "mean_server_batch": round((req1 - req0) / (batch1 - batch0), 2) if batch1 > batch0 else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://127.0.0.1:8080")
+    ap.add_argument("--input", default="data/processed/fixed25.jsonl", help="JSONL whose introductions are sent")
+    ap.add_argument("--model", default=None, help="default: the server's first model")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--requests", type=int, default=32, help="requests per concurrency level")
+    ap.add_argument("--stream", action="store_true", help="streaming (greedy) requests")
+    ap.add_argument("--warmup", type=int, default=2, help="requests sent before measuring")
+    ap.add_argument("--timeout", type=float, default=600)
+    ap.add_argument("--out", default="server_load.csv")
+    args = ap.parse_args()
+
+    texts = [r["introduction"] for r in iter_records(args.input) if r.get("introduction")]
+    if not texts:
+        raise SystemExit(f"[error] no introductions in {args.input}")
+    print(f"[info] {get_json(f'{args.url}/health')} | {len(texts)} texts from {args.input}")
+    for text in texts[:args.warmup]:
+        one_request(args.url, text, args.model, args.stream, args.timeout)
+
+    rows = []
+    for c in args.concurrency:
+        rows.append(run_level(args, texts, c))
+        r = rows[-1]
+        print(f"[level] concurrency={c}: {r['requests_per_sec']} req/s, p99 {r['p99_latency_sec']}s, "
+              f"server batch {r['mean_server_batch']}, errors {r['errors']}")
+
+    df = pd.DataFrame(rows)
+    print("\n" + df.to_string(index=False))
+    df.to_csv(args.out, index=False, encoding="utf-8")
+    print(f"\n[done] -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,36 @@
 """
 collect_arxiv_simple.py
 - Simple arXiv (cs.AI, cs.LG) collector for arxiv v2.x
-- Writes JSONL to ./data/processed/ and caches PDFs in ./data/raw/pdfs/
+- Appends JSONL to one corpus, ./data/processed/arxiv_csAI_csLG.jsonl, and
+  caches PDFs in ./data/raw/pdfs/
+- Incremental: a persistent cursor (arxiv_cursor.json) holds the submitted-date
+  range already covered and arxiv_seen_ids.txt every arxiv_id already handled.
+  Each run first pages forward through papers newer than the range, then back
+  through older ones, until NUM_RECORDS new records are written; every result
+  is fetched once per run, so API calls grow linearly with the corpus
 - Each record: arxiv_id, title, abstract, introduction, pdf_path, published, categories
+- PDFs download on a bounded thread pool (PDF_WORKERS) behind one shared rate
+  limiter and a pooled requests.Session, while metadata paging continues;
+  failed attempts are retried on a timer with exponential backoff; papers
+  that still fail go to arxiv_retry.jsonl and are queued again (first, under
+  the same in-flight limit) by the next RETRY_MAX_RUNS runs, then move to
+  arxiv_retry_dead.jsonl
+- Introductions are extracted lazily, page by page, stopping at the next
+  section heading; extraction runs on a process pool (EXTRACT_WORKERS) and
+  the introduction and the text of the pages read are cached in
+  ./data/raw/extracted/ keyed by the PDF's sha256 and EXTRACTOR_VERSION, so
+  re-runs skip PyMuPDF entirely
+- The corpus is read and appended through record_io.py; give OUT_PATH a .gz
+  or .zst suffix to keep it compressed
+- Set ARXIV_PDF_BASE_URL (e.g. http://127.0.0.1:8765) to fetch PDFs from a
+  local stand-in server such as fixture_pdf_server.py instead of arxiv.org
 """
 
 from __future__ import annotations
-import json, re, time, os, contextlib
-from datetime import datetime
+import json, re, time, os, contextlib, gzip, hashlib, queue, random, threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from collections import deque
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
@@ -16,60 +39,142 @@ import requests          # pip install requests
 import arxiv             # pip install arxiv
 import fitz as pymupdf   # pip install pymupdf
 
+from record_io import RecordWriter, iter_records, write_records
+
 # -----------------------
 # Config (edit if needed)
 # -----------------------
-NUM_RECORDS      = 1000
+NUM_RECORDS      = 1000   # new records per run
 QUERY            = "cat:cs.AI OR cat:cs.LG"
 PDF_TIMEOUT_S    = 60
 PDF_RETRIES      = 3
-PDF_RETRY_SLEEP  = 5
-PAGE_SIZE_START  = 25
+PDF_RETRY_SLEEP  = 5      # first backoff; doubles per attempt (with jitter)
+PDF_BACKOFF_MAX  = 60
+PDF_WORKERS      = 8
+PDF_RATE_PER_S   = 4.0    # download starts per second, shared by all workers
 PAGE_SIZE_MIN    = 5
-PAGE_SIZE_MAX    = 100
+PAGE_SIZE_MAX    = 100    # results per API call; halved on an empty page
 INTRO_SCAN_CAP   = 1200
+INTRO_MAX_PAGES  = 10     # pages searched lazily for the Introduction heading
 API_DELAY_S      = 5
+EMPTY_RETRIES    = 3      # empty result sets tolerated before the backlog counts as exhausted
+EXTRACT_WORKERS  = os.cpu_count() or 1
+RETRY_MAX_RUNS   = 3      # runs a paper's download may fail before it is given up
+EXTRACTOR_VERSION = "3"   # bump when pdf_to_text_quiet / extract_introduction change
+DATE_MIN         = "000001010000"   # open ends of a submittedDate range
+DATE_MAX         = "999912312359"
 
 # -----------------------
 # Paths (ALWAYS relative to current working directory)
 # -----------------------
 ROOT      = Path.cwd().resolve()                 # wherever you run the script
 PDF_DIR   = ROOT / "data" / "raw" / "pdfs"
+EXTRACT_DIR = ROOT / "data" / "raw" / "extracted"
 PROC_DIR  = ROOT / "data" / "processed"
 PDF_DIR.mkdir(parents=True, exist_ok=True)
 PROC_DIR.mkdir(parents=True, exist_ok=True)
-OUT_PATH  = PROC_DIR / f"arxiv_csAI_csLG_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+OUT_PATH  = PROC_DIR / "arxiv_csAI_csLG.jsonl"    # or .jsonl.gz / .jsonl.zst
+CURSOR_PATH = PROC_DIR / "arxiv_cursor.json"
+SEEN_PATH = PROC_DIR / "arxiv_seen_ids.txt"
+RETRY_PATH = PROC_DIR / "arxiv_retry.jsonl"        # papers whose PDF download failed
+RETRY_DEAD_PATH = PROC_DIR / "arxiv_retry_dead.jsonl"   # ... in RETRY_MAX_RUNS runs
+PDF_BASE_URL = os.environ.get("ARXIV_PDF_BASE_URL")   # local stand-in server, if set
 
 
 # -----------------------
 # Helpers
 # -----------------------
+PAT_INTRO = re.compile(r"^\s*(\d+(\.\d+)*)?\s*introduction\s*$", re.I)
+PAT_NEXT  = re.compile(
+    r"^\s*(\d+(\.\d+)*)?\s*(related work|background|method|methods|approach|model|"
+    r"experiments|results|discussion|conclusion|conclusions)\s*$",
+    re.I,
+)
+
+
+class IntroScanner:
+    """Incremental 'Introduction' finder: feed() lines one at a time until
+    .done, then result(). The section ends at the next known heading or after
+    INTRO_SCAN_CAP lines, whichever comes first."""
+
+    def __init__(self):
+        self.started = False
+        self.done = False
+        self.lines = []
+
+    def feed(self, line: str):
+        ln = line.strip()
+        if not self.started:
+            if len(ln) <= 50 and PAT_INTRO.match(ln):
+                self.started = True
+            return
+        if len(self.lines) >= INTRO_SCAN_CAP or (len(ln) <= 70 and PAT_NEXT.match(ln)):
+            self.done = True
+            return
+        self.lines.append(ln)
+
+    def result(self) -> Optional[str]:
+        snippet = "\n".join(self.lines).strip()
+        return snippet or None
+
+
 def extract_introduction(full_text: str) -> Optional[str]:
     """Find 'Introduction' section heuristically and return its text."""
-    lines = [ln.strip() for ln in full_text.splitlines()]
-    pat_intro = re.compile(r"^\s*(\d+(\.\d+)*)?\s*introduction\s*$", re.I)
-    pat_next  = re.compile(
-        r"^\s*(\d+(\.\d+)*)?\s*(related work|background|method|methods|approach|model|"
-        r"experiments|results|discussion|conclusion|conclusions)\s*$",
-        re.I,
-    )
-
-    start = None
-    for i, ln in enumerate(lines):
-        if len(ln) <= 50 and pat_intro.match(ln):
-            start = i + 1
+    scanner = IntroScanner()
+    for ln in full_text.splitlines():
+        scanner.feed(ln)
+        if scanner.done:
             break
-    if start is None:
-        return None
+    return scanner.result()
 
-    stop = len(lines)
-    for j in range(start, min(start + INTRO_SCAN_CAP, len(lines))):
-        if len(lines[j]) <= 70 and pat_next.match(lines[j]):
-            stop = j
-            break
 
-    snippet = "\n".join(lines[start:stop]).strip()
-    return snippet or None
+def iter_pdf_lines(doc):
+    """Yield (page_no, line) pulling one page at a time from PyMuPDF. A line
+    cut by a page break is joined with the next page, as "".join(pages) would."""
+    carry = ""
+    for i in range(doc.page_count):
+        parts = (carry + doc.load_page(i).get_text()).splitlines(keepends=True)
+        carry = ""
+        if parts and parts[-1].splitlines()[0] == parts[-1]:
+            carry = parts.pop()  # no line break yet
+        for part in parts:
+            yield i + 1, part
+    if carry:
+        yield doc.page_count, carry
+
+
+def extract_introduction_lazy(pdf_path: Path):
+    """Stream pages until the introduction ends, the heading has not shown up
+    within INTRO_MAX_PAGES pages, or the document ends.
+    Returns (introduction, text, pages_read, page_count), text being what was
+    read of the document; falls back to a full-text scan only when the lazy
+    pass found no introduction."""
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stderr(devnull):
+            doc = pymupdf.open(pdf_path.as_posix())
+            page_count = doc.page_count
+            scanner = IntroScanner()
+            pages_read = 0
+            lines = []
+            for page_no, line in iter_pdf_lines(doc):
+                pages_read = page_no
+                if not scanner.started and page_no > INTRO_MAX_PAGES:
+                    break
+                lines.append(line)
+                scanner.feed(line)
+                if scanner.done:
+                    break
+            doc.close()
+    except Exception as e:
+        print(f"[PDF read] {pdf_path.name}: {e}")
+        return None, None, 0, 0
+
+    intro, text = scanner.result(), "".join(lines)
+    if intro is None:
+        full_text = pdf_to_text_quiet(pdf_path)
+        intro = extract_introduction(full_text) if full_text else None
+        text, pages_read = full_text or text, page_count
+    return intro, text, pages_read, page_count
 
 
 def pdf_to_text_quiet(pdf_path: Path) -> Optional[str]:
@@ -85,104 +190,412 @@ def pdf_to_text_quiet(pdf_path: Path) -> Optional[str]:
         return None
 
 
-def download_pdf(url: str, dest: Path) -> bool:
-    """Download PDF with retries. Returns True on success, False if skipped."""
+class RateLimiter:
+    """At most `rate` request starts per second, shared across threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_t = time.monotonic()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            t = max(now, self.next_t)
+            self.next_t = t + self.interval
+        if t > now:
+            time.sleep(t - now)
+
+
+def make_session(pool_size: int) -> requests.Session:
+    """One keep-alive connection pool for all download threads."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def extract_pdf(pdf_path: str) -> dict:
+    """Introduction of one PDF (runs in the extraction pool), with page stats.
+    Results are cached by content hash + EXTRACTOR_VERSION, together with the
+    text of the pages read (the whole document when the lazy pass fell back
+    to a full scan); failures are not. The text stays in the cache file."""
+    data = Path(pdf_path).read_bytes()
+    key = f"{hashlib.sha256(data).hexdigest()}.v{EXTRACTOR_VERSION}"
+    cache_file = EXTRACT_DIR / key[:2] / f"{key}.json.gz"
+    if cache_file.exists():
+        with gzip.open(cache_file, "rt", encoding="utf-8") as f:
+            cached = json.load(f)
+        return {"introduction": cached["introduction"], "pages_read": cached["pages_read"],
+                "page_count": cached["page_count"], "cached": True}
+
+    intro, text, pages_read, page_count = extract_introduction_lazy(Path(pdf_path))
+    res = {"introduction": intro, "pages_read": pages_read, "page_count": page_count}
+    if not page_count:
+        return {**res, "cached": False}
+
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_file.with_name(cache_file.name + f".{os.getpid()}.tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump({"pdf": Path(pdf_path).name, "text": text, **res}, f, ensure_ascii=False)
+    os.replace(tmp, cache_file)
+    return {**res, "cached": False}
+
+
+def download_pdf(url: str, dest: Path, session: requests.Session, limiter: RateLimiter) -> Optional[str]:
+    """One download attempt. Returns None on success, else an error message.
+    Writes through a temp file so a half-written PDF never looks cached."""
     if dest.exists():
-        return True
-    for attempt in range(1, PDF_RETRIES + 1):
+        return None
+    limiter.wait()
+    r = session.get(url, timeout=PDF_TIMEOUT_S)
+    if r.status_code != 200:
+        return f"HTTP {r.status_code}"
+    tmp = dest.with_name(dest.name + f".part{threading.get_ident()}")
+    tmp.write_bytes(r.content)
+    os.replace(tmp, dest)
+    return None
+
+
+class PdfDownloader:
+    """Bounded pool of concurrent PDF downloads.
+    submit() never blocks; finished items are collected with completed().
+    A failed attempt is re-queued by a timer after an exponential backoff, so
+    it holds neither the caller nor a worker slot while it waits."""
+
+    def __init__(self, workers: int = PDF_WORKERS, rate: float = PDF_RATE_PER_S):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf")
+        self.session = make_session(workers)
+        self.limiter = RateLimiter(rate)
+        self.done = queue.Queue()
+        self.pending = 0
+
+    def submit(self, item, url: str, dest: Path):
+        self.pending += 1
+        self.pool.submit(self._attempt, item, url, dest, 1)
+
+    def _attempt(self, item, url: str, dest: Path, attempt: int):
+        existed = dest.exists()
         try:
-            r = requests.get(url, timeout=PDF_TIMEOUT_S)
-            if r.status_code == 200:
-                dest.write_bytes(r.content)
-                return True
-            print(f"[PDF {dest.stem}] attempt {attempt}/{PDF_RETRIES} HTTP {r.status_code}")
+            err = download_pdf(url, dest, self.session, self.limiter)
         except Exception as e:
-            print(f"[PDF {dest.stem}] attempt {attempt}/{PDF_RETRIES} error: {e}")
-        time.sleep(PDF_RETRY_SLEEP)
-    print(f"[PDF {dest.stem}] skipping after {PDF_RETRIES} failed attempts")
-    return False
+            err = f"error: {e}"
+        if err is None:
+            self.done.put((item, True, not existed))
+            return
+        print(f"[PDF {dest.stem}] attempt {attempt}/{PDF_RETRIES} {err}")
+        if attempt >= PDF_RETRIES:
+            print(f"[PDF {dest.stem}] skipping after {PDF_RETRIES} failed attempts")
+            self.done.put((item, False, False))
+            return
+        delay = min(PDF_BACKOFF_MAX, PDF_RETRY_SLEEP * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+        timer = threading.Timer(delay, self.pool.submit, args=(self._attempt, item, url, dest, attempt + 1))
+        timer.daemon = True
+        timer.start()
+
+    def completed(self, block: bool = False, timeout: Optional[float] = None):
+        """Yield (item, ok, newly_downloaded) for every finished download;
+        with block=True waits (up to timeout) for one if any are pending."""
+        while self.pending:
+            try:
+                res = self.done.get(block=block, timeout=timeout)
+            except queue.Empty:
+                return
+            self.pending -= 1
+            block = False
+            yield res
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.session.close()
+
+
+def pdf_url_for(pdf_url: str, arxiv_id: str) -> str:
+    """arXiv's PDF url, or the stand-in server's when PDF_BASE_URL is set."""
+    if PDF_BASE_URL:
+        return f"{PDF_BASE_URL.rstrip('/')}/pdf/{arxiv_id}.pdf"
+    return pdf_url
+
+
+def arxiv_date(published: str) -> str:
+    """str(paper.published) -> the YYYYMMDDHHMM form of submittedDate queries (UTC)."""
+    dt = datetime.fromisoformat(published)
+    if dt.tzinfo:
+        dt = dt.astimezone(timezone.utc)
+    return dt.strftime("%Y%m%d%H%M")
+
+
+def load_cursor() -> dict:
+    """Submitted-date range already harvested for QUERY: {"newest", "oldest"}."""
+    if CURSOR_PATH.exists():
+        cur = json.loads(CURSOR_PATH.read_text(encoding="utf-8")).get(QUERY)
+        if cur:
+            return cur
+    return {"newest": None, "oldest": None}
+
+
+def save_cursor(cursor: dict):
+    allq = json.loads(CURSOR_PATH.read_text(encoding="utf-8")) if CURSOR_PATH.exists() else {}
+    allq[QUERY] = cursor
+    tmp = CURSOR_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(allq, indent=2), encoding="utf-8")
+    os.replace(tmp, CURSOR_PATH)
+
+
+def load_seen() -> set:
+    """arxiv_ids already handled (written, rejected for lacking an introduction,
+    or given up on after RETRY_MAX_RUNS failed downloads).
+    Seeded from the corpus the first time."""
+    if SEEN_PATH.exists():
+        return set(SEEN_PATH.read_text(encoding="utf-8").split())
+    seen = set()
+    if OUT_PATH.exists():
+        # skip_bad: torn last line of an interrupted run
+        seen.update(rec["arxiv_id"] for rec in iter_records(OUT_PATH, skip_bad=True) if "arxiv_id" in rec)
+    SEEN_PATH.write_text("".join(f"{i}\n" for i in sorted(seen)), encoding="utf-8")
+    return seen
+
+
+def load_retry() -> dict:
+    """arxiv_id -> {"url", "record", "attempts"} of papers whose download failed
+    on earlier runs (attempts = runs that failed)."""
+    if not RETRY_PATH.exists():
+        return {}
+    return {e["record"]["arxiv_id"]: e for e in iter_records(RETRY_PATH, skip_bad=True)}
+
+
+def save_retry(retry: dict, dead: list):
+    """Rewrite the retry list; entries given up on are appended to the dead-letter file."""
+    if dead:
+        with RecordWriter(RETRY_DEAD_PATH, append=True) as w:
+            w.write_many(dead)
+        dead.clear()
+    write_records(RETRY_PATH, list(retry.values()))
+
+
+def harvest_phases(cursor: dict):
+    """(name, sort order, submittedDate bounds) for this run: newer than the
+    covered range first (ascending, so the range grows contiguously), then
+    older than it (descending). On a first run: everything, newest first."""
+    if cursor["newest"] is None:
+        return [("older", arxiv.SortOrder.Descending, None, None)]
+    return [
+        ("newer", arxiv.SortOrder.Ascending, cursor["newest"], DATE_MAX),
+        ("older", arxiv.SortOrder.Descending, DATE_MIN, cursor["oldest"]),
+    ]
+
+
+def range_query(lo: Optional[str], hi: Optional[str]) -> str:
+    """QUERY restricted to submittedDate lo..hi; an open end (None) gets the
+    widest bound, e.g. a first run restarting after an empty page."""
+    if lo is None and hi is None:
+        return QUERY
+    return f"({QUERY}) AND submittedDate:[{lo or DATE_MIN} TO {hi or DATE_MAX}]"
 
 
 # -----------------------
 # Main
 # -----------------------
 def main():
-    page_size = PAGE_SIZE_START
+    page_size = PAGE_SIZE_MAX
     collected = 0
     new_pdfs  = 0
+    api_results = 0
+    downloader = PdfDownloader()
+    extract_pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+    extracting = {}   # future -> record waiting for its introduction
+    page_stats = {"papers": 0, "pages_read": 0, "page_count": 0, "cached": 0}
+    max_in_flight = PDF_WORKERS * 4 + EXTRACT_WORKERS * 2
+
+    cursor = load_cursor()
+    seen = load_seen()
+    retry = {aid: e for aid, e in load_retry().items() if aid not in seen}
+    dead = []         # retry entries out of attempts, written at the next checkpoint
+    urls = {}         # arxiv_id -> arXiv's PDF url, kept for the retry list
+    queued = set()    # ids handed out this run (a restarted query re-yields its boundary)
+    # papers in API order; the cursor only moves past a paper once it and
+    # every paper before it are finished, so an interrupted run leaves no gap
+    frontier = deque()
+    finished = set()
 
     print(f"[start] root={ROOT}")
     print(f"[start] pdf_dir={PDF_DIR}")
-    print(f"[start] out_file={OUT_PATH}")
-
-    with OUT_PATH.open("w", encoding="utf-8") as w:
-        while collected < NUM_RECORDS:
-            # Build page-limited search; Client handles paging internally
-            search = arxiv.Search(
-                query=QUERY,
-                sort_by=arxiv.SortCriterion.SubmittedDate,
-                sort_order=arxiv.SortOrder.Descending,
-                max_results=page_size,
-            )
-            client = arxiv.Client(page_size=page_size, delay_seconds=API_DELAY_S, num_retries=5)
+    print(f"[start] out_file={OUT_PATH} (seen={len(seen)} ids, "
+          f"covered={cursor['oldest']}..{cursor['newest']})")
+    print(f"[start] pdf_workers={PDF_WORKERS} rate={PDF_RATE_PER_S}/s source={PDF_BASE_URL or 'arxiv.org'}")
+    print(f"[start] extract_workers={EXTRACT_WORKERS} cache={EXTRACT_DIR}")
+    if retry:
+        print(f"[start] retrying {len(retry)} failed downloads from {RETRY_PATH.name}")
 
-            try:
-                yielded = False
-                for paper in client.results(search):
-                    yielded = True
+    def in_flight():
+        return downloader.pending + len(extracting)
+
+    with RecordWriter(OUT_PATH, append=True) as w, SEEN_PATH.open("a", encoding="utf-8") as seen_f:
 
-                    arxiv_id = paper.entry_id.split("/")[-1]
-                    pdf_path = PDF_DIR / f"{arxiv_id}.pdf"
+        def checkpoint():
+            """Flush corpus and seen ids, then advance the cursor (never ahead of the data)."""
+            while frontier and frontier[0][0] in finished:
+                _, date = frontier.popleft()
+                cursor["newest"] = max(cursor["newest"] or date, date)
+                cursor["oldest"] = min(cursor["oldest"] or date, date)
+            w.sync()
+            seen_f.flush()
+            os.fsync(seen_f.fileno())
+            save_retry(retry, dead)  # before the cursor moves past a failed paper
+            save_cursor(cursor)
 
-                    if download_pdf(paper.pdf_url, pdf_path):
-                        if not pdf_path.exists():
-                            new_pdfs += 1
+        def pump(block=False):
+            """Hand finished downloads to the extraction pool and write finished
+            extractions; with block=True waits for some progress first."""
+            nonlocal collected, new_pdfs
+            for rec, ok, is_new in downloader.completed(block=block, timeout=0.05 if extracting else None):
+                if not ok:
+                    # not marked seen; the cursor may pass it, the retry list brings it back
+                    aid = rec["arxiv_id"]
+                    entry = {"url": urls[aid], "record": rec,
+                             "attempts": retry.get(aid, {}).get("attempts", 0) + 1}
+                    if entry["attempts"] >= RETRY_MAX_RUNS:
+                        print(f"[PDF {aid}] giving up after {entry['attempts']} runs -> {RETRY_DEAD_PATH.name}")
+                        retry.pop(aid, None)
+                        dead.append(entry)
+                        seen.add(aid)  # handled: a boundary query must not offer it again
+                        seen_f.write(aid + "\n")
                     else:
-                        continue  # skip this paper
-
-                    full_text = pdf_to_text_quiet(pdf_path)
-                    if not full_text:
-                        continue
-
-                    intro = extract_introduction(full_text)
-                    rec = {
-                        "arxiv_id": arxiv_id,
-                        "title": paper.title,
-                        "abstract": paper.summary,
-                        "introduction": intro,
-                        "pdf_path": pdf_path.as_posix(),
-                        "published": str(paper.published),
-                        "categories": paper.categories,
-                    }
-
-                    if rec["abstract"] and rec["introduction"]:
-                        w.write(json.dumps(rec, ensure_ascii=False) + "\n")
-                        collected += 1
-                        if collected % 50 == 0:
-                            print(f"[progress] {collected}/{NUM_RECORDS} -> {OUT_PATH}")
-                            # flush to disk
-                            w.flush()
-                            os.fsync(w.fileno())
+                        retry[aid] = entry
+                    finished.add(aid)
+                    continue  # skip this paper
+                new_pdfs += is_new
+                extracting[extract_pool.submit(extract_pdf, rec["pdf_path"])] = rec
+
+            if block and extracting:
+                wait(list(extracting), timeout=0.05, return_when=FIRST_COMPLETED)
+            for fut in [f for f in extracting if f.done()]:
+                rec = extracting.pop(fut)
+                if collected >= NUM_RECORDS:
+                    continue  # surplus paper; its PDF and text stay cached
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    print(f"[extract] {Path(rec['pdf_path']).name}: {e}")
+                    finished.add(rec["arxiv_id"])
+                    continue
+                rec["introduction"] = res["introduction"]
+                if res["cached"]:
+                    page_stats["cached"] += 1
+                else:
+                    page_stats["papers"] += 1
+                    page_stats["pages_read"] += res["pages_read"]
+                    page_stats["page_count"] += res["page_count"]
+
+                seen.add(rec["arxiv_id"])
+                seen_f.write(rec["arxiv_id"] + "\n")
+                retry.pop(rec["arxiv_id"], None)
+                finished.add(rec["arxiv_id"])
+                if rec["abstract"] and rec["introduction"]:
+                    w.write(rec)
+                    collected += 1
+                    if collected % 50 == 0:
+                        print(f"[progress] {collected}/{NUM_RECORDS} -> {OUT_PATH}")
+                        checkpoint()
+
+        def submit(rec, url):
+            urls[rec["arxiv_id"]] = url
+            downloader.submit(rec, pdf_url_for(url, rec["arxiv_id"]), Path(rec["pdf_path"]))
+            pump()
+            # backpressure: a bounded number of papers in flight,
+            # and never more than could still be needed
+            while in_flight() and (
+                in_flight() >= max_in_flight
+                or collected + in_flight() >= NUM_RECORDS
+            ):
+                pump(block=True)
+
+        for arxiv_id, e in list(retry.items()):
+            if collected >= NUM_RECORDS:
+                break  # the rest keep their attempt count for the next run
+            queued.add(arxiv_id)
+            submit(e["record"], e["url"])
+
+        for phase, order, lo, hi in harvest_phases(cursor):
+            empty_tries = 0
+            while collected < NUM_RECORDS:
+                # one pass over the date range; the Client pages through it
+                search = arxiv.Search(
+                    query=range_query(lo, hi),
+                    sort_by=arxiv.SortCriterion.SubmittedDate,
+                    sort_order=order,
+                    max_results=None,
+                )
+                client = arxiv.Client(page_size=page_size, delay_seconds=API_DELAY_S, num_retries=5)
+                print(f"[{phase}] {search.query}")
+
+                yielded = 0
+                try:
+                    for paper in client.results(search):
+                        yielded += 1
+                        api_results += 1
+                        arxiv_id = paper.entry_id.split("/")[-1]
+                        date = arxiv_date(str(paper.published))
+                        # a restart resumes from the last paper seen, boundary included
+                        lo, hi = (date, hi) if phase == "newer" else (lo, date)
+                        if arxiv_id in seen or arxiv_id in queued:
+                            if arxiv_id not in queued:
+                                frontier.append((arxiv_id, date))
+                                finished.add(arxiv_id)
+                            continue
+                        queued.add(arxiv_id)
+                        frontier.append((arxiv_id, date))
+
+                        pdf_path = PDF_DIR / f"{arxiv_id}.pdf"
+                        rec = {
+                            "arxiv_id": arxiv_id,
+                            "title": paper.title,
+                            "abstract": paper.summary,
+                            "introduction": None,
+                            "pdf_path": pdf_path.as_posix(),
+                            "published": str(paper.published),
+                            "categories": paper.categories,
+                        }
+                        submit(rec, paper.pdf_url)
                         if collected >= NUM_RECORDS:
                             break
-
-                # Adaptive paging: back off on empty page, grow on success
-                if not yielded:
+                except arxiv.UnexpectedEmptyPageError as e:
                     new_size = max(PAGE_SIZE_MIN, page_size // 2)
-                    print(f"[backoff] empty page -> page_size {page_size} -> {new_size}")
+                    print(f"[empty-feed] {e}; page_size {page_size} -> {new_size}, resuming from {lo}..{hi}")
                     page_size = new_size
                     time.sleep(API_DELAY_S)
-                else:
-                    page_size = min(PAGE_SIZE_MAX, page_size * 2)
+                    continue
 
-            except arxiv.UnexpectedEmptyPageError as e:
-                new_size = max(PAGE_SIZE_MIN, page_size // 2)
-                print(f"[empty-feed] {e}; page_size {page_size} -> {new_size}")
-                page_size = new_size
+                if yielded or phase == "newer":
+                    break  # range exhausted (or target reached)
+                # an empty result set can be transient; retry before giving up
+                empty_tries += 1
+                if empty_tries >= EMPTY_RETRIES:
+                    print(f"[{phase}] no more results")
+                    break
+                print(f"[backoff] empty result set ({empty_tries}/{EMPTY_RETRIES})")
                 time.sleep(API_DELAY_S)
-                continue
 
-    print(f"[done] saved={collected} records | file={OUT_PATH}")
+            while in_flight():
+                pump(block=True)
+            checkpoint()
+            if collected >= NUM_RECORDS:
+                break
+
+        while in_flight():
+            pump(block=True)
+        checkpoint()
+    downloader.close()
+    extract_pool.shutdown()
+
+    print(f"[done] saved={collected} new records | api_results={api_results} | new_pdfs={new_pdfs} | file={OUT_PATH}")
+    print(f"[done] covered {cursor['oldest']}..{cursor['newest']} | seen={len(seen)} ids")
+    if page_stats["page_count"]:
+        print(f"[extract] {page_stats['papers']} PDFs extracted: read {page_stats['pages_read']}"
+              f"/{page_stats['page_count']} pages "
+              f"({100 * page_stats['pages_read'] / page_stats['page_count']:.1f}%), "
+              f"{page_stats['cached']} from cache")
     print(f"[note] PDFs cached in {PDF_DIR}")
 
 
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+cpu_backends.py
+Model loaders for run_summary_with_HF_model.py --backend:
+  torch       fp32 eager PyTorch (the original setup)
+  torch-int8  dynamic INT8 quantization of every nn.Linear (CPU only)
+  onnx        encoder + decoder-with-past exported to ONNX and run with
+              ONNX Runtime (pip install optimum[onnxruntime]); the exported
+              graphs are cached under --onnx_dir and reused between runs
+All three return an object with the usual .generate() interface.
+"""
+
+import re
+from pathlib import Path
+
+import torch
+from transformers import AutoModelForSeq2SeqLM
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+
+
+def load_backend_model(model_name: str, backend: str, device: str, revision=None, onnx_dir="data/cache/onnx"):
+    if backend == "torch":
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name, revision=revision)
+        model.to(device)
+        model.eval()
+        return model
+
+    if backend == "torch-int8":
+        if device != "cpu":
+            raise SystemExit("[error] --backend torch-int8 is CPU only")
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name, revision=revision)
+        model.eval()
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    if backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError:
+            raise SystemExit("[error] --backend onnx needs: pip install optimum[onnxruntime]")
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "_", f"{model_name.strip('/')}@{revision or 'main'}")
+        export_dir = Path(onnx_dir) / slug
+        if (export_dir / "config.json").exists():
+            print(f"[info] onnx: reusing exported graphs in {export_dir}")
+            return ORTModelForSeq2SeqLM.from_pretrained(export_dir, use_cache=True)
+        print(f"[info] onnx: exporting {model_name} (encoder + decoder with past) -> {export_dir}")
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_name, revision=revision, export=True, use_cache=True)
+        model.save_pretrained(export_dir)
+        return model
+
+    raise ValueError(f"unknown backend: {backend}")
+
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+cpu_metrics.py
+CPU-side measurements for run_summary_with_HF_model.py:
+- current / peak resident memory of this process
+- RssSampler: background thread tracking the RSS peak while a batch runs
+- StepTimer: no-op logits processor that timestamps every decoding step,
+  which gives time-to-first-token even under beam search
+- AssistCounter: draft tokens proposed / accepted in assisted generation
+"""
+
+import os, sys, threading, time
+
+from transformers import LogitsProcessor
+
+
+def peak_rss_bytes() -> int:
+    """High-water mark of this process's resident memory (0 where unavailable)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return int(peak) if sys.platform == "darwin" else int(peak) * 1024
+
+
+def current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return int(psutil.Process().memory_info().rss)
+    except ImportError:
+        return peak_rss_bytes()
+
+
+class RssSampler:
+    """Context manager; .peak is the largest RSS seen while the block ran."""
+
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self.peak = 0
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.peak = max(self.peak, current_rss_bytes())
+
+    def __enter__(self):
+        self.peak = current_rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+        return False
+
+
+class StepTimer(LogitsProcessor):
+    """Records when each decoding step's logits are ready; scores pass through unchanged."""
+
+    def __init__(self):
+        self.steps = []
+
+    def __call__(self, input_ids, scores):
+        self.steps.append(time.perf_counter())
+        return scores
+
+
+class AssistCounter:
+    """Context manager around an assisted generate() (assistant_model=...).
+    Every forward of the main model verifies the draft's candidate tokens:
+    .steps counts those forwards, .proposed the draft tokens they checked
+    (all but the first decoder input token), .first is when the first one
+    returned (time to first token; StepTimer also fires on draft steps there)."""
+
+    def __init__(self, model):
+        self.model = model
+        self.steps = self.proposed = 0
+        self.first = None
+
+    def _pre(self, module, args, kwargs):
+        ids = kwargs.get("decoder_input_ids")
+        if ids is None:  # decoder-only model
+            ids = kwargs.get("input_ids")
+        if ids is not None:
+            self.proposed += int(ids.shape[-1]) - 1
+
+    def _post(self, module, args, kwargs, output):
+        self.steps += 1
+        if self.first is None:
+            self.first = time.perf_counter()
+
+    def accepted(self, new_tokens: int) -> int:
+        """Draft tokens kept, as a lower bound: every verification adds its
+        accepted run plus one token of its own, but the final one can be cut
+        at EOS or max_new_tokens after accepting draft tokens, and those are
+        not in new_tokens. Only that final step can be undercounted, so
+        accepted(...) / proposed is a lower bound on the acceptance rate."""
+        return min(max(new_tokens - self.steps, 0), self.proposed)
+
+    def __enter__(self):
+        self._hooks = [self.model.register_forward_pre_hook(self._pre, with_kwargs=True),
+                       self.model.register_forward_hook(self._post, with_kwargs=True)]
+        return self
+
+    def __exit__(self, *exc):
+        for h in self._hooks:
+            h.remove()
+        return False
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+dedup_corpus.py
+Remove duplicate and near-duplicate papers from a harvested corpus.
+Usage:
+  python src/data_collection/dedup_corpus.py data/processed/arxiv_csAI_csLG.jsonl
+  python src/data_collection/dedup_corpus.py corpus.jsonl.zst --output clean.jsonl.zst --threshold 0.85
+- Same paper: records whose arxiv_id differs only by version (v1/v2) or is
+  repeated (re-paged or cross-listed rows) keep one record, the highest
+  version and, among equals, the last one harvested
+- Near-duplicates: MinHash signature of abstract + introduction per record
+  (near_dup.py; cached in data/cache/minhash, so a grown corpus only hashes
+  its new records), LSH band buckets for candidates, Jaccard estimate >=
+  --threshold to confirm; each connected group keeps its first record
+- Two streaming passes: the first indexes ids and signatures, the second
+  writes the kept records in corpus order
+Writes the cleaned corpus (default <input>_dedup.jsonl, same compression) and
+a CSV of every dropped record with the record it duplicates.
+"""
+
+import argparse, os, re, time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from near_dup import SignatureStore, UnionFind, lsh_pairs, jaccard_estimate
+from record_io import RecordWriter, iter_records
+
+VERSION_RE = re.compile(r"^(.*?)(?:v(\d+))?$")
+SIG_BATCH = 4096   # records per signature batch (texts held in memory)
+
+
+def split_version(arxiv_id: str):
+    base, version = VERSION_RE.match(arxiv_id).groups()
+    return base, int(version or 0)
+
+
+def doc_text(rec) -> str:
+    return f"{rec.get('abstract') or ''}\n{rec.get('introduction') or ''}".strip()
+
+
+def index_corpus(path: Path, store: SignatureStore, pool):
+    """Pass 1: arxiv_id and signature of every line (by line number)."""
+    ids, blocks, texts, empty = [], [], [], []
+    for rec in iter_records(path):
+        ids.append(rec["arxiv_id"])
+        text = doc_text(rec)
+        empty.append(not text)
+        texts.append(text)
+        if len(texts) >= SIG_BATCH:
+            blocks.append(store.signatures(texts, pool))
+            texts = []
+    if texts:
+        blocks.append(store.signatures(texts, pool))
+    sigs = np.concatenate(blocks) if blocks else np.zeros((0, 0), dtype=np.uint32)
+    return ids, sigs, np.array(empty, dtype=bool)
+
+
+def same_paper(ids):
+    """{line: (kept line, reason)} for lines superseded by another version or copy."""
+    best = {}
+    for line, aid in enumerate(ids):
+        base, version = split_version(aid)
+        if base not in best or version >= best[base][0]:
+            best[base] = (version, line)
+    dropped = {}
+    for line, aid in enumerate(ids):
+        base, version = split_version(aid)
+        keep = best[base][1]
+        if line != keep:
+            dropped[line] = (keep, "version" if version != best[base][0] else "repeat")
+    return dropped
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("input")
+    ap.add_argument("--output", default=None, help="default: <input>_dedup.jsonl (same compression)")
+    ap.add_argument("--report", default="dedup_dropped.csv")
+    ap.add_argument("--threshold", type=float, default=0.8, help="Jaccard estimate for a near-duplicate")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    src = Path(args.input)
+    dst = Path(args.output) if args.output else src.with_name(src.name.replace(".jsonl", "_dedup.jsonl", 1))
+    if dst == src:
+        raise SystemExit("[error] --output must differ from the input")
+
+    t0 = time.time()
+    store = SignatureStore()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        ids, sigs, empty = index_corpus(src, store, pool if args.workers > 1 else None)
+    print(f"[index] {len(ids)} records | signatures: {store.computed} computed, "
+          f"{len(ids) - store.computed} from the cache or repeated texts ({store.dir}) | {time.time() - t0:.1f}s")
+
+    dropped = same_paper(ids)
+    survivors = np.ones(len(ids), dtype=bool)
+    survivors[list(dropped)] = False
+
+    t1 = time.time()
+    pairs = lsh_pairs(sigs, args.threshold, active=survivors & ~empty)
+    groups = UnionFind()
+    for i, j, _ in pairs:
+        groups.union(i, j)
+    for line in np.flatnonzero(survivors):
+        root = groups.find(int(line))
+        if root != line:
+            dropped[int(line)] = (root, "near-duplicate")
+    print(f"[lsh] {len(pairs)} near-duplicate pairs >= {args.threshold} | {time.time() - t1:.1f}s")
+
+    with RecordWriter(dst) as w:
+        for line, rec in enumerate(iter_records(src)):
+            if line not in dropped:
+                w.write(rec)
+
+    report = pd.DataFrame(
+        [{"arxiv_id": ids[line], "duplicate_of": ids[keep], "reason": reason,
+          "jaccard_est": round(jaccard_estimate(sigs[line], sigs[keep]), 3)}
+         for line, (keep, reason) in sorted(dropped.items())],
+        columns=["arxiv_id", "duplicate_of", "reason", "jaccard_est"])
+    report.to_csv(args.report, index=False, encoding="utf-8")
+    counts = report["reason"].value_counts().to_dict()
+    print(f"[done] kept {w.count} of {len(ids)} -> {dst} | dropped {counts} -> {args.report} | "
+          f"total {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
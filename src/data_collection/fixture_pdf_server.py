@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+fixture_pdf_server.py
+Local stand-in for arxiv.org PDF downloads, to exercise collect_arxiv.py offline.
+Usage:
+  python src/data_collection/fixture_pdf_server.py --port 8765 --latency_ms 300 --error_rate 0.2
+  ARXIV_PDF_BASE_URL=http://127.0.0.1:8765 python src/data_collection/collect_arxiv.py
+- GET /pdf/<arxiv_id>.pdf serves <pdf_dir>/<arxiv_id>.pdf, else --default_pdf
+- every request waits latency_ms (+/- 50% jitter) and fails with HTTP 503
+  with probability error_rate
+- GET /stats returns the request counters as JSON
+- --from_jsonl corpus.jsonl first writes <pdf_dir>/<arxiv_id>.pdf for every
+  record (title, abstract, "1 Introduction" with its introduction, then a
+  "2 Related Work" heading), so extraction has one real paper per id
+"""
+
+import argparse, json, os, random, textwrap, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+def make_handler(pdf_dir: Path, default_pdf: Path, latency_ms: float, error_rate: float):
+    stats = {"requests": 0, "served": 0, "errors": 0, "not_found": 0}
+    lock = threading.Lock()
+
+    def bump(key):
+        with lock:
+            stats[key] += 1
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass  # keep the console for the collector's output
+
+        def _send(self, code: int, body: bytes, ctype: str):
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                with lock:
+                    body = json.dumps(stats).encode()
+                return self._send(200, body, "application/json")
+
+            bump("requests")
+            time.sleep(latency_ms / 1000.0 * random.uniform(0.5, 1.5))
+            if random.random() < error_rate:
+                bump("errors")
+                return self._send(503, b"injected failure", "text/plain")
+
+            name = Path(self.path.split("?")[0]).name
+            path = pdf_dir / name if pdf_dir else None
+            if not (path and path.is_file()):
+                path = default_pdf
+            if not (path and path.is_file()):
+                bump("not_found")
+                return self._send(404, b"not found", "text/plain")
+            bump("served")
+            self._send(200, path.read_bytes(), "application/pdf")
+
+    return Handler, stats
+
+
+PDF_LINES_PER_PAGE = 64
+
+
+def write_fixture_pdfs(records, pdf_dir: Path) -> int:
+    """Render each record as a small PDF the collector's extractor can parse;
+    existing files are kept. Returns the number written."""
+    import fitz  # PyMuPDF, only needed to build fixtures
+
+    pdf_dir = Path(pdf_dir)
+    pdf_dir.mkdir(parents=True, exist_ok=True)
+    written = 0
+    for r in records:
+        dest = pdf_dir / f"{r['arxiv_id']}.pdf"
+        if dest.exists() or not r.get("introduction"):
+            continue
+        lines = [r.get("title") or r["arxiv_id"], "", "Abstract"]
+        lines += textwrap.wrap(r.get("abstract") or "", 100) + ["", "1 Introduction"]
+        for para in r["introduction"].split("\n"):
+            lines += textwrap.wrap(para, 100)
+        lines += ["", "2 Related Work", "Omitted in this fixture."]
+        doc = fitz.open()
+        for k in range(0, len(lines), PDF_LINES_PER_PAGE):
+            page = doc.new_page()
+            page.insert_text((40, 50), "\n".join(lines[k:k + PDF_LINES_PER_PAGE]), fontsize=8)
+        tmp = dest.with_name(dest.name + ".tmp")
+        doc.save(tmp)
+        doc.close()
+        os.replace(tmp, dest)
+        written += 1
+    return written
+
+
+def serve(port: int = 8765, pdf_dir=None, default_pdf="data/test_paper.pdf",
+          latency_ms: float = 0.0, error_rate: float = 0.0, background: bool = False):
+    """Start the server; with background=True returns (server, stats) while it
+    runs on a daemon thread (call server.shutdown() when done)."""
+    handler, stats = make_handler(
+        Path(pdf_dir) if pdf_dir else None,
+        Path(default_pdf) if default_pdf else None,
+        latency_ms, error_rate,
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, stats
+    print(f"[fixture] serving PDFs on http://127.0.0.1:{port} "
+          f"(latency={latency_ms}ms, error_rate={error_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"[fixture] stats: {stats}")
+    return server, stats
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--pdf_dir", default=None, help="directory of <arxiv_id>.pdf fixtures")
+    ap.add_argument("--default_pdf", default="data/test_paper.pdf", help="served for unknown ids")
+    ap.add_argument("--latency_ms", type=float, default=0.0)
+    ap.add_argument("--error_rate", type=float, default=0.0)
+    ap.add_argument("--from_jsonl", default=None, help="write a PDF per record of this JSONL into --pdf_dir first")
+    args = ap.parse_args()
+    if args.from_jsonl:
+        if not args.pdf_dir:
+            raise SystemExit("[error] --from_jsonl needs --pdf_dir")
+        from record_io import iter_records
+        n = write_fixture_pdfs(iter_records(args.from_jsonl), Path(args.pdf_dir))
+        print(f"[fixture] wrote {n} PDFs to {args.pdf_dir}")
+    serve(args.port, args.pdf_dir, args.default_pdf, args.latency_ms, args.error_rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+make_tiny_checkpoints.py
+Tiny randomly initialised seq2seq checkpoints for offline tests of
+run_summary_with_HF_model.py (no Hub access needed).
+Usage:
+  python src/data_collection/make_tiny_checkpoints.py --family t5 --out_dir data/cache/tiny
+  python src/data_collection/run_summary_with_HF_model.py --model_name data/cache/tiny/tiny-t5-target \
+    --assistant_model data/cache/tiny/tiny-t5-draft --input data/processed/fixed25.jsonl --output tiny_assisted.jsonl
+- A word-piece tokenizer is trained on the abstracts and introductions of
+  --input, so the models read real text
+- tiny-<family>-target: --layers encoder and decoder layers of width --d_model
+- tiny-<family>-draft: the same model with only its first --draft_layers
+  decoder layers (--draft_init truncate), so it agrees with the target on part
+  of its tokens like a distilled checkpoint would; --draft_init random gives
+  an unrelated draft (acceptance near zero)
+Directory names keep the family name, so pick_lengths / build_input_text
+treat them like the full-size checkpoints.
+"""
+
+import argparse
+from pathlib import Path
+
+import torch
+from tokenizers import Tokenizer, decoders, models, pre_tokenizers, processors, trainers
+from transformers import (AutoModelForSeq2SeqLM, BartConfig, LEDConfig, PegasusConfig,
+                          PreTrainedTokenizerFast, T5Config)
+
+from record_io import iter_records
+
+PAD, EOS, UNK, BOS = 0, 1, 2, 3
+SPECIALS = ["<pad>", "</s>", "<unk>", "<s>"]  # ids PAD, EOS, UNK, BOS
+
+
+def family_config(family: str, vocab: int, d_model: int, layers: int, decoder_layers: int):
+    heads = max(1, d_model // 32)
+    if family == "t5":
+        return T5Config(vocab_size=vocab, d_model=d_model, d_kv=d_model // heads, d_ff=4 * d_model,
+                        num_layers=layers, num_decoder_layers=decoder_layers, num_heads=heads,
+                        pad_token_id=PAD, eos_token_id=EOS, decoder_start_token_id=PAD)
+    common = dict(vocab_size=vocab, d_model=d_model, encoder_layers=layers, decoder_layers=decoder_layers,
+                  encoder_attention_heads=heads, decoder_attention_heads=heads,
+                  encoder_ffn_dim=4 * d_model, decoder_ffn_dim=4 * d_model,
+                  pad_token_id=PAD, eos_token_id=EOS, bos_token_id=BOS)
+    if family == "bart":
+        return BartConfig(max_position_embeddings=1024, decoder_start_token_id=EOS, forced_eos_token_id=EOS, **common)
+    if family == "pegasus":
+        return PegasusConfig(max_position_embeddings=1024, decoder_start_token_id=PAD, **common)
+    if family == "led":
+        return LEDConfig(max_encoder_position_embeddings=4096, max_decoder_position_embeddings=1024,
+                         attention_window=[32] * layers, decoder_start_token_id=EOS, **common)
+    raise ValueError(f"unknown family: {family}")
+
+
+def train_tokenizer(texts, family: str, vocab_size: int):
+    tk = Tokenizer(models.WordPiece(unk_token="<unk>"))
+    tk.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tk.decoder = decoders.WordPiece()
+    tk.train_from_iterator(texts, trainers.WordPieceTrainer(vocab_size=vocab_size, special_tokens=SPECIALS))
+    # T5 / Pegasus append </s>; BART / LED wrap the text in <s> ... </s>
+    single = "$A </s>" if family in ("t5", "pegasus") else "<s> $A </s>"
+    tk.post_processor = processors.TemplateProcessing(
+        single=single, special_tokens=[("<s>", BOS), ("</s>", EOS)])
+    return PreTrainedTokenizerFast(tokenizer_object=tk, pad_token="<pad>", eos_token="</s>",
+                                   unk_token="<unk>", bos_token="<s>",
+                                   model_input_names=["input_ids", "attention_mask"])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--family", choices=["t5", "bart", "pegasus", "led"], default="t5")
+    ap.add_argument("--input", default="data/processed/fixed25.jsonl", help="JSONL the tokenizer is trained on")
+    ap.add_argument("--out_dir", default="data/cache/tiny")
+    ap.add_argument("--vocab_size", type=int, default=4000)
+    ap.add_argument("--d_model", type=int, default=128)
+    ap.add_argument("--layers", type=int, default=4, help="encoder and decoder layers of the target")
+    ap.add_argument("--draft_layers", type=int, default=1, help="decoder layers of the draft")
+    ap.add_argument("--draft_init", choices=["truncate", "random"], default="truncate")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    texts = [f"{r.get('abstract') or ''}\n{r.get('introduction') or ''}" for r in iter_records(args.input)]
+    tok = train_tokenizer(texts, args.family, args.vocab_size)
+    vocab = len(tok)
+    print(f"[info] tokenizer: {vocab} tokens from {len(texts)} records of {args.input}")
+
+    torch.manual_seed(args.seed)
+    target = AutoModelForSeq2SeqLM.from_config(
+        family_config(args.family, vocab, args.d_model, args.layers, args.layers))
+    draft = AutoModelForSeq2SeqLM.from_config(
+        family_config(args.family, vocab, args.d_model, args.layers, args.draft_layers))
+    if args.draft_init == "truncate":
+        # weights of the dropped decoder layers are the only keys left over
+        draft.load_state_dict(target.state_dict(), strict=False)
+
+    out = Path(args.out_dir)
+    for role, model in (("target", target), ("draft", draft)):
+        path = out / f"tiny-{args.family}-{role}"
+        model.save_pretrained(path)
+        tok.save_pretrained(path)
+        n = sum(p.numel() for p in model.parameters())
+        print(f"[done] {role}: {n / 1e6:.2f}M parameters -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+near_dup.py
+MinHash signatures and LSH banding for near-duplicate detection (dedup_corpus.py).
+- A document is the set of its word 3-shingles (lowercase alphanumeric tokens);
+  every shingle is hashed once to 32 bits and the NUM_PERM min-hashes of the
+  set come from one NumPy pass of multiply-shift hashing, (a * h + b) >> 32
+  in wrapping 64-bit arithmetic (no modulo, about 3x faster than mod p)
+- Signatures are cached on disk per parameter set, keyed by the sha1 of the
+  document text, in the same layout as the embedding store:
+    sigs.u32    row-major uint32 matrix (n x NUM_PERM), append-only, memory-mapped
+    index.tsv   "<sha1 of text>\t<row>" per line
+    meta.json   shingle size, permutations, seed
+- LSH: BANDS bands of ROWS hashes; documents sharing any band bucket are
+  candidates, verified by the fraction of equal min-hashes (Jaccard estimate).
+  With 16 x 8 a pair at Jaccard 0.9 becomes a candidate with probability
+  > 0.99 (0.95 at 0.8), one at 0.4 with about 0.01, and no pair outside a
+  shared bucket is ever compared
+- word_set: the memoized lowercase word set behind the reference/summary
+  overlap filter, so each text is split once however often it is compared
+"""
+
+import hashlib, json, os, re, zlib
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+CACHE_ROOT = Path("data/cache/minhash")
+SHINGLE = 3
+NUM_PERM = 128
+BANDS, ROWS = 16, 8      # BANDS * ROWS == NUM_PERM
+SEED = 1
+BUCKET_PAIRS_MAX = 64    # larger buckets are checked against their first member only
+
+MAX_HASH = np.uint64((1 << 32) - 1)
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+_gen = np.random.RandomState(SEED)
+PERM_A = _gen.randint(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)  # odd
+PERM_B = _gen.randint(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2)
+EMPTY = np.full(NUM_PERM, int(MAX_HASH), dtype=np.uint32)
+
+_token_hashes = {}
+
+
+@lru_cache(maxsize=65536)
+def word_set(text: str) -> frozenset:
+    return frozenset(text.lower().split())
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def token_hash(tok: str) -> int:
+    h = _token_hashes.get(tok)
+    if h is None:
+        h = _token_hashes[tok] = zlib.crc32(tok.encode("utf-8"))
+    return h
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """32-bit hashes of the distinct word SHINGLE-grams of text."""
+    words = TOKEN_RE.findall(text.lower())
+    hashes = list(map(_token_hashes.get, words))  # C-speed lookups; misses are rare once warm
+    if None in hashes:
+        hashes = [h if h is not None else token_hash(w) for h, w in zip(hashes, words)]
+    toks = np.array(hashes, dtype=np.uint64)
+    if len(toks) < SHINGLE:
+        toks = toks[:1]  # a very short text is one shingle (or none)
+    else:
+        n = len(toks) - SHINGLE + 1
+        h = toks[:n].copy()
+        with np.errstate(over="ignore"):
+            for k in range(1, SHINGLE):
+                h = h * np.uint64(0x100000001B3) ^ toks[k:n + k]
+        toks = (h >> np.uint64(32)) ^ (h & MAX_HASH)
+    return np.unique(toks)
+
+
+def minhash(text: str) -> np.ndarray:
+    hv = shingle_hashes(text)
+    if not len(hv):
+        return EMPTY.copy()
+    with np.errstate(over="ignore"):
+        phv = hv[:, None] * PERM_A + PERM_B
+    # >> 32 is monotone, so it can follow the min instead of touching every cell
+    return (phv.min(axis=0) >> np.uint64(32)).astype(np.uint32)
+
+
+def jaccard_estimate(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class SignatureStore:
+    """
+    store = SignatureStore()
+    sigs = store.signatures(texts, pool)  # (len(texts), NUM_PERM) uint32
+    Only texts not stored yet are hashed (on pool, if given).
+    """
+
+    def __init__(self, cache_root: Path = CACHE_ROOT):
+        self.params = {"shingle": SHINGLE, "num_perm": NUM_PERM, "seed": SEED, "hash": "multiply-shift"}
+        self.dir = Path(cache_root) / f"w{SHINGLE}_p{NUM_PERM}_s{SEED}"
+        self.sig_path = self.dir / "sigs.u32"
+        self.index_path = self.dir / "index.tsv"
+        self.meta_path = self.dir / "meta.json"
+        self.index = {}
+        self.rows = 0
+        self.matrix = None
+        self.computed = 0  # signatures actually hashed this run
+        self._load()
+
+    def _load(self):
+        if not self.meta_path.exists():
+            return
+        meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        if meta != self.params:
+            raise ValueError(f"{self.dir} holds signatures for {meta}, not {self.params}")
+        self.rows = self.sig_path.stat().st_size // (4 * NUM_PERM) if self.sig_path.exists() else 0
+        if self.index_path.exists():
+            with self.index_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    key, _, row = line.rstrip("\n").partition("\t")
+                    if row.isdigit() and int(row) < self.rows:
+                        self.index[key] = int(row)
+        self._map()
+
+    def _map(self):
+        self.matrix = (np.memmap(self.sig_path, dtype=np.uint32, mode="r", shape=(self.rows, NUM_PERM))
+                       if self.rows else None)
+
+    def __len__(self):
+        return len(self.index)
+
+    def _append(self, keys, sigs):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if not self.meta_path.exists():
+            self.meta_path.write_text(json.dumps(self.params), encoding="utf-8")
+        with self.sig_path.open("ab") as f:
+            # drop a partial row left by an interrupted write
+            f.truncate(self.rows * 4 * NUM_PERM)
+            f.write(np.ascontiguousarray(sigs, dtype=np.uint32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with self.index_path.open("a", encoding="utf-8") as f:
+            for i, key in enumerate(keys):
+                self.index[key] = self.rows + i
+                f.write(f"{key}\t{self.rows + i}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.rows += len(keys)
+        self._map()
+
+    def signatures(self, texts, pool=None) -> np.ndarray:
+        keys = [text_key(t) for t in texts]
+        missing = {}
+        for key, t in zip(keys, texts):
+            if key not in self.index and key not in missing:
+                missing[key] = t
+        if missing:
+            todo = list(missing.values())
+            if pool is None:
+                sigs = [minhash(t) for t in todo]
+            else:
+                sigs = list(pool.map(minhash, todo, chunksize=max(1, len(todo) // 64)))
+            self._append(list(missing), np.stack(sigs))
+            self.computed += len(missing)
+        if not keys:
+            return np.zeros((0, NUM_PERM), dtype=np.uint32)
+        return np.asarray(self.matrix[[self.index[k] for k in keys]])
+
+
+def lsh_pairs(sigs: np.ndarray, threshold: float, active=None):
+    """Near-duplicate pairs (i, j, jaccard estimate), i < j, among the rows of sigs.
+    active: optional boolean mask of rows taking part (e.g. non-empty texts)."""
+    rows = np.arange(len(sigs)) if active is None else np.flatnonzero(active)
+    checked, pairs = set(), []
+
+    def check(i, j):
+        if (i, j) in checked:
+            return
+        checked.add((i, j))
+        est = jaccard_estimate(sigs[i], sigs[j])
+        if est >= threshold:
+            pairs.append((i, j, est))
+
+    for band in range(BANDS):
+        buckets = defaultdict(list)
+        block = np.ascontiguousarray(sigs[rows, band * ROWS:(band + 1) * ROWS])
+        for i, key in zip(rows.tolist(), map(bytes, block)):
+            buckets[key].append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            if len(members) <= BUCKET_PAIRS_MAX:
+                for a in range(len(members)):
+                    for b in range(a + 1, len(members)):
+                        check(members[a], members[b])
+            else:
+                for j in members[1:]:
+                    check(members[0], j)
+    return pairs
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        root = x
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while x != root:
+            self.parent[x], x = root, self.parent.get(x, x)
+        return root
+
+    def union(self, a, b):
+        """Merge the sets of a and b; the smaller root (earlier row) stays the root."""
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+profiling.py
+Opt-in torch profiler session for run_summary_with_HF_model.py --profile.
+- Profiles --profile_batches batches spread evenly over the run's length
+  order (longest to shortest), or with --profile_sample N the batches of N
+  records drawn with --profile_seed; either way they run first
+- Every submodule up to --profile_depth is labelled "module::<name>" (layer
+  indices folded to "*"), logits processors "logits::<name>", plus the
+  "tokenize" / "generate" / "detokenize" labels set by summarize_batch
+Writes to --profile_dir/<model>/:
+  trace.json   Chrome / Perfetto trace (chrome://tracing, ui.perfetto.dev)
+  ops.csv      per-operator self/total CPU time
+  modules.csv  per-module and per-phase CPU time (inclusive)
+"""
+
+import csv, random, re
+from pathlib import Path
+
+import torch
+from torch.autograd.profiler import record_function
+from torch.profiler import ProfilerActivity, profile
+from transformers import LogitsProcessorList, NoRepeatNGramLogitsProcessor
+
+from run_summary_with_HF_model import build_input_text, make_batches
+from summary_cache import model_cache_dir
+
+
+class LabeledProcessor:
+    """Wraps a logits processor so its time shows up under one profiler label."""
+
+    def __init__(self, label: str, proc):
+        self.label = label
+        self.proc = proc
+
+    def __call__(self, input_ids, scores):
+        with record_function(self.label):
+            return self.proc(input_ids, scores)
+
+
+def label_modules(model, depth: int):
+    """Forward hooks that open/close a record_function around each submodule.
+    Returns (hook handles, labels of top-level embeddings, which run nested
+    inside the encoder/decoder calls)."""
+    handles, nested = [], set()
+    if not isinstance(model, torch.nn.Module):
+        return handles, nested  # ONNX Runtime: only the ops table is meaningful
+    for name, mod in model.named_modules():
+        if not name or name.count(".") >= depth:
+            continue
+        if isinstance(mod, (torch.nn.ModuleList, torch.nn.ModuleDict)):
+            continue  # containers are never called themselves
+        label = "module::" + re.sub(r"\.\d+(?=\.|$)", ".*", name)
+        if "." not in name and isinstance(mod, torch.nn.Embedding):
+            nested.add(label)
+        stack = []
+
+        def pre(_mod, _inp, label=label, stack=stack):
+            rf = record_function(label)
+            rf.__enter__()
+            stack.append(rf)
+
+        def post(_mod, _inp, _out, stack=stack):
+            if stack:
+                stack.pop().__exit__(None, None, None)
+
+        handles.append(mod.register_forward_pre_hook(pre))
+        handles.append(mod.register_forward_hook(post))
+    return handles, nested
+
+
+def profiled_first(lengths, batches, args):
+    """batches reordered so the ones to profile come first, and how many they are.
+    make_batches runs longest first, so the first batches alone would only show
+    the longest inputs."""
+    if args.profile_sample:
+        picked = sorted(random.Random(args.profile_seed).sample(range(len(lengths)),
+                                                                min(args.profile_sample, len(lengths))))
+        rest = sorted(set(range(len(lengths))) - set(picked))
+
+        def batch(ids):
+            sub = make_batches([lengths[i] for i in ids], args.batch_size, args.max_batch_tokens)
+            return [[ids[k] for k in b] for b in sub]
+
+        profiled = batch(picked)
+        return profiled + batch(rest), len(profiled)
+    n = min(args.profile_batches, len(batches))
+    pick = sorted({round(k * (len(batches) - 1) / max(n - 1, 1)) for k in range(n)})
+    return [batches[k] for k in pick] + [b for k, b in enumerate(batches) if k not in pick], len(pick)
+
+
+def labeled_gen_kwargs(gen_kwargs: dict):
+    """Same decoding, but no_repeat_ngram runs as an explicitly labelled processor."""
+    kwargs = dict(gen_kwargs)
+    procs = list(kwargs.pop("logits_processor", None) or [])
+    n = kwargs.pop("no_repeat_ngram_size", 0)
+    if n:
+        procs.append(LabeledProcessor("logits::no_repeat_ngram", NoRepeatNGramLogitsProcessor(n)))
+    kwargs["logits_processor"] = LogitsProcessorList(procs)
+    return kwargs
+
+
+class ProfileSession:
+    def __init__(self, model, tok, gen_kwargs, args, max_inp: int):
+        self.args = args
+        self.tok = tok
+        self.max_inp = max_inp
+        self.out_dir = model_cache_dir(Path(args.profile_dir), args.model_name)
+        self.gen_kwargs = labeled_gen_kwargs(gen_kwargs)
+        self.handles, self.nested = label_modules(model, args.profile_depth)
+        self.prof = profile(activities=[ProfilerActivity.CPU])
+        self.prof.__enter__()
+        print(f"[profile] -> {self.out_dir}")
+
+    def tokenize(self, jobs):
+        """Re-tokenize the sampled records inside the profiler (prepare_jobs ran before it)."""
+        with record_function("tokenize"):
+            for j in jobs:
+                text = build_input_text(self.args.model_name, (j["row"].get("introduction") or "").strip())
+                self.tok(text, max_length=self.max_inp, truncation=True)
+
+    def finish(self):
+        self.prof.__exit__(None, None, None)
+        for h in self.handles:
+            h.remove()
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.prof.export_chrome_trace((self.out_dir / "trace.json").as_posix())
+
+        events = self.prof.key_averages()
+        labels = ("module::", "logits::", "tokenize", "generate", "detokenize")
+        ops, phases = [], {}
+        for e in events:
+            if e.key.startswith(labels):
+                phases[e.key] = (e.count, e.cpu_time_total / 1000.0)
+            else:
+                ops.append((e.key, e.count, e.self_cpu_time_total / 1000.0, e.cpu_time_total / 1000.0))
+        ops.sort(key=lambda r: -r[2])
+
+        # generate() time not spent in the decoder, lm_head or labelled
+        # processors is beam-search bookkeeping and the generation loop itself
+        gen_ms = phases.get("generate", (0, 0.0))[1]
+        inside = sum(ms for k, (_, ms) in phases.items()
+                     if (k.startswith("module::") and "." not in k
+                         and k != "module::encoder" and k not in self.nested)
+                     or k.startswith("logits::"))
+        if gen_ms:
+            phases["generate: search/other"] = (0, max(0.0, gen_ms - inside))
+
+        with (self.out_dir / "ops.csv").open("w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["operator", "calls", "self_cpu_ms", "total_cpu_ms"])
+            w.writerows((k, n, round(s, 3), round(t, 3)) for k, n, s, t in ops)
+        with (self.out_dir / "modules.csv").open("w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["label", "calls", "cpu_ms_inclusive"])
+            for k, (n, ms) in sorted(phases.items(), key=lambda kv: -kv[1][1]):
+                w.writerow([k, n, round(ms, 3)])
+
+        print(f"[profile] top operators by self CPU time ({self.args.model_name}):")
+        for k, n, s, _ in ops[:10]:
+            print(f"  {s:10.1f} ms  {n:7d}x  {k}")
+        print(f"[profile] wrote trace.json, ops.csv, modules.csv -> {self.out_dir}")
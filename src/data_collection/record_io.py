@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+record_io.py
+Shared JSONL record I/O for the collection, selection, summarization and table scripts.
+- iter_records: lazy, one record at a time over a large read buffer, so scanning
+  a multi-GB corpus holds one line in memory, not the file
+- RecordWriter: serializes into a byte buffer and writes it in BATCH_BYTES
+  chunks; sync() makes everything written so far durable (flush + fsync)
+- Uses orjson (in requirements.txt) when it is installed, else the stdlib json
+  module; both write the same compact, UTF-8 lines
+- Compression follows the file name: *.gz (gzip) and *.zst (zstandard,
+  pip install zstandard); appending adds a new gzip member / zstd frame and
+  sync() closes the current one. A run killed between syncs leaves a partial
+  member at the end: readers with skip_bad=True stop there, and the next
+  RecordWriter(append=True) cuts it off before writing
+Run bench_record_io.py to measure the gain on your own files.
+"""
+
+import gzip, io, json, os, zlib
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # optional fast backend
+    orjson = None
+
+BACKEND = "orjson" if orjson else "json"
+READ_BUFFER = 1 << 20   # bytes per read() on the underlying file
+BATCH_BYTES = 1 << 20   # serialized bytes buffered before one write()
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("*.zst files need the zstandard package: pip install zstandard") from None
+    return zstandard
+
+
+# one encoder for every record: json.dumps with non-default arguments builds a new one per call
+_json_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+json_loads = json.loads
+
+
+def json_dumps(rec) -> bytes:
+    return _json_encode(rec).encode("utf-8")
+
+
+if orjson:
+    loads, dumps = orjson.loads, orjson.dumps
+else:
+    loads, dumps = json_loads, json_dumps
+
+
+def compression_of(path) -> str:
+    suffix = Path(path).suffix.lower()
+    return {".gz": "gzip", ".zst": "zstd"}.get(suffix, "none")
+
+
+def open_lines(path, compression=None):
+    """Binary, buffered, line-iterable reader; decompresses transparently."""
+    compression = compression or compression_of(path)
+    if compression == "gzip":
+        return gzip.GzipFile(path, "rb")  # buffered itself; decompresses 128 KiB at a time
+    if compression == "zstd":
+        raw = open(path, "rb")
+        reader = _zstd().ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.BufferedReader(reader, READ_BUFFER)
+    return open(path, "rb", buffering=READ_BUFFER)
+
+
+def _truncated_errors():
+    errors = (EOFError, zlib.error, gzip.BadGzipFile)  # partial gzip member
+    try:
+        import zstandard
+        errors += (zstandard.ZstdError,)
+    except ImportError:
+        pass
+    return errors
+
+
+def iter_records(path, skip_bad: bool = False):
+    """Yield one dict per non-blank line. skip_bad=True drops lines that do not
+    parse and stops quietly at a truncated compressed tail (interrupted runs)."""
+    truncated = _truncated_errors()
+    with open_lines(path) as f:
+        try:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield loads(line)
+                except ValueError:
+                    if not skip_bad:
+                        raise
+        except truncated:
+            if not skip_bad:
+                raise
+
+
+def complete_length(path, compression=None) -> int:
+    """Byte length of the whole gzip members / zstd frames at the start of a
+    compressed file, i.e. where a torn tail from a killed writer begins."""
+    compression = compression or compression_of(path)
+    if compression == "gzip":
+        new = lambda: zlib.decompressobj(wbits=31)
+    else:
+        new = _zstd().ZstdDecompressor().decompressobj
+    good = pos = 0  # end of the last whole member / offset of chunk in the file
+    d = new()
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_BUFFER):
+            while chunk:
+                try:
+                    d.decompress(chunk)
+                except _truncated_errors():
+                    return good
+                if not d.eof:
+                    pos += len(chunk)
+                    break
+                # member complete; whatever follows starts the next one
+                tail = d.unused_data
+                pos += len(chunk) - len(tail)
+                good, chunk, d = pos, tail, new()
+    return good
+
+
+def read_records(path, skip_bad: bool = False) -> list:
+    return list(iter_records(path, skip_bad))
+
+
+class RecordWriter:
+    """Buffered JSONL writer; use as a context manager or call close()."""
+
+    def __init__(self, path, append: bool = False, batch_bytes: int = BATCH_BYTES, compression=None):
+        self.path = Path(path)
+        self.compression = compression or compression_of(self.path)
+        self.batch_bytes = batch_bytes
+        if append and self.compression != "none" and self.path.exists():
+            # drop a partial member left by an interrupted run, or nothing
+            # appended after it could be read back
+            good = complete_length(self.path, self.compression)
+            if good < self.path.stat().st_size:
+                os.truncate(self.path, good)
+        self.raw = open(self.path, "ab" if append else "wb")
+        if append and self.compression == "none" and self.raw.tell():
+            # a torn last line from an interrupted run: start on a fresh line
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.raw.write(b"\n")
+        self.stream = None
+        self.buf, self.buf_bytes, self.count = [], 0, 0
+
+    def _open_stream(self):
+        if self.compression == "gzip":
+            return gzip.GzipFile(fileobj=self.raw, mode="wb", compresslevel=6)
+        if self.compression == "zstd":
+            return _zstd().ZstdCompressor().stream_writer(self.raw, closefd=False)
+        return self.raw
+
+    def write(self, rec):
+        line = dumps(rec)
+        self.buf += (line, b"\n")  # no per-record concatenation; flush joins once
+        self.buf_bytes += len(line) + 1
+        self.count += 1
+        if self.buf_bytes >= self.batch_bytes:
+            self.flush()
+
+    def write_many(self, recs):
+        for rec in recs:
+            self.write(rec)
+
+    def flush(self):
+        """Hand the buffered lines to the (compressing) stream."""
+        if not self.buf:
+            return
+        if self.stream is None:
+            self.stream = self._open_stream()
+        self.stream.write(b"".join(self.buf))
+        self.buf, self.buf_bytes = [], 0
+
+    def _end_stream(self):
+        if self.stream is not None and self.stream is not self.raw:
+            self.stream.close()  # writes the gzip trailer / zstd frame end; raw stays open
+        self.stream = None
+
+    def sync(self):
+        """Everything written so far is on disk and readable after a crash."""
+        self.flush()
+        self._end_stream()
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+
+    def close(self):
+        if self.raw.closed:
+            return
+        self.flush()
+        self._end_stream()
+        self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_records(path, recs, atomic: bool = True) -> int:
+    """Write recs to path; with atomic=True via a temp file swapped in at the
+    end, so an interrupted run never leaves a truncated file behind."""
+    path = Path(path)
+    target = path.with_name(path.name + ".tmp") if atomic else path
+    with RecordWriter(target, compression=compression_of(path)) as w:
+        w.write_many(recs)
+    if atomic:
+        os.replace(target, path)
+    return w.count
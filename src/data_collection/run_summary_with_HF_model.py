@@ -9,22 +9,76 @@ Supported examples:
   --model_name t5-large
   --model_name google/pegasus-xsum
   --model_name allenai/led-base-16384
+Batching:
+  --batch_size 8 --max_batch_tokens 16384
+  Records are bucketed by tokenized length so padding stays small; the
+  output JSONL keeps the input order and time_sec is the record's share of
+  its batch.
+Multi-process CPU:
+  --workers 4 --threads-per-worker 8
+  Shards the records across worker processes, each with its own torch
+  thread count. On platforms with fork() the model is loaded once in the
+  parent and shared copy-on-write; shard outputs are merged in input order.
+Resumable runs:
+  --cache_dir data/cache/summaries   (default; --no_cache to disable)
+  Every finished record is fsync'ed to a per-model result cache keyed by
+  (model, revision, generation config, input text hash). Re-runs only
+  generate the missing records; the output file is replaced atomically.
+  Input and output go through record_io.py; names ending in .gz / .zst are
+  read and written compressed.
+CPU backends:
+  --backend torch | torch-int8 | onnx   (see cpu_backends.py)
+  Every record is tagged with its backend; compare runs with
+  src/Compute_Backend_Comparison.py.
+CPU instrumentation (per record, see cpu_metrics.py):
+  peak_rss_bytes, encoder_time_sec, decoder_time_sec, ttft_sec,
+  output_tokens_per_sec; summarised by src/Compute_Efficiency_Summary.py.
+Chunked map-reduce (long introductions):
+  --chunked [--chunk_overlap 64 --reduce]
+  Instead of truncating at the model's input limit, the whole introduction
+  is split into overlapping token windows of that size; every chunk of every
+  paper is summarized in the same length-bucketed batches (map), and with
+  --reduce the joined chunk summaries are summarized once more (in a tree of
+  rounds when they do not fit one input window). Chunks are cached by their
+  token ids, so a re-extracted introduction only regenerates the windows that
+  changed. Records add chunks, map_time_sec, reduce_time_sec, reduce_jobs.
+Assisted generation (draft model):
+  --assistant_model t5-small   (with --model_name t5-large; same tokenizer)
+  The draft model proposes tokens that the main model checks in one forward
+  pass (transformers assisted decoding: greedy, batch size 1). Every record
+  gets acceptance_rate, draft_tokens, accepted_tokens and verify_steps, plus
+  baseline_time_sec from a plain greedy run of the same record and
+  speedup = baseline_time_sec / time_sec (--no_assistant_baseline skips it).
+  acceptance_rate is a lower bound (see cpu_metrics.AssistCounter). The
+  baseline runs before the assisted run for every other record and after it
+  for the rest, after one untimed warm-up of both.
+  make_tiny_checkpoints.py writes tiny random target/draft pairs for offline tests.
+Profiling:
+  --profile [--profile_batches 2 | --profile_sample N --profile_seed 0]
+            [--profile_depth 4 --profile_dir profiles]
+  Wraps batches spread over the length order (or the batches of a seeded
+  sample of N records) in the torch profiler and writes a Chrome trace
+  plus per-operator and per-module tables (see profiling.py). The result
+  cache is off while profiling: every record is generated (and profiled),
+  and timings inflated by the profiler never reach the cache.
 """
 
-import argparse, json, time, os, sys
+import argparse, contextlib, time, os, sys
+import multiprocessing as mp
 from pathlib import Path
 
 import torch
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+from torch.autograd.profiler import record_function
+from transformers import AutoConfig, AutoTokenizer, LogitsProcessorList
+from transformers.modeling_outputs import BaseModelOutput
+
+from cpu_backends import BACKENDS, load_backend_model
+from cpu_metrics import AssistCounter, RssSampler, StepTimer
+from record_io import RecordWriter, read_records, write_records
+from summary_cache import text_sha1, cache_key, model_cache_dir, load_cache, open_cache_part, append_cache
 
 def load_data(path: Path):
-    rows = []
-    with path.open(encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line: continue
-            rows.append(json.loads(line))
-    return rows
+    return read_records(path)
 
 def pick_lengths(model_name: str):
     # safe, simple defaults
@@ -37,17 +91,479 @@ def pick_lengths(model_name: str):
         return 4096, 256
     return 1024, 200
 
+def default_gen_kwargs(max_out: int):
+    # generation config (simple, deterministic-ish)
+    return dict(
+        max_new_tokens=max_out,
+        num_beams=4,
+        length_penalty=1.0,
+        early_stopping=True,
+        no_repeat_ngram_size=3,
+    )
+
 def build_input_text(model_name: str, intro: str):
     if "t5" in model_name.lower():
         return "summarize: " + intro
     return intro
 
+def make_batches(lengths, batch_size: int, max_batch_tokens: int):
+    """Group record indices into length-sorted batches (longest first).
+    A batch is closed once it holds batch_size rows or its padded size
+    (rows x longest input) would exceed max_batch_tokens."""
+    order = sorted(range(len(lengths)), key=lambda i: (-lengths[i], i))
+    batches, cur = [], []
+    for i in order:
+        if cur and (len(cur) >= batch_size or lengths[cur[0]] * (len(cur) + 1) > max_batch_tokens):
+            batches.append(cur)
+            cur = []
+        cur.append(i)
+    if cur:
+        batches.append(cur)
+    return batches
+
+def output_length(ids, pad_id):
+    """Length of one generated row without the right padding added by batching."""
+    keep = (ids != pad_id).nonzero()
+    if len(keep) == 0:
+        return int(ids.shape[-1])
+    return int(keep[-1].item()) + 1
+
+def prepare_jobs(rows, tok, model_name: str, max_inp: int):
+    """Tokenize every usable record once; returns jobs in input order."""
+    jobs = []
+    for i, r in enumerate(rows):
+        intro = (r.get("introduction") or "").strip()
+        if not intro:
+            continue
+        text = build_input_text(model_name, intro)
+        ids = tok(text, max_length=max_inp, truncation=True)["input_ids"]
+        jobs.append({"idx": i, "row": r, "input_ids": ids, "text_sha1": text_sha1(text)})
+    return jobs
+
+def chunk_windows(ids, size: int, overlap: int):
+    """Windows of at most size tokens, each starting overlap tokens before the
+    previous one ends. Anchored at the start, so an edit near the end of a
+    text leaves the earlier windows (and their cache entries) unchanged."""
+    if not 0 <= overlap < size:
+        raise ValueError(f"overlap must be in [0, {size}), got {overlap}")
+    return [ids[s:s + size] for s in range(0, max(len(ids) - overlap, 1), size - overlap)]
+
+def chunk_size(tok, model_name: str, max_inp: int):
+    """Introduction tokens per window: max_inp minus the prompt prefix and special tokens."""
+    prefix = tok(build_input_text(model_name, ""), add_special_tokens=False)["input_ids"]
+    return max_inp - len(prefix) - tok.num_special_tokens_to_add()
+
+def prepare_chunk_jobs(rows, tok, model_name: str, max_inp: int, overlap: int):
+    """One job per chunk (jobs) plus one entry per usable paper (papers), in input order.
+    Only the introduction is chunked, as in prepare_jobs; the abstract is the reference."""
+    prefix = tok(build_input_text(model_name, ""), add_special_tokens=False)["input_ids"]
+    size = chunk_size(tok, model_name, max_inp)
+    jobs, papers = [], []
+    for i, r in enumerate(rows):
+        intro = (r.get("introduction") or "").strip()
+        if not intro:
+            continue
+        ids = tok(intro, add_special_tokens=False, verbose=False)["input_ids"]
+        first = len(jobs)
+        for window in chunk_windows(ids, size, overlap):
+            input_ids = tok.build_inputs_with_special_tokens(prefix + window)
+            jobs.append({"idx": len(jobs), "row": r, "input_ids": input_ids,
+                         "text_sha1": text_sha1("ids:" + " ".join(map(str, input_ids)))})
+        papers.append({"idx": i, "row": r, "chunks": list(range(first, len(jobs)))})
+    return jobs, papers
+
+def prepare_reduce_jobs(texts, rows, tok, model_name: str, max_inp: int):
+    """One round of the reduce tree. texts maps a paper idx to the summaries
+    still to be combined (papers with one left are done); consecutive
+    summaries are packed into groups whose joined text fits the input window,
+    at least two per group, so every round shrinks a paper's list. Returns the
+    jobs, the paper idx of each job and how many of them had to be truncated."""
+    size = chunk_size(tok, model_name, max_inp)
+    jobs, owners, truncated = [], [], 0
+    for p, summaries in texts.items():
+        if len(summaries) < 2:
+            continue
+        groups, n = [[]], 0
+        for t in summaries:
+            k = len(tok(" " + t, add_special_tokens=False, verbose=False)["input_ids"])
+            if len(groups[-1]) >= 2 and n + k > size:
+                groups.append([])
+                n = 0
+            groups[-1].append(t)
+            n += k
+        for g in groups:
+            text = build_input_text(model_name, " ".join(g))
+            ids = tok(text, verbose=False)["input_ids"]
+            if len(ids) > max_inp:
+                truncated += 1
+                ids = tok(text, max_length=max_inp, truncation=True)["input_ids"]
+            jobs.append({"idx": len(jobs), "row": rows[p], "input_ids": ids, "text_sha1": text_sha1(text)})
+            owners.append(p)
+    return jobs, owners, truncated
+
+def reduce_tree(papers, chunk_recs, tok, model_name: str, max_inp: int, run):
+    """Reduce every multi-chunk paper's chunk summaries to one, in rounds of
+    prepare_reduce_jobs until each paper has a single summary left. Returns
+    ({paper idx: reduce records, final one last}, number generated)."""
+    texts = {p["idx"]: [chunk_recs[c]["generated_summary"] for c in p["chunks"]]
+             for p in papers if len(p["chunks"]) > 1}
+    rows = {p["idx"]: p["row"] for p in papers}
+    reduced = {p: [] for p in texts}
+    n_gen, rnd = 0, 0
+    while True:
+        jobs, owners, truncated = prepare_reduce_jobs(texts, rows, tok, model_name, max_inp)
+        if not jobs:
+            return reduced, n_gen
+        rnd += 1
+        print(f"[reduce] round {rnd}: {len(jobs)} jobs for {len(set(owners))} papers"
+              + (f" ({truncated} truncated to {max_inp} tokens)" if truncated else ""))
+        recs, n = generate(jobs, *run, tag=f"reduce {rnd}")
+        n_gen += n
+        texts = {p: [] for p in set(owners)}
+        for job, p in zip(jobs, owners):
+            texts[p].append(recs[job["idx"]]["generated_summary"])
+            reduced[p].append(recs[job["idx"]])
+
+def merge_chunks(paper, args, parts, reduced=()):
+    """Paper record from its chunk records (map) and its reduce records, if
+    any (every round of the reduce tree, the final summary last)."""
+    def total(key):
+        vals = [r.get(key) for r in parts]
+        return None if any(v is None for v in vals) else round(sum(vals), 3)
+
+    reduced = list(reduced)
+    final = reduced[-1] if reduced else None
+    phases = parts + reduced
+    map_time = total("time_sec")
+    reduce_time = sum(r["time_sec"] for r in reduced)
+    time_sec = round(map_time + reduce_time, 3)
+    if final:
+        summary, out_tok = final["generated_summary"], final["output_tokens"]
+    else:
+        summary, out_tok = " ".join(r["generated_summary"] for r in parts), total("output_tokens")
+    timed = {}
+    for key in ("encoder_time_sec", "decoder_time_sec"):
+        vals = [r.get(key) for r in phases]
+        timed[key] = None if any(v is None for v in vals) else round(sum(vals), 3)
+    if "assistant_model" in parts[0]:  # --assistant_model: totals over both stages
+        sums = {k: sum(r[k] for r in phases) for k in ("draft_tokens", "accepted_tokens", "verify_steps")}
+        base = [r["baseline_time_sec"] for r in phases]
+        base = None if None in base else sum(base)
+        timed.update(sums, assistant_model=parts[0]["assistant_model"],
+                     acceptance_rate=round(sums["accepted_tokens"] / sums["draft_tokens"], 3) if sums["draft_tokens"] else None,
+                     baseline_time_sec=round(base, 3) if base is not None else None,
+                     speedup=round(base / max(time_sec, 1e-9), 2) if base is not None else None)
+    return make_record(paper, args, summary, {
+        "time_sec": time_sec,
+        "gpu_mem_bytes": max(r["gpu_mem_bytes"] for r in phases),
+        "peak_rss_bytes": max(r["peak_rss_bytes"] for r in phases),
+        "input_tokens": total("input_tokens"),
+        "output_tokens": out_tok,
+        **timed,
+        # first token of the final text: only after the map phase and the earlier reduce rounds
+        "ttft_sec": round(map_time + reduce_time - final["time_sec"] + final["ttft_sec"], 3) if final
+                    else parts[0]["ttft_sec"],
+        "output_tokens_per_sec": round(out_tok / max(time_sec, 1e-9), 2),
+        "chunks": len(parts),
+        "map_time_sec": map_time,
+        "reduce_time_sec": round(reduce_time, 3),
+        "reduce_jobs": len(reduced),
+    })
+
+def load_model(args, device: str):
+    print(f"[info] loading model: {args.model_name} (backend={args.backend})")
+    tok = AutoTokenizer.from_pretrained(args.model_name, use_fast=True, revision=args.revision)
+    model = load_backend_model(args.model_name, args.backend, device, args.revision, args.onnx_dir)
+    return tok, model
+
+def load_assistant(args, device: str):
+    """Draft model for --assistant_model (None without it), on the same backend."""
+    name = getattr(args, "assistant_model", None)
+    if not name:
+        return None
+    print(f"[info] loading assistant model: {name} (backend={args.backend})")
+    return load_backend_model(name, args.backend, device, args.assistant_revision, args.onnx_dir)
+
+def shared_models(args, device: str):
+    """tokenizer, model and assistant of this process, loaded on first use
+    (and again if a later run in the same process asks for other models)."""
+    key = (args.model_name, args.revision, args.backend, getattr(args, "assistant_model", None),
+           getattr(args, "assistant_revision", None), device)
+    if _SHARED.get("key") != key:
+        _SHARED.clear()
+        _SHARED["tok"], _SHARED["model"] = load_model(args, device)
+        _SHARED["assistant"] = load_assistant(args, device)
+        _SHARED["key"] = key
+    return _SHARED["tok"], _SHARED["model"], _SHARED["assistant"]
+
+def encode_inputs(model, enc):
+    """Run only the encoder; the result can be passed to generate_from_encoded
+    any number of times (e.g. one encoder pass per paper for a decoding sweep)."""
+    with torch.no_grad():
+        return model.get_encoder()(
+            input_ids=enc["input_ids"], attention_mask=enc["attention_mask"], return_dict=True)
+
+def generate_from_encoded(model, enc, enc_out, gen_kwargs):
+    # generate() expands encoder_outputs in place for beam search, so every
+    # call gets a fresh wrapper around the shared hidden states
+    fresh = BaseModelOutput(last_hidden_state=enc_out.last_hidden_state)
+    with torch.no_grad():
+        return model.generate(encoder_outputs=fresh, attention_mask=enc["attention_mask"], **gen_kwargs)
+
+def plain_generate_seconds(model, enc, gen_kwargs, split_encoder: bool):
+    """Wall time of the same generation without the assistant (speedup baseline)."""
+    t0 = time.perf_counter()
+    if split_encoder:
+        generate_from_encoded(model, enc, encode_inputs(model, enc), gen_kwargs)
+    else:
+        with torch.no_grad():
+            model.generate(**enc, **gen_kwargs)
+    return time.perf_counter() - t0
+
+# (model, assistant) pairs of this process that already had their untimed warm-up
+_WARMED = set()
+
+def summarize_batch(jobs, tok, model, gen_kwargs, device: str, assistant=None, baseline: bool = True):
+    """Run one padded generation over a batch of jobs.
+    Yields (job, summary, stats). Encoder and decoder are timed separately
+    (torch backends), a StepTimer gives time-to-first-token, and the RSS peak
+    is sampled while the batch runs. Batch times are split evenly across its
+    records; ttft_sec is the batch's (all rows get their first token together).
+    With an assistant (one job per batch) the draft's acceptance is counted and,
+    if baseline, the record is also generated without it to time the speedup:
+    before the assisted run for even job indices, after it for odd ones, and
+    after one untimed warm-up of both per model pair, so neither side of the
+    ratio systematically gets the cold (or the warmed-up) run."""
+    with record_function("tokenize"):
+        enc = tok.pad({"input_ids": [j["input_ids"] for j in jobs]}, return_tensors="pt")
+    enc = {k: v.to(device) for k, v in enc.items()}
+    timer = StepTimer()
+    kwargs = dict(gen_kwargs)
+    kwargs["logits_processor"] = LogitsProcessorList(list(gen_kwargs.get("logits_processor") or []) + [timer])
+    split_encoder = isinstance(model, torch.nn.Module)  # not for the ONNX Runtime wrapper
+    base_dt = None
+    baseline_first = baseline and jobs[0]["idx"] % 2 == 0
+    if assistant is not None:
+        # the draft runs its own encoder, so it needs the input ids next to the encoder outputs
+        assist_kwargs = dict(assistant_model=assistant, input_ids=enc["input_ids"])
+        if baseline and (id(model), id(assistant)) not in _WARMED:
+            plain_generate_seconds(model, enc, gen_kwargs, split_encoder)
+            plain_generate_seconds(model, enc, {**gen_kwargs, **assist_kwargs}, split_encoder)
+            _WARMED.add((id(model), id(assistant)))
+        if baseline_first:
+            base_dt = plain_generate_seconds(model, enc, gen_kwargs, split_encoder)
+        kwargs.update(assist_kwargs)
+    counter = AssistCounter(model) if assistant is not None else None
+
+    torch.cuda.reset_peak_memory_stats() if device == "cuda" else None
+    with RssSampler() as rss:
+        t0 = time.perf_counter()
+        if split_encoder:
+            enc_out = encode_inputs(model, enc)
+            t_enc = time.perf_counter()
+            with record_function("generate"), (counter or contextlib.nullcontext()):
+                out_ids = generate_from_encoded(model, enc, enc_out, kwargs)
+        else:
+            with torch.no_grad(), record_function("generate"):
+                out_ids = model.generate(**enc, **kwargs)
+            t_enc = None
+        t1 = time.perf_counter()
+    dt = t1 - t0
+    ttft = (timer.steps[0] - t0) if timer.steps else dt
+    if counter and counter.first:
+        ttft = counter.first - t0
+    max_mem = torch.cuda.max_memory_allocated() if device == "cuda" else 0
+    if assistant is not None and baseline and not baseline_first:
+        base_dt = plain_generate_seconds(model, enc, gen_kwargs, split_encoder)
+    assisted = {}
+    if counter:
+        accepted = counter.accepted(int(out_ids.shape[-1]) - 1)  # minus the decoder start token
+        assisted = {
+            "assistant_model": assistant.name_or_path,
+            "draft_tokens": counter.proposed,
+            "accepted_tokens": accepted,
+            "verify_steps": counter.steps,
+            "acceptance_rate": round(accepted / counter.proposed, 3) if counter.proposed else None,
+            "baseline_time_sec": round(base_dt, 3) if base_dt is not None else None,
+            "speedup": round(base_dt / dt, 2) if base_dt is not None else None,
+        }
+
+    with record_function("detokenize"):
+        summaries = tok.batch_decode(out_ids, skip_special_tokens=True)
+    pad_id = tok.pad_token_id
+    n = len(jobs)
+    for b, job in enumerate(jobs):
+        n_out = output_length(out_ids[b], pad_id)
+        yield job, summaries[b], {
+            "time_sec": round(dt / n, 3),
+            "gpu_mem_bytes": int(max_mem),
+            "peak_rss_bytes": int(rss.peak),
+            "input_tokens": int(enc["attention_mask"][b].sum()),
+            "output_tokens": n_out,
+            "encoder_time_sec": round((t_enc - t0) / n, 3) if t_enc else None,
+            "decoder_time_sec": round((t1 - t_enc) / n, 3) if t_enc else None,
+            "ttft_sec": round(ttft, 3),
+            "output_tokens_per_sec": round(n_out / max(dt / n, 1e-9), 2),
+            **assisted,
+        }
+
+def make_record(job, args, summary: str, stats: dict):
+    r = job["row"]
+    return {
+        "arxiv_id": r.get("arxiv_id"),
+        "title": r.get("title"),
+        "reference_abstract": r.get("abstract"),
+        "generated_summary": summary,
+        "model_name": args.model_name,
+        "backend": args.backend,
+        **stats,
+    }
+
+def run_jobs(jobs, tok, model, args, gen_kwargs, device: str, tag: str = "progress", assistant=None):
+    """Summarize jobs in length-sorted batches; yields (idx, record) in completion order."""
+    batch_size, max_batch_tokens = args.batch_size, args.max_batch_tokens
+    batches = make_batches([len(j["input_ids"]) for j in jobs], batch_size, max_batch_tokens)
+    print(f"[{tag}] {len(jobs)} records -> {len(batches)} batches "
+          f"(batch_size={batch_size}, max_batch_tokens={max_batch_tokens})")
+    session = None
+    if getattr(args, "profile", False):
+        from profiling import ProfileSession, profiled_first  # torch.profiler only when asked for
+        batches, n_profiled = profiled_first([len(j["input_ids"]) for j in jobs], batches, args)
+        print(f"[profile] profiling {n_profiled} batch(es) "
+              f"({sum(map(len, batches[:n_profiled]))} records) before the rest")
+        session = ProfileSession(model, tok, gen_kwargs, args, pick_lengths(args.model_name)[0])
+    n_done = 0
+    t0 = time.time()
+    for bi, batch in enumerate(batches, 1):
+        batch_jobs = [jobs[k] for k in batch]
+        kwargs = gen_kwargs
+        if session:
+            session.tokenize(batch_jobs)
+            kwargs = session.gen_kwargs
+        for job, summary, stats in summarize_batch(batch_jobs, tok, model, kwargs, device, assistant,
+                                                   baseline=not getattr(args, "no_assistant_baseline", False)):
+            yield job["idx"], make_record(job, args, summary, stats)
+        if session and (bi == n_profiled or bi == len(batches)):
+            session.finish()
+            session = None
+        n_done += len(batch)
+        if bi % 5 == 0 or bi == len(batches):
+            elapsed = time.time() - t0
+            print(f"[{tag}] batch {bi}/{len(batches)} | {n_done}/{len(jobs)} done | "
+                  f"{60 * n_done / max(elapsed, 1e-9):.2f} papers/min")
+
+def shard_jobs(jobs, n: int):
+    """Deal length-sorted jobs round-robin so every shard gets a similar token load."""
+    order = sorted(jobs, key=lambda j: (-len(j["input_ids"]), j["idx"]))
+    return [order[k::n] for k in range(n)]
+
+# tokenizer/model loaded by the parent before forking; workers started with
+# fork() inherit them copy-on-write instead of loading their own copy
+_SHARED = {}
+
+def worker_main(k: int, jobs, shard_path: str, args, gen_kwargs, device: str, threads: int, cache_dir):
+    torch.set_num_threads(threads)
+    tok, model, assistant = shared_models(args, device)  # inherited under fork, loaded here under spawn
+    print(f"[worker {k}] {len(jobs)} records, torch threads={torch.get_num_threads()}")
+    keys = {j["idx"]: j["key"] for j in jobs}
+    cache_fh = open_cache_part(cache_dir) if cache_dir else None
+    with RecordWriter(shard_path) as w:
+        for idx, rec in run_jobs(jobs, tok, model, args, gen_kwargs, device, tag=f"worker {k}", assistant=assistant):
+            if cache_fh:
+                append_cache(cache_fh, keys[idx], rec)
+            w.write({"_idx": idx, **rec})
+    if cache_fh:
+        cache_fh.close()
+
+def run_workers(jobs, args, gen_kwargs, device: str, outp: Path, threads: int, cache_dir):
+    """Run one process per shard; returns {idx: record} merged from the shard files."""
+    shards = [s for s in shard_jobs(jobs, args.workers) if s]
+    use_fork = "fork" in mp.get_all_start_methods()
+    ctx = mp.get_context("fork" if use_fork else "spawn")
+    if use_fork:
+        os.environ["TOKENIZERS_PARALLELISM"] = "false"
+        shared_models(args, device)
+    print(f"[info] workers={len(shards)} threads_per_worker={threads} start_method={ctx.get_start_method()}")
+
+    shard_paths = [outp.with_name(f"{outp.name}.shard{k}") for k in range(len(shards))]
+    procs = []
+    for k, shard in enumerate(shards):
+        p = ctx.Process(target=worker_main, args=(
+            k, shard, shard_paths[k].as_posix(), args, gen_kwargs, device, threads, cache_dir))
+        p.start()
+        procs.append(p)
+    for p in procs:
+        p.join()
+    failed = [k for k, p in enumerate(procs) if p.exitcode != 0]
+    if failed:
+        sys.exit(f"[error] worker(s) {failed} failed; finished records are in the cache, shard files in {outp.parent}")
+
+    merged = {}
+    for sp in shard_paths:
+        for rec in load_data(sp):
+            merged[rec.pop("_idx")] = rec
+        sp.unlink()
+    return merged
+
+def generate(jobs, args, gen_kwargs, device: str, outp: Path, threads: int, cache, cache_dir, key_fn, tag: str):
+    """Summaries for jobs: cache hits first, the rest on the worker processes or
+    in this process. Returns ({idx: record}, number generated)."""
+    for job in jobs:
+        job["key"] = key_fn(job)
+    done = {j["idx"]: cache[j["key"]] for j in jobs if j["key"] in cache}
+    todo = [j for j in jobs if j["idx"] not in done]
+    print(f"[{tag}] cache: {len(done)} hits, {len(todo)} to generate"
+          + (f" ({cache_dir})" if cache_dir else " (disabled)"))
+
+    if todo and args.workers > 1:
+        done.update(run_workers(todo, args, gen_kwargs, device, outp, threads, cache_dir))
+    elif todo:
+        if args.threads_per_worker:
+            torch.set_num_threads(threads)
+        tok, model, assistant = shared_models(args, device)
+        cache_fh = open_cache_part(cache_dir) if cache_dir else None
+        keys = {j["idx"]: j["key"] for j in todo}
+        for idx, rec in run_jobs(todo, tok, model, args, gen_kwargs, device, tag=tag, assistant=assistant):
+            if cache_fh:
+                append_cache(cache_fh, keys[idx], rec)
+            done[idx] = rec
+        if cache_fh:
+            cache_fh.close()
+    return done, len(todo)
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--model_name", required=True)
     ap.add_argument("--input", required=True)
     ap.add_argument("--output", required=True)
     ap.add_argument("--batch_size", type=int, default=1)  # keep 1 to keep memory simple/comparable
+    ap.add_argument("--max_batch_tokens", type=int, default=16384,
+                    help="cap on padded input tokens (rows x longest input) per batch")
+    ap.add_argument("--workers", type=int, default=1, help="number of worker processes")
+    ap.add_argument("--threads-per-worker", dest="threads_per_worker", type=int, default=None,
+                    help="torch intra-op threads per process (default: cores / workers)")
+    ap.add_argument("--revision", default=None, help="model revision (branch, tag or commit) to load")
+    ap.add_argument("--cache_dir", default="data/cache/summaries", help="per-record result cache root")
+    ap.add_argument("--no_cache", action="store_true", help="ignore and do not update the result cache")
+    ap.add_argument("--backend", choices=BACKENDS, default="torch", help="inference backend")
+    ap.add_argument("--onnx_dir", default="data/cache/onnx", help="where exported ONNX graphs are kept")
+    ap.add_argument("--profile", action="store_true", help="profile some batches with torch.profiler (implies --no_cache)")
+    ap.add_argument("--profile_batches", type=int, default=2,
+                    help="how many batches to profile, spread evenly from the longest to the shortest")
+    ap.add_argument("--profile_sample", type=int, default=None,
+                    help="profile the batches of this many randomly drawn records instead")
+    ap.add_argument("--profile_seed", type=int, default=0, help="seed of --profile_sample")
+    ap.add_argument("--profile_depth", type=int, default=4, help="label submodules up to this nesting depth")
+    ap.add_argument("--profile_dir", default="profiles", help="root directory for profiler output")
+    ap.add_argument("--chunked", action="store_true",
+                    help="summarize the whole introduction in overlapping windows instead of truncating it")
+    ap.add_argument("--chunk_overlap", type=int, default=64, help="tokens shared by consecutive windows")
+    ap.add_argument("--reduce", action="store_true", help="with --chunked: summarize the joined chunk summaries")
+    ap.add_argument("--assistant_model", default=None,
+                    help="draft model (same tokenizer) for assisted generation; greedy, batch size 1")
+    ap.add_argument("--assistant_revision", default=None, help="revision of --assistant_model")
+    ap.add_argument("--no_assistant_baseline", action="store_true",
+                    help="skip the plain greedy run per record that speedup is measured against")
     args = ap.parse_args()
 
     inp = Path(args.input)
@@ -56,12 +572,15 @@ def main():
 
     device = "cuda" if torch.cuda.is_available() else "cpu"
     print(f"[info] device={device}")
-
-    print(f"[info] loading model: {args.model_name}")
-    tok = AutoTokenizer.from_pretrained(args.model_name, use_fast=True)
-    model = AutoModelForSeq2SeqLM.from_pretrained(args.model_name)
-    model.to(device)
-    model.eval()
+    if args.workers > 1 and device == "cuda":
+        sys.exit("[error] --workers is for CPU inference; run one process per GPU instead")
+    if args.workers > 1 and args.profile:
+        sys.exit("[error] --profile runs in a single process; drop --workers")
+    if args.assistant_model and args.batch_size > 1:
+        sys.exit("[error] assisted generation runs one record at a time; drop --batch_size")
+    if args.assistant_model and args.backend == "onnx":
+        sys.exit("[error] --assistant_model needs a torch backend")
+    threads = args.threads_per_worker or max(1, (os.cpu_count() or 1) // max(1, args.workers))
 
     max_inp, max_out = pick_lengths(args.model_name)
     print(f"[info] token limits: max_input={max_inp}, max_output={max_out}")
@@ -69,61 +588,64 @@ def main():
     rows = load_data(inp)
     print(f"[info] loaded {len(rows)} records from {inp}")
 
-    # generation config (simple, deterministic-ish)
-    gen_kwargs = dict(
-        max_new_tokens=max_out,
-        num_beams=4,
-        length_penalty=1.0,
-        early_stopping=True,
-        no_repeat_ngram_size=3,
-    )
+    gen_kwargs = default_gen_kwargs(max_out)
+    if args.assistant_model:
+        # assisted decoding verifies one greedy continuation; no beams
+        gen_kwargs = dict(max_new_tokens=max_out, num_beams=1, no_repeat_ngram_size=3)
+        print(f"[info] assistant: {args.assistant_model} (greedy, baseline={'off' if args.no_assistant_baseline else 'on'})")
 
-    saved = 0
     t0_all = time.time()
-    with outp.open("w", encoding="utf-8") as w:
-        for i, r in enumerate(rows, 1):
-            intro = (r.get("introduction") or "").strip()
-            if not intro:
-                continue
-
-            text = build_input_text(args.model_name, intro)
-
-            # tokenize with truncation
-            enc = tok(
-                text,
-                max_length=max_inp,
-                truncation=True,
-                return_tensors="pt",
-            )
-            enc = {k: v.to(device) for k,v in enc.items()}
-
-            torch.cuda.reset_peak_memory_stats() if device == "cuda" else None
-            t0 = time.time()
-            with torch.no_grad():
-                out_ids = model.generate(**enc, **gen_kwargs)
-            dt = time.time() - t0
-            max_mem = torch.cuda.max_memory_allocated() if device == "cuda" else 0
-
-            summary = tok.decode(out_ids[0], skip_special_tokens=True)
-
-            rec = {
-                "arxiv_id": r.get("arxiv_id"),
-                "title": r.get("title"),
-                "reference_abstract": r.get("abstract"),
-                "generated_summary": summary,
-                "model_name": args.model_name,
-                "time_sec": round(dt, 3),
-                "gpu_mem_bytes": int(max_mem),
-                "input_tokens": int(enc["input_ids"].shape[-1]),
-                "output_tokens": int(out_ids.shape[-1]),
-            }
-            w.write(json.dumps(rec, ensure_ascii=False) + "\n")
-            saved += 1
-
-            if i % 5 == 0 or i == len(rows):
-                print(f"[progress] {i}/{len(rows)} processed, {saved} saved")
-
-    print(f"[done] wrote {saved} records -> {outp} | total_time={round(time.time()-t0_all,1)}s")
+    tok = AutoTokenizer.from_pretrained(args.model_name, use_fast=True, revision=args.revision)
+    if args.chunked:
+        size = chunk_size(tok, args.model_name, max_inp)
+        if not 0 <= args.chunk_overlap < size:
+            sys.exit(f"[error] --chunk_overlap must be at least 0 and below the {size}-token window "
+                     f"of {args.model_name}, got {args.chunk_overlap}")
+
+    # result cache: entries are keyed by everything that changes the output
+    cache_dir = None if args.no_cache or args.profile else model_cache_dir(Path(args.cache_dir), args.model_name)
+    cache = load_cache(cache_dir) if cache_dir else {}
+    config = AutoConfig.from_pretrained(args.model_name, revision=args.revision)
+    revision = getattr(config, "_commit_hash", None)
+    revision = revision or args.revision or "local"
+    key_gen = gen_kwargs
+    if args.assistant_model:
+        # same summaries as plain greedy, but the records carry the draft's statistics
+        key_gen = dict(gen_kwargs, assistant_model=args.assistant_model, assistant_revision=args.assistant_revision,
+                       assistant_baseline=not args.no_assistant_baseline)
+        assistant_vocab = AutoConfig.from_pretrained(args.assistant_model, revision=args.assistant_revision).vocab_size
+        if assistant_vocab != config.vocab_size:
+            sys.exit("[error] --assistant_model must share the main model's tokenizer (vocabulary sizes differ)")
+    key_fn = lambda job: cache_key(args.model_name, revision, args.backend, key_gen, max_inp, job["text_sha1"])
+    run = (args, gen_kwargs, device, outp, threads, cache, cache_dir, key_fn)
+
+    if args.chunked:
+        chunk_jobs, papers = prepare_chunk_jobs(rows, tok, args.model_name, max_inp, args.chunk_overlap)
+        print(f"[map] {len(papers)} papers -> {len(chunk_jobs)} chunks of <= {max_inp} tokens "
+              f"(overlap {args.chunk_overlap})")
+        chunk_recs, n_gen = generate(chunk_jobs, *run, tag="map")
+        reduced = {}
+        if args.reduce:
+            reduced, n_red = reduce_tree(papers, chunk_recs, tok, args.model_name, max_inp, run)
+            n_gen += n_red
+        out = [merge_chunks(p, args, [chunk_recs[c] for c in p["chunks"]], reduced.get(p["idx"], ())) for p in papers]
+        generated = f"{n_gen} chunk/reduce generations"
+        n_papers = len(out)
+    else:
+        jobs = prepare_jobs(rows, tok, args.model_name, max_inp)
+        done, n_gen = generate(jobs, *run, tag="progress")
+        out = [done[job["idx"]] for job in jobs]
+        generated = f"{n_gen} generated, {len(out) - n_gen} cached"
+        n_papers = n_gen
+
+    # written to a temp file and swapped in, so an interrupted run never
+    # leaves a truncated JSONL behind
+    saved = write_records(outp, out)
+
+    total = time.time() - t0_all
+    print(f"[done] wrote {saved} records ({generated}) -> {outp} | "
+          f"total_time={round(total,1)}s | throughput={n_papers / max(total, 1e-9):.3f} papers/sec "
+          f"(workers={args.workers}, threads_per_worker={threads if args.workers > 1 else torch.get_num_threads()})")
 
 if __name__ == "__main__":
     main()
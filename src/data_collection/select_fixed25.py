@@ -3,44 +3,137 @@
 select_fixed25.py
 Usage:
     python scripts/select_fixed25.py <input_jsonl> <output_jsonl>
-Selects a deterministic set of 25 records from the full dataset.
+    python scripts/select_fixed25.py corpus.jsonl.zst fixed{n}.jsonl --sizes 25 100 --stratify month
+Selects a deterministic sample of records (25 by default) in one streaming pass.
+- Every record gets a priority from a seeded hash of its arxiv_id; the sample
+  of size n is the n lowest priorities (bottom-k sampling), kept in a heap,
+  so memory is O(n) however large the corpus is
+- A record's priority never depends on the other records: appending to the
+  corpus only lets a new record in by pushing out the current highest (of
+  its stratum), and the 25 sample is always contained in the 100 sample
+- --stratify categories|month: one heap per stratum (primary category or
+  published month); seats are dealt to strata one at a time in proportion to
+  their size (Webster), so larger n never takes a seat away from a stratum
+- Output is in selection order: the first 25 lines of a 100 sample are the 25 sample
+- --legacy reproduces the original load, sort and random.shuffle(seed 42)
+  selection used for the report's fixed25.jsonl
 """
 
-import json
+import argparse
+import hashlib
+import heapq
 import random
 import sys
+from collections import Counter
 from pathlib import Path
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python scripts/select_fixed25.py <input_jsonl> <output_jsonl>")
-        sys.exit(1)
+from record_io import iter_records, write_records
+
+STRATA = {
+    "categories": lambda r: (r.get("categories") or ["unknown"])[0],
+    "month": lambda r: str(r.get("published") or "unknown")[:7],
+}
+
+def usable(r) -> bool:
+    # records with both abstract and introduction (should already be all)
+    return bool(r.get("abstract") and r.get("introduction"))
+
+def priority(arxiv_id: str, seed: int) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{seed}:{arxiv_id}".encode("utf-8"), digest_size=8).digest(), "big")
+
+class BottomK:
+    """The k records with the lowest priority seen so far."""
 
-    src = Path(sys.argv[1])
-    dst = Path(sys.argv[2])
+    def __init__(self, k: int):
+        self.k = k
+        self.heap = []   # (-priority, arxiv_id, record): root is the current highest
+        self.ids = set()
 
-    # Load all records
-    rows = []
-    with src.open(encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                rows.append(json.loads(line))
+    def offer(self, prio: int, aid: str, rec):
+        if aid in self.ids:
+            return  # duplicate line for a paper already held
+        item = (-prio, aid, rec)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        elif item > self.heap[0]:
+            self.ids.discard(heapq.heapreplace(self.heap, item)[1])
+        else:
+            return
+        self.ids.add(aid)
 
-    # Keep only records with both abstract and introduction (should already be true)
-    rows = [r for r in rows if r.get("abstract") and r.get("introduction")]
+    def ranked(self):
+        """Held records, lowest priority first."""
+        return [rec for _, _, rec in sorted(self.heap, reverse=True)]
 
+def webster_seats(counts: dict, n: int, held: dict = None):
+    """Stratum of each seat in order: the next seat goes to the stratum with the
+    largest count / (2 * seats + 1) that still has records left. held caps a
+    stratum's seats (records actually kept; counts also include duplicate lines)."""
+    held = held or counts
+    cap = {s: min(counts[s], held.get(s, 0)) for s in counts}
+    seats = Counter()
+    order = []
+    for _ in range(min(n, sum(cap.values()))):
+        s = max((s for s in counts if seats[s] < cap[s]),
+                key=lambda s: (counts[s] / (2 * seats[s] + 1), s))
+        seats[s] += 1
+        order.append(s)
+    return order
+
+def sample(src: Path, n: int, seed: int, stratify=None):
+    """One pass over src; returns (records in selection order, eligible count per stratum)."""
+    key = STRATA[stratify] if stratify else (lambda r: "all")
+    heaps, counts = {}, Counter()
+    for r in iter_records(src):
+        if not usable(r):
+            continue
+        s = key(r)
+        counts[s] += 1
+        if s not in heaps:
+            heaps[s] = BottomK(n)
+        heaps[s].offer(priority(r["arxiv_id"], seed), r["arxiv_id"], r)
+
+    ranked = {s: iter(h.ranked()) for s, h in heaps.items()}
+    held = {s: len(h.heap) for s, h in heaps.items()}
+    return [next(ranked[s]) for s in webster_seats(counts, n, held)], counts
+
+def legacy_sample(src: Path, n: int, seed: int):
+    rows = [r for r in iter_records(src) if usable(r)]
     # Deterministic shuffle: stable seed + stable sort first
     rows.sort(key=lambda r: r["arxiv_id"])
-    random.seed(42)
+    random.seed(seed)
     random.shuffle(rows)
+    return rows[:n]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("input_jsonl")
+    ap.add_argument("output_jsonl", help="with several --sizes, a name containing {n}")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[25], help="sample sizes (nested)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--stratify", choices=list(STRATA), default=None)
+    ap.add_argument("--legacy", action="store_true", help="the original in-memory shuffle")
+    args = ap.parse_args()
 
-    subset = rows[:25]
+    src = Path(args.input_jsonl)
+    if len(args.sizes) > 1 and "{n}" not in args.output_jsonl:
+        sys.exit("[error] several --sizes need an output name containing {n}, e.g. fixed{n}.jsonl")
 
-    with dst.open("w", encoding="utf-8") as w:
-        for r in subset:
-            w.write(json.dumps(r, ensure_ascii=False) + "\n")
+    if args.legacy:
+        if args.stratify:
+            sys.exit("[error] --legacy does not stratify")
+        picked, counts = legacy_sample(src, max(args.sizes), args.seed), None
+    else:
+        picked, counts = sample(src, max(args.sizes), args.seed, args.stratify)
+        if args.stratify:
+            chosen = Counter(STRATA[args.stratify](r) for r in picked)
+            for s in sorted(counts):
+                print(f"  {s}: {chosen[s]} of {counts[s]}")
 
-    print(f"Selected {len(subset)} -> {dst}")
+    for n in sorted(args.sizes):
+        dst = Path(args.output_jsonl.format(n=n))
+        write_records(dst, picked[:n])
+        print(f"Selected {min(n, len(picked))} -> {dst}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+summary_cache.py
+Persistent per-record result cache for run_summary_with_HF_model.py.
+- One directory per model under --cache_dir, holding append-only JSONL parts
+- Each line: {"key": ..., "rec": {...output record...}}
+- Key = sha256 over (model name, model revision, backend, generation config,
+  max input tokens, sha1 of the exact input text), so changing gen_kwargs or
+  pick_lengths only misses the entries that config produced
+- Every append is flushed and fsync'ed; a torn last line from a killed run is
+  ignored on load (parts are read and written through record_io.py)
+"""
+
+import hashlib, json, os, re
+from pathlib import Path
+
+from record_io import RecordWriter, iter_records
+
+
+def text_sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def cache_key(model_name: str, revision: str, backend: str, gen_config: dict, max_input: int, input_sha1: str) -> str:
+    payload = json.dumps(
+        {
+            "model": model_name,
+            "revision": revision,
+            "backend": backend,
+            "gen": gen_config,
+            "max_input": max_input,
+            "input": input_sha1,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def model_cache_dir(cache_root: Path, model_name: str) -> Path:
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name.strip("/"))
+    return cache_root / slug
+
+
+def load_cache(cache_dir: Path) -> dict:
+    """Read every part file in cache_dir into {key: record}; later lines win."""
+    cache = {}
+    if not cache_dir.exists():
+        return cache
+    for part in sorted(cache_dir.glob("*.jsonl")):
+        # skip_bad: torn write from an interrupted run
+        for entry in iter_records(part, skip_bad=True):
+            cache[entry["key"]] = entry["rec"]
+    return cache
+
+
+def open_cache_part(cache_dir: Path):
+    """Open this process's own append-only part file (one per pid, so
+    concurrent workers never interleave writes)."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # a reused pid may find a torn last line; the writer starts on a fresh line
+    return RecordWriter(cache_dir / f"part-{os.getpid()}.jsonl", append=True)
+
+
+def append_cache(fh: RecordWriter, key: str, rec: dict):
+    fh.write({"key": key, "rec": rec})
+    fh.sync()
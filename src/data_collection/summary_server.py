@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+summary_server.py
+Long-running local summarization service: the models are loaded once and
+stay resident, so small jobs do not pay from_pretrained on every run.
+Usage:
+  python src/data_collection/summary_server.py --models t5-large allenai/led-base-16384 --port 8080
+  curl -s localhost:8080/summarize -d '{"model": "t5-large", "text": "..."}'
+  curl -sN localhost:8080/summarize -d '{"model": "t5-large", "text": "...", "stream": true}'
+  curl -s localhost:8080/metrics
+- POST /summarize {"text" (or "introduction"), "model" (default: the first
+  loaded), "stream"}: the summary plus input/output tokens, the batch it ran
+  in and its queue / total latency in ms
+- Requests of one model are collected into micro-batches: a batch closes
+  --batch_window_ms after its first request arrived or at --max_batch
+  requests, and runs in length buckets capped by --max_batch_tokens
+  (make_batches, as in run_summary_with_HF_model.py)
+- Decoding is run_summary's beam search, except for "stream": true, which
+  uses greedy decoding (transformers cannot stream beams) and answers with
+  NDJSON lines, {"token": "..."} as the text grows and a final
+  {"done": true, ...} line with the same fields as the plain reply
+- Beam and streaming requests queue separately (two lanes per model); the
+  lanes take turns on the model. A lane holds at most --max_queue waiting
+  requests; beyond that POST /summarize answers 503 at once
+- GET /metrics: per model and lane, queue depth, request / batch / error /
+  rejected counts, batch size histogram and mean, and p50/p90/p99 of total
+  latency, queue wait and (streaming) time to first token over the last
+  METRIC_SAMPLES requests. GET /health lists the loaded models.
+Load-test it with bench_summary_server.py.
+"""
+
+import argparse, json, queue, threading, time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import torch
+from transformers.generation.streamers import BaseStreamer
+
+from cpu_backends import BACKENDS
+from run_summary_with_HF_model import (
+    build_input_text, default_gen_kwargs, load_model, make_batches, pick_lengths, summarize_batch,
+)
+
+METRIC_SAMPLES = 4096   # latencies kept per lane for the percentiles
+
+
+class Pending:
+    """One request waiting in a lane; the handler thread reads .events."""
+
+    def __init__(self, text: str, stream: bool):
+        self.text = text
+        self.stream = stream
+        self.events = queue.Queue()  # ("token", str) ... then ("done", dict) or ("error", str)
+        self.answered = False        # its "done" event is out
+        self.t_arrive = time.perf_counter()
+        self.t_start = self.t_first = None
+
+
+class BatchStreamer(BaseStreamer):
+    """Streams the growing text of every row of a batch to its request.
+    Only the part of the decoded text that is already stable (the new text
+    still starts with what was sent) goes out, so sub-word merges never
+    rewrite a sent token."""
+
+    def __init__(self, tok, reqs):
+        self.tok = tok
+        self.reqs = reqs
+        self.ids = [[] for _ in reqs]
+        self.sent = [""] * len(reqs)
+        self.prompt = True
+
+    def put(self, value):
+        if self.prompt:  # the decoder start tokens
+            self.prompt = False
+            return
+        rows = value.reshape(len(self.reqs), -1).tolist()
+        for b, req in enumerate(self.reqs):
+            self.ids[b].extend(rows[b])
+            text = self.tok.decode(self.ids[b], skip_special_tokens=True)
+            if len(text) > len(self.sent[b]) and text.startswith(self.sent[b]):
+                if req.t_first is None:
+                    req.t_first = time.perf_counter()
+                req.events.put(("token", text[len(self.sent[b]):]))
+                self.sent[b] = text
+
+    def end(self):
+        pass
+
+
+class LaneMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = self.batches = self.errors = self.rejected = 0
+        self.batch_sizes = Counter()
+        self.latency = deque(maxlen=METRIC_SAMPLES)
+        self.wait = deque(maxlen=METRIC_SAMPLES)
+        self.ttft = deque(maxlen=METRIC_SAMPLES)
+
+    def record_batch(self, reqs, t_done: float):
+        with self.lock:
+            self.batches += 1
+            self.requests += len(reqs)
+            self.batch_sizes[len(reqs)] += 1
+            for r in reqs:
+                self.latency.append(t_done - r.t_arrive)
+                self.wait.append(r.t_start - r.t_arrive)
+                if r.t_first is not None:
+                    self.ttft.append(r.t_first - r.t_arrive)
+
+    def record_error(self, n: int):
+        with self.lock:
+            self.errors += n
+
+    def record_rejected(self):
+        with self.lock:
+            self.rejected += 1
+
+    @staticmethod
+    def percentiles_ms(values):
+        if not values:
+            return None
+        p = np.percentile(np.fromiter(values, dtype=float), [50, 90, 99]) * 1000
+        return {"p50": round(float(p[0]), 1), "p90": round(float(p[1]), 1), "p99": round(float(p[2]), 1)}
+
+    def snapshot(self, queue_depth: int):
+        with self.lock:
+            return {
+                "queue_depth": queue_depth,
+                "requests": self.requests,
+                "batches": self.batches,
+                "errors": self.errors,
+                "rejected": self.rejected,
+                "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else None,
+                "batch_size_histogram": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+                "latency_ms": self.percentiles_ms(self.latency),
+                "queue_wait_ms": self.percentiles_ms(self.wait),
+                "ttft_ms": self.percentiles_ms(self.ttft),
+            }
+
+
+class Lane:
+    """Micro-batching queue of one model and decoding mode, served by one thread."""
+
+    def __init__(self, entry, gen_kwargs, stream: bool, args):
+        self.entry = entry
+        self.gen_kwargs = gen_kwargs
+        self.stream = stream
+        self.window = args.batch_window_ms / 1000.0
+        self.max_batch = args.max_batch
+        self.max_batch_tokens = args.max_batch_tokens
+        self.device = args.device
+        self.queue = queue.Queue(maxsize=args.max_queue)
+        self.metrics = LaneMetrics()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, req: Pending) -> bool:
+        """Queue req; False (and nothing queued) when the lane is full."""
+        try:
+            self.queue.put_nowait(req)
+        except queue.Full:
+            self.metrics.record_rejected()
+            return False
+        return True
+
+    def _collect(self):
+        """First request (blocking), then whatever arrives within the window of
+        its arrival; requests already queued join even if the window is over."""
+        batch = [self.queue.get()]
+        deadline = batch[0].t_arrive + self.window
+        while len(batch) < self.max_batch:
+            wait = deadline - time.perf_counter()
+            try:
+                batch.append(self.queue.get(timeout=wait) if wait > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._run(batch)
+            except Exception as e:  # keep serving; the requests still waiting get the error
+                waiting = [r for r in batch if not r.answered]
+                self.metrics.record_error(len(waiting))
+                for r in waiting:
+                    r.events.put(("error", f"{type(e).__name__}: {e}"))
+
+    def _run(self, batch):
+        e = self.entry
+        with e["lock"]:  # the other lane of this model waits; tokenizer state is shared too
+            t_start = time.perf_counter()
+            for r in batch:
+                r.t_start = t_start
+            jobs = [{"idx": i, "req": r,
+                     "input_ids": e["tok"](build_input_text(e["name"], r.text), max_length=e["max_inp"],
+                                           truncation=True)["input_ids"]}
+                    for i, r in enumerate(batch)]
+            for group in make_batches([len(j["input_ids"]) for j in jobs], self.max_batch, self.max_batch_tokens):
+                group_jobs = [jobs[k] for k in group]
+                kwargs = self.gen_kwargs
+                if self.stream:
+                    kwargs = dict(kwargs, streamer=BatchStreamer(e["tok"], [j["req"] for j in group_jobs]))
+                done = []
+                for job, summary, stats in summarize_batch(group_jobs, e["tok"], e["model"], kwargs, self.device):
+                    done.append((job["req"], summary, stats))
+                t_done = time.perf_counter()
+                for r, summary, stats in done:
+                    r.answered = True
+                    r.events.put(("done", {
+                        "summary": summary,
+                        "model": e["name"],
+                        "input_tokens": stats["input_tokens"],
+                        "output_tokens": stats["output_tokens"],
+                        "batch_size": len(group_jobs),
+                        "queue_ms": round((r.t_start - r.t_arrive) * 1000, 1),
+                        "latency_ms": round((t_done - r.t_arrive) * 1000, 1),
+                    }))
+                self.metrics.record_batch([r for r, _, _ in done], t_done)
+
+
+def load_models(args):
+    """{model name: {"name", "tok", "model", "lock", "max_inp", "lanes": {"beam", "stream"}}}"""
+    models = {}
+    for name in args.models:
+        margs = argparse.Namespace(model_name=name, backend=args.backend, revision=None, onnx_dir=args.onnx_dir)
+        tok, model = load_model(margs, args.device)
+        max_inp, max_out = pick_lengths(name)
+        beam = default_gen_kwargs(max_out)
+        greedy = dict(max_new_tokens=max_out, num_beams=1, no_repeat_ngram_size=beam["no_repeat_ngram_size"])
+        entry = {"name": name, "tok": tok, "model": model, "lock": threading.Lock(), "max_inp": max_inp}
+        # one short generation so the first real request does not pay for lazy initialisation
+        warm = tok(build_input_text(name, "warm up"), return_tensors="pt")
+        with torch.no_grad():
+            model.generate(input_ids=warm["input_ids"].to(args.device),
+                           attention_mask=warm["attention_mask"].to(args.device), max_new_tokens=2)
+        entry["lanes"] = {"beam": Lane(entry, beam, False, args), "stream": Lane(entry, greedy, True, args)}
+        models[name] = entry
+    return models
+
+
+def make_handler(models, default_model: str):
+    t_boot = time.time()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass  # one line per request would drown the console under load
+
+        def _send_json(self, code: int, obj):
+            body = json.dumps(obj).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                return self._send_json(200, {
+                    "uptime_sec": round(time.time() - t_boot, 1),
+                    "models": {name: {lane_name: lane.metrics.snapshot(lane.queue.qsize())
+                                      for lane_name, lane in e["lanes"].items()}
+                               for name, e in models.items()},
+                })
+            if self.path == "/health":
+                return self._send_json(200, {"status": "ok", "models": list(models)})
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/summarize":
+                return self._send_json(404, {"error": f"unknown path {self.path}"})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            except ValueError:
+                return self._send_json(400, {"error": "body is not JSON"})
+            text = (body.get("text") or body.get("introduction") or "").strip()
+            name = body.get("model") or default_model
+            if not text:
+                return self._send_json(400, {"error": "missing text"})
+            if name not in models:
+                return self._send_json(404, {"error": f"model {name} is not loaded", "models": list(models)})
+
+            stream = bool(body.get("stream"))
+            req = Pending(text, stream)
+            if not models[name]["lanes"]["stream" if stream else "beam"].submit(req):
+                return self._send_json(503, {"error": f"queue of {name} is full, retry later"})
+            if not stream:
+                kind, payload = req.events.get()
+                return self._send_json(200 if kind == "done" else 500,
+                                       payload if kind == "done" else {"error": payload})
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            try:
+                while True:
+                    kind, payload = req.events.get()
+                    line = {"token": payload} if kind == "token" else (
+                        {"done": True, **payload} if kind == "done" else {"error": payload})
+                    self.wfile.write(json.dumps(line).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+                    if kind != "token":
+                        break
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client went away; its row finishes with the rest of the batch
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--models", nargs="+", required=True, help="models kept resident (first is the default)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--batch_window_ms", type=float, default=20,
+                    help="how long a batch waits for more requests after its first one arrived")
+    ap.add_argument("--max_batch", type=int, default=8, help="requests per micro-batch")
+    ap.add_argument("--max_batch_tokens", type=int, default=16384,
+                    help="cap on padded input tokens (rows x longest input) per generate call")
+    ap.add_argument("--max_queue", type=int, default=256,
+                    help="waiting requests per lane before POST /summarize answers 503 (0: unbounded)")
+    ap.add_argument("--backend", choices=BACKENDS, default="torch", help="inference backend")
+    ap.add_argument("--onnx_dir", default="data/cache/onnx", help="where exported ONNX graphs are kept")
+    ap.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    args = ap.parse_args()
+
+    args.device = "cuda" if torch.cuda.is_available() else "cpu"
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    t0 = time.time()
+    models = load_models(args)
+    print(f"[info] device={args.device} | {len(models)} model(s) resident after {time.time() - t0:.1f}s | "
+          f"batch_window_ms={args.batch_window_ms} max_batch={args.max_batch} max_queue={args.max_queue}")
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(models, args.models[0]))
+    server.daemon_threads = True
+    print(f"[info] serving on http://{args.host}:{args.port} (POST /summarize, GET /metrics, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
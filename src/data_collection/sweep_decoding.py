@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+sweep_decoding.py
+Latency/quality sweep over decoding configs for one model.
+Usage:
+  python src/data_collection/sweep_decoding.py --model_name allenai/led-base-16384 \
+    --input data/processed/fixed25.jsonl --output_prefix led_sweep \
+    --num_beams 1 2 4 --max_new_tokens 64 128 256 --no_repeat_ngram_size 0 3
+- The encoder runs once per paper; every grid point decodes from the same
+  encoder output, so a 4096-token LED input is not re-encoded per config
+- latency of a config = encoder time + its decode time (what a real run pays)
+Writes:
+  <prefix>_generations.jsonl  one line per (paper, config)
+  <prefix>_pareto.csv         mean/p95 latency vs ROUGE-L and BERTScore F1,
+                              with the non-dominated configs flagged
+"""
+
+import argparse, itertools, time
+from pathlib import Path
+
+import pandas as pd
+import torch
+import evaluate
+
+from record_io import RecordWriter
+from run_summary_with_HF_model import (
+    load_data, pick_lengths, prepare_jobs, load_model, encode_inputs, generate_from_encoded,
+)
+
+
+def build_grid(args, max_out: int):
+    grid = []
+    for beams, new_tok, ngram in itertools.product(
+        args.num_beams, args.max_new_tokens or [max_out], args.no_repeat_ngram_size
+    ):
+        cfg = dict(max_new_tokens=new_tok, num_beams=beams, length_penalty=1.0,
+                   early_stopping=beams > 1, no_repeat_ngram_size=ngram)
+        grid.append((f"beams={beams},max_new={new_tok},ngram={ngram}", cfg))
+    return grid
+
+
+def pareto_front(df: pd.DataFrame):
+    """True for configs no other config beats on latency and both quality metrics."""
+    flags = []
+    for _, r in df.iterrows():
+        dominated = (
+            (df["Mean_Latency_sec"] <= r["Mean_Latency_sec"])
+            & (df["ROUGE_L"] >= r["ROUGE_L"])
+            & (df["BERTScore_F1"] >= r["BERTScore_F1"])
+            & (
+                (df["Mean_Latency_sec"] < r["Mean_Latency_sec"])
+                | (df["ROUGE_L"] > r["ROUGE_L"])
+                | (df["BERTScore_F1"] > r["BERTScore_F1"])
+            )
+        ).any()
+        flags.append(not dominated)
+    return flags
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model_name", required=True)
+    ap.add_argument("--input", required=True)
+    ap.add_argument("--output_prefix", required=True)
+    ap.add_argument("--num_beams", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--max_new_tokens", type=int, nargs="+", default=None,
+                    help="default: the model's pick_lengths output budget")
+    ap.add_argument("--no_repeat_ngram_size", type=int, nargs="+", default=[0, 3])
+    ap.add_argument("--revision", default=None)
+    ap.add_argument("--backend", choices=("torch", "torch-int8"), default="torch")
+    args = ap.parse_args()
+    args.onnx_dir = None
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    tok, model = load_model(args, device)
+    max_inp, max_out = pick_lengths(args.model_name)
+    grid = build_grid(args, max_out)
+    jobs = prepare_jobs(load_data(Path(args.input)), tok, args.model_name, max_inp)
+    print(f"[info] {len(jobs)} papers x {len(grid)} decoding configs")
+
+    gen_path = Path(f"{args.output_prefix}_generations.jsonl")
+    rows = []
+    with RecordWriter(gen_path) as w:
+        for i, job in enumerate(jobs, 1):
+            enc = tok.pad({"input_ids": [job["input_ids"]]}, return_tensors="pt")
+            enc = {k: v.to(device) for k, v in enc.items()}
+            t0 = time.time()
+            enc_out = encode_inputs(model, enc)
+            enc_time = time.time() - t0
+
+            for name, cfg in grid:
+                t0 = time.time()
+                out_ids = generate_from_encoded(model, enc, enc_out, cfg)
+                dec_time = time.time() - t0
+                rec = {
+                    "arxiv_id": job["row"].get("arxiv_id"),
+                    "config": name,
+                    **cfg,
+                    "reference_abstract": job["row"].get("abstract"),
+                    "generated_summary": tok.decode(out_ids[0], skip_special_tokens=True),
+                    "encoder_time_sec": round(enc_time, 3),
+                    "decode_time_sec": round(dec_time, 3),
+                    "time_sec": round(enc_time + dec_time, 3),
+                    "output_tokens": int(out_ids.shape[-1]),
+                }
+                rows.append(rec)
+                w.write(rec)
+            print(f"[progress] {i}/{len(jobs)} papers")
+
+    # quality per config, scored the same way as the main evaluation scripts
+    rouge = evaluate.load("rouge")
+    bertscore = evaluate.load("bertscore")
+    gens = pd.DataFrame(rows)
+    table = []
+    for name, cfg in grid:
+        g = gens[gens["config"] == name]
+        refs, cands = g["reference_abstract"].tolist(), g["generated_summary"].tolist()
+        rl = rouge.compute(predictions=cands, references=refs, use_stemmer=True)["rougeL"]
+        f1 = bertscore.compute(predictions=cands, references=refs, lang="en")["f1"]
+        table.append({
+            "Config": name,
+            "Mean_Latency_sec": round(float(g["time_sec"].mean()), 3),
+            "P95_Latency_sec": round(float(g["time_sec"].quantile(0.95)), 3),
+            "Avg_Output_Tokens": round(float(g["output_tokens"].mean()), 1),
+            "ROUGE_L": round(rl * 100, 2),
+            "BERTScore_F1": round(sum(f1) / len(f1) * 100, 2),
+        })
+    table = pd.DataFrame(table)
+    table["Pareto"] = pareto_front(table)
+    table = table.sort_values("Mean_Latency_sec").set_index("Config")
+
+    print("\nDecoding sweep (encoder output reused across configs):")
+    print(table)
+    table.to_csv(f"{args.output_prefix}_pareto.csv", encoding="utf-8")
+    print(f"[done] {gen_path} | {args.output_prefix}_pareto.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,75 +1,168 @@
-import json
+"""
+Join any number of model output files on arxiv_id and save one table per model.
+Usage:
+    python src/df_build_and_save_15.py
+    python src/df_build_and_save_15.py --inputs LED=led_cpu_25.jsonl PEGASUS=pegasus_cpu_25.jsonl \
+        T5=t5_large_cpu_test.jsonl BART=bart_cpu_25.jsonl --limit 0
+- Streams the files: one pass per file indexes arxiv_id -> byte offset, then
+  the first file is walked in order and the matching records of the other
+  files are read back by offset, so only one paper is held in memory at a time
+- Inner join: a paper is kept only if every model has it and passes the filters
+  (by default more than --min_overlap words shared with the reference)
+- Keeps the first --limit papers (0 = all), written in batches as typed
+  Parquet (<label>_table_<limit>.parquet) plus the CSV the scripts always used
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-# Load JSONL helper 
-def load_jsonl(path):
-    records = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            records.append(json.loads(line.strip()))
-    return records
+sys.path.insert(0, str(Path(__file__).resolve().parent / "data_collection"))
+from near_dup import word_set
+from record_io import compression_of, loads
 
-# Load the three model files 
-led_records = load_jsonl("led_cpu_25.jsonl")
-pegasus_records = load_jsonl("pegasus_cpu_25.jsonl")
-t5_records = load_jsonl("t5_large_cpu_test.jsonl")
+DEFAULT_INPUTS = {"LED": "led_cpu_25.jsonl", "PEGASUS": "pegasus_cpu_25.jsonl", "T5": "t5_large_cpu_test.jsonl"}
+BATCH_ROWS = 1000
 
-# Build dicts by arxiv_id 
-led_dict = {rec["arxiv_id"]: rec for rec in led_records}
-pegasus_dict = {rec["arxiv_id"]: rec for rec in pegasus_records}
-t5_dict = {rec["arxiv_id"]: rec for rec in t5_records}
+# Column types; the last block is CPU instrumentation, chunked-mode and
+# assisted-generation counters, present in runs from the newer summarizer and
+# only written when the input file has them
+BASE_SCHEMA = [
+    ("arxiv_id", pa.string()),
+    ("title", pa.string()),
+    ("reference_abstract", pa.string()),
+    ("generated_summary", pa.string()),
+    ("model_name", pa.string()),
+    ("time_sec", pa.float64()),
+    ("gpu_mem_bytes", pa.int64()),
+    ("input_tokens", pa.int64()),
+    ("output_tokens", pa.int64()),
+]
+OPTIONAL_SCHEMA = [
+    ("backend", pa.string()),
+    ("peak_rss_bytes", pa.int64()),
+    ("encoder_time_sec", pa.float64()),
+    ("decoder_time_sec", pa.float64()),
+    ("ttft_sec", pa.float64()),
+    ("output_tokens_per_sec", pa.float64()),
+    ("chunks", pa.int64()),             # --chunked runs
+    ("map_time_sec", pa.float64()),
+    ("reduce_time_sec", pa.float64()),
+    ("reduce_jobs", pa.int64()),
+    ("assistant_model", pa.string()),   # --assistant_model runs
+    ("acceptance_rate", pa.float64()),
+    ("baseline_time_sec", pa.float64()),
+    ("speedup", pa.float64()),
+]
+OPTIONAL_COLS = [name for name, _ in OPTIONAL_SCHEMA]
 
-# Helper to compute word overlap
+# Helper to compute word overlap (word sets are memoized, so a reference is
+# split once for all the models compared against it)
 def compute_overlap(ref, text):
-    return len(set(ref.lower().split()) & set(text.lower().split()))
-
-# Find consistent papers across all 3 models
-consistent_papers = []
-for rec in led_records:
-    aid = rec["arxiv_id"]
-    if aid in pegasus_dict and aid in t5_dict:
-        ref = rec["reference_abstract"]
-        led_overlap = compute_overlap(ref, rec["generated_summary"])
-        peg_overlap = compute_overlap(ref, pegasus_dict[aid]["generated_summary"])
-        t5_overlap = compute_overlap(ref, t5_dict[aid]["generated_summary"])
-        if led_overlap > 5 and peg_overlap > 5 and t5_overlap > 5:
-            consistent_papers.append(aid)
-
-# Select the first 15 (exact same as I showed you before) 
-top15_ids = consistent_papers[:15]
-
-# Build DataFrame function 
-def build_table(records_dict, ids):
-    rows = []
-    for aid in ids:
-        rec = records_dict[aid]
-        rows.append({
-            "arxiv_id": rec["arxiv_id"],
-            "title": rec["title"],
-            "reference_abstract": rec["reference_abstract"],
-            "generated_summary": rec["generated_summary"],
-            "model_name": rec["model_name"],
-            "time_sec": rec["time_sec"],
-            "gpu_mem_bytes": rec["gpu_mem_bytes"],
-            "input_tokens": rec["input_tokens"],
-            "output_tokens": rec["output_tokens"]
-        })
-    return pd.DataFrame(rows)
-
-# Build the three DataFrames 
-led_table_full = build_table(led_dict, top15_ids)
-pegasus_table_full = build_table(pegasus_dict, top15_ids)
-t5_table_full = build_table(t5_dict, top15_ids)
-
-# Now you can inspect them in VS Code 
-print("LED table:\n", led_table_full.head(), "\n")
-print("Pegasus table:\n", pegasus_table_full.head(), "\n")
-print("T5 table:\n", t5_table_full.head(), "\n")
-
-# ---- SAVE THE 15-PAPER TABLES AS CSV ----
-led_table_full.to_csv("led_table_15.csv", index=False, encoding="utf-8")
-pegasus_table_full.to_csv("pegasus_table_15.csv", index=False, encoding="utf-8")
-t5_table_full.to_csv("t5_table_15.csv", index=False, encoding="utf-8")
-
-# (Optional) Save the exact list of arxiv_ids used for reproducibility
-pd.Series(top15_ids, name="arxiv_id").to_csv("top15_ids.csv", index=False, encoding="utf-8")
+    return len(word_set(ref) & word_set(text))
+
+def index_jsonl(path):
+    """One streaming pass: {arxiv_id: byte offset of its (last) record},
+    ids in first-seen order, and the optional columns the file carries."""
+    offsets, order, optional = {}, [], set()
+    if compression_of(path) != "none":
+        sys.exit(f"[error] {path}: the join reads records back by byte offset; decompress it first")
+    with open(path, "rb") as f:
+        pos = 0
+        for line in f:
+            if line.strip():
+                rec = loads(line)
+                aid = rec["arxiv_id"]
+                if aid not in offsets:
+                    order.append(aid)
+                offsets[aid] = pos
+                optional.update(c for c in OPTIONAL_COLS if c in rec)
+            pos += len(line)
+    return offsets, order, optional
+
+def read_at(f, offset):
+    f.seek(offset)
+    return loads(f.readline())
+
+def keep_paper(ref, recs, args):
+    """Filters every model's record must pass for the paper to be kept."""
+    return all(compute_overlap(ref, r["generated_summary"]) > args.min_overlap for r in recs)
+
+class TableWriter:
+    """Buffers rows of one model and flushes them as Parquet row groups and CSV chunks."""
+
+    def __init__(self, name, optional):
+        cols = BASE_SCHEMA + [(c, t) for c, t in OPTIONAL_SCHEMA if c in optional]
+        self.schema = pa.schema(cols)
+        self.csv_path = f"{name}.csv"
+        self.parquet = pq.ParquetWriter(f"{name}.parquet", self.schema)
+        self.rows, self.header = [], True
+
+    def add(self, rec):
+        self.rows.append({c: rec.get(c) for c in self.schema.names})
+        if len(self.rows) >= BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        self.parquet.write_table(pa.Table.from_pylist(self.rows, schema=self.schema))
+        pd.DataFrame(self.rows, columns=self.schema.names).to_csv(
+            self.csv_path, mode="w" if self.header else "a", header=self.header, index=False, encoding="utf-8")
+        self.rows, self.header = [], False
+
+    def close(self):
+        self.flush()
+        self.parquet.close()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--inputs", nargs="+", default=[f"{k}={v}" for k, v in DEFAULT_INPUTS.items()],
+                    help="LABEL=outputs.jsonl per model; the first one sets the paper order")
+    ap.add_argument("--min_overlap", type=int, default=5,
+                    help="keep papers whose summaries share more than this many words with the reference")
+    ap.add_argument("--limit", type=int, default=15, help="first N consistent papers (0 = all)")
+    args = ap.parse_args()
+
+    inputs = dict(spec.split("=", 1) for spec in args.inputs)
+    labels = list(inputs)
+    indexes = {label: index_jsonl(path) for label, path in inputs.items()}
+    for label in labels:
+        print(f"[index] {label}: {len(indexes[label][0])} papers in {inputs[label]}")
+
+    suffix = args.limit if args.limit else "all"
+    writers = {label: TableWriter(f"{label.lower()}_table_{suffix}", indexes[label][2]) for label in labels}
+    files = {label: open(path, "rb") for label, path in inputs.items()}
+    kept = []
+    try:
+        driver = labels[0]
+        for aid in indexes[driver][1]:
+            if not all(aid in indexes[label][0] for label in labels[1:]):
+                continue
+            recs = [read_at(files[label], indexes[label][0][aid]) for label in labels]
+            if not keep_paper(recs[0]["reference_abstract"], recs, args):
+                continue
+            for label, rec in zip(labels, recs):
+                writers[label].add(rec)
+            kept.append(aid)
+            if args.limit and len(kept) >= args.limit:
+                break
+    finally:
+        for f in files.values():
+            f.close()
+        for w in writers.values():
+            w.close()
+
+    print(f"[done] {len(kept)} consistent papers across {', '.join(labels)}")
+    for label in labels:
+        print(f"  {writers[label].csv_path} / {os.path.splitext(writers[label].csv_path)[0]}.parquet")
+
+    # Save the exact list of arxiv_ids used for reproducibility
+    pd.Series(kept, name="arxiv_id").to_csv(f"top{suffix}_ids.csv", index=False, encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Persistent sentence-embedding cache shared by the Top-K metric scripts.
+One directory per embedding model under CACHE_ROOT holding:
+  vectors.f32   row-major float32 matrix (n x dim), append-only, memory-mapped
+  index.tsv     "<sha1 of normalized sentence>\t<row>" per line
+  meta.json     embedding model name and dimension
+Sentences are normalized (whitespace collapsed) before hashing and encoding,
+so a sentence repeated across models, papers or runs is embedded once.
+Vectors are written and fsync'ed before their index lines, so an interrupted
+run never leaves an index entry pointing at a missing row.
+"""
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+
+CACHE_ROOT = Path("data/cache/embeddings")
+
+def normalize_sentence(text: str) -> str:
+    return " ".join(text.split())
+
+def sentence_key(text: str) -> str:
+    return hashlib.sha1(normalize_sentence(text).encode("utf-8")).hexdigest()
+
+class EmbeddingStore:
+    """
+    store = EmbeddingStore("sentence-transformers/all-MiniLM-L6-v2", load_embedder)
+    vecs = store.encode(sentences)  # (len(sentences), dim) unit-norm float32
+    load_embedder is only called when a sentence is missing from the store.
+    """
+
+    def __init__(self, model_name: str, load_embedder, cache_root: Path = CACHE_ROOT):
+        self.model_name = model_name
+        self.load_embedder = load_embedder
+        self.embedder = None
+        self.dir = Path(cache_root) / re.sub(r"[^A-Za-z0-9._-]+", "_", model_name.strip("/"))
+        self.vec_path = self.dir / "vectors.f32"
+        self.index_path = self.dir / "index.tsv"
+        self.meta_path = self.dir / "meta.json"
+        self.index = {}
+        self.dim = None
+        self.rows = 0
+        self.matrix = None
+        self.encoded = 0  # sentences actually sent to the embedder this run
+        self._load()
+
+    def _load(self):
+        if not self.meta_path.exists():
+            return
+        meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        if meta["model"] != self.model_name:
+            raise ValueError(f"{self.dir} holds embeddings of {meta['model']}, not {self.model_name}")
+        self.dim = int(meta["dim"])
+        self.rows = self.vec_path.stat().st_size // (4 * self.dim) if self.vec_path.exists() else 0
+        if self.index_path.exists():
+            with self.index_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    key, _, row = line.rstrip("\n").partition("\t")
+                    if row.isdigit() and int(row) < self.rows:
+                        self.index[key] = int(row)
+        self._map()
+
+    def _map(self):
+        self.matrix = (np.memmap(self.vec_path, dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+                       if self.rows else None)
+
+    def __len__(self):
+        return len(self.index)
+
+    def _append(self, keys, vecs):
+        vecs = np.ascontiguousarray(vecs, dtype=np.float32)
+        if self.dim is None:
+            self.dim = int(vecs.shape[1])
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self.meta_path.write_text(json.dumps({"model": self.model_name, "dim": self.dim}), encoding="utf-8")
+        with self.vec_path.open("ab") as f:
+            # drop a partial row left by an interrupted write
+            f.truncate(self.rows * 4 * self.dim)
+            f.write(vecs.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with self.index_path.open("a", encoding="utf-8") as f:
+            for i, key in enumerate(keys):
+                self.index[key] = self.rows + i
+                f.write(f"{key}\t{self.rows + i}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.rows += len(keys)
+        self._map()
+
+    def encode(self, sentences):
+        """Embeddings for sentences, encoding (in one batch) only those not stored yet."""
+        keys = [sentence_key(s) for s in sentences]
+        missing = {}
+        for key, s in zip(keys, sentences):
+            if key not in self.index and key not in missing:
+                missing[key] = normalize_sentence(s)
+        if missing:
+            if self.embedder is None:
+                self.embedder = self.load_embedder()
+            vecs = self.embedder.encode(list(missing.values()), convert_to_numpy=True,
+                                        normalize_embeddings=True)
+            self._append(list(missing), vecs)
+            self.encoded += len(missing)
+        if not keys:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self.matrix[[self.index[k] for k in keys]])
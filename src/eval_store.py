@@ -0,0 +1,68 @@
+"""
+Persistent per-cell result store for run_evaluation.py (SQLite).
+One row per (arxiv_id, model, metric) holding the value, the version of the
+metric that produced it and a hash of the inputs it was computed from; a
+cell is stale when either no longer matches and is recomputed on the next run.
+"""
+import hashlib
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+STORE_PATH = Path("data/cache/eval_results.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    arxiv_id   TEXT NOT NULL,
+    model      TEXT NOT NULL,
+    metric     TEXT NOT NULL,
+    version    TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    value      REAL,
+    PRIMARY KEY (arxiv_id, model, metric)
+)
+"""
+
+def input_hash(*values) -> str:
+    h = hashlib.sha1()
+    for v in values:
+        h.update(str(v).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+class ResultStore:
+    def __init__(self, path: Path = STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(SCHEMA)
+
+    def fresh(self, metrics, version: str) -> set:
+        """(arxiv_id, model, input_hash) for which every one of metrics is stored at version."""
+        marks = ",".join("?" * len(metrics))
+        cur = self.db.execute(
+            f"SELECT arxiv_id, model, input_hash FROM results "
+            f"WHERE metric IN ({marks}) AND version = ? "
+            f"GROUP BY arxiv_id, model, input_hash HAVING COUNT(*) = ?",
+            (*metrics, version, len(metrics)),
+        )
+        return set(cur.fetchall())
+
+    def put(self, rows):
+        """rows: (arxiv_id, model, metric, version, input_hash, value)."""
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def table(self, model: str, metrics) -> pd.DataFrame:
+        """Stored values for one model, one column per metric, indexed by arxiv_id."""
+        marks = ",".join("?" * len(metrics))
+        df = pd.read_sql_query(
+            f"SELECT arxiv_id, metric, value FROM results WHERE model = ? AND metric IN ({marks})",
+            self.db, params=(model, *metrics),
+        )
+        return df.pivot(index="arxiv_id", columns="metric", values="value").reindex(columns=list(metrics))
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,172 @@
+"""
+Local ROUGE engine; reproduces the rouge_score package (what evaluate.load("rouge")
+wraps) for rouge1 / rouge2 / rougeL / rougeLsum with use_stemmer=True.
+- Tokenization: lowercase, non-alphanumerics to spaces, Porter-stem tokens
+  longer than 3 characters; every word is stemmed once per process and each
+  reference is tokenized once, however many models are scored against it
+- n-gram overlap from Counters, as rouge_score does
+- rougeL: LCS length by bit-parallel row updates (one big-int step per
+  reference token instead of a Python loop per table cell)
+- rougeLsum: per-sentence LCS tables built a row at a time with NumPy, then
+  rouge_score's backtrack, so the union-LCS hits match exactly
+- Papers are spread over a process pool (spawned, so it is safe to start
+  from a thread while others run torch, as run_evaluation.py does)
+Per-paper precision/recall/F1 come back as DataFrames; aggregate() takes the
+plain mean, which is what evaluate's bootstrap "mid" estimates.
+"""
+import multiprocessing as mp
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from nltk.stem import porter
+
+ROUGE_TYPES = ("rouge1", "rouge2", "rougeL", "rougeLsum")
+NON_ALPHANUM_RE = re.compile(r"[^a-z0-9]+")
+VALID_TOKEN_RE = re.compile(r"^[a-z0-9]+$")
+INLINE_BELOW = 64  # papers; smaller jobs are not worth starting a pool
+
+_stemmer = porter.PorterStemmer()
+_stems = {}
+
+def stem(word: str) -> str:
+    s = _stems.get(word)
+    if s is None:
+        s = _stems[word] = _stemmer.stem(word) if len(word) > 3 else word
+    return s
+
+def tokenize(text: str):
+    tokens = re.split(r"\s+", NON_ALPHANUM_RE.sub(" ", text.lower()))
+    return [t for t in (stem(x) for x in tokens) if VALID_TOKEN_RE.match(t)]
+
+def fmeasure(precision, recall):
+    return 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+
+def ngrams(tokens, n):
+    return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+def score_ngrams(ref_ngrams: Counter, cand_ngrams: Counter):
+    overlap = sum(min(c, cand_ngrams[g]) for g, c in ref_ngrams.items())
+    precision = overlap / max(sum(cand_ngrams.values()), 1)
+    recall = overlap / max(sum(ref_ngrams.values()), 1)
+    return precision, recall, fmeasure(precision, recall)
+
+def lcs_length(ref, cand) -> int:
+    """Bit-parallel LCS length (Allison-Dix / Hyyro): bit j of S tracks column j of the table."""
+    n = len(cand)
+    full = (1 << n) - 1
+    masks = {}
+    for j, tok in enumerate(cand):
+        masks[tok] = masks.get(tok, 0) | (1 << j)
+    S = full
+    for tok in ref:
+        U = S & masks.get(tok, 0)
+        S = ((S + U) | (S - U)) & full
+    return n - bin(S).count("1")
+
+def score_lcs(ref, cand):
+    if not ref or not cand:
+        return 0.0, 0.0, 0.0
+    lcs = lcs_length(ref, cand)
+    precision, recall = lcs / len(cand), lcs / len(ref)
+    return precision, recall, fmeasure(precision, recall)
+
+def lcs_table(ref, cand):
+    """Full LCS table, one NumPy row at a time:
+    T[i] = running max over j of max(T[i-1][j], T[i-1][j-1] + 1 where tokens match)."""
+    eq = np.array(ref, dtype=object)[:, None] == np.array(cand, dtype=object)[None, :]
+    T = np.zeros((len(ref) + 1, len(cand) + 1), dtype=np.int32)
+    for i in range(1, len(ref) + 1):
+        prev = T[i - 1]
+        T[i, 1:] = np.maximum.accumulate(np.maximum(prev[1:], np.where(eq[i - 1], prev[:-1] + 1, 0)))
+    return T.tolist()
+
+def lcs_indices(ref, cand):
+    """Reference positions of one LCS, picked with rouge_score's tie-breaking."""
+    t = lcs_table(ref, cand)
+    i, j, out = len(ref), len(cand), []
+    while i > 0 and j > 0:
+        if ref[i - 1] == cand[j - 1]:
+            out.append(i - 1)
+            i -= 1
+            j -= 1
+        elif t[i][j - 1] > t[i - 1][j]:
+            j -= 1
+        else:
+            i -= 1
+    return out
+
+def score_lcs_summary(ref_sents, cand_sents):
+    """Summary-level LCS (rougeLsum) over newline-separated sentences."""
+    m = sum(map(len, ref_sents))
+    n = sum(map(len, cand_sents))
+    if not ref_sents or not cand_sents or not m or not n:
+        return 0.0, 0.0, 0.0
+    cnt_r, cnt_c = Counter(), Counter()
+    for s in ref_sents:
+        cnt_r.update(s)
+    for s in cand_sents:
+        cnt_c.update(s)
+    hits = 0
+    for r in ref_sents:
+        union = sorted(set().union(*(lcs_indices(r, c) for c in cand_sents if r and c)))
+        for tok in (r[i] for i in union):
+            if cnt_c[tok] > 0 and cnt_r[tok] > 0:
+                hits += 1
+                cnt_c[tok] -= 1
+                cnt_r[tok] -= 1
+    precision, recall = hits / n, hits / m
+    return precision, recall, fmeasure(precision, recall)
+
+class Text:
+    """Everything ROUGE needs from one text, computed once."""
+
+    def __init__(self, text: str):
+        text = text if isinstance(text, str) else ""
+        self.tokens = tokenize(text)
+        self.grams = {1: ngrams(self.tokens, 1), 2: ngrams(self.tokens, 2)}
+        self.sents = [tokenize(s) for s in text.split("\n") if len(s)]
+
+def score_text_pair(ref: Text, cand: Text) -> dict:
+    scores = {
+        "rouge1": score_ngrams(ref.grams[1], cand.grams[1]),
+        "rouge2": score_ngrams(ref.grams[2], cand.grams[2]),
+        "rougeL": score_lcs(ref.tokens, cand.tokens),
+        "rougeLsum": score_lcs_summary(ref.sents, cand.sents),
+    }
+    return {f"{t}_{part}": v for t, s in scores.items()
+            for part, v in zip(("precision", "recall", "fmeasure"), s)}
+
+def score_paper(args):
+    """One reference against the candidates of every model (pool task)."""
+    ref, cands = args
+    ref = Text(ref)
+    return [score_text_pair(ref, Text(c)) for c in cands]
+
+def score_tasks(tasks, workers=None):
+    """[(reference, [candidate, ...]), ...] -> per task, one score dict per candidate."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) < INLINE_BELOW:
+        return [score_paper(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        return list(pool.map(score_paper, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+def score_models(refs, cands_by_model: dict, workers=None) -> dict:
+    """
+    refs: reference per paper; cands_by_model: {model: candidate per paper}.
+    Returns {model: per-paper DataFrame of <type>_precision/_recall/_fmeasure}.
+    """
+    models = list(cands_by_model)
+    tasks = [(ref, [cands_by_model[mdl][i] for mdl in models]) for i, ref in enumerate(refs)]
+    results = score_tasks(tasks, workers)
+    return {mdl: pd.DataFrame([r[k] for r in results]) for k, mdl in enumerate(models)}
+
+def score_pairs(refs, cands, workers=None) -> pd.DataFrame:
+    return score_models(refs, {"_": cands}, workers)["_"]
+
+def aggregate(per_paper: pd.DataFrame) -> dict:
+    """Mean F1 per ROUGE type, as evaluate's rouge.compute reports it (fractions)."""
+    return {t: float(per_paper[f"{t}_fmeasure"].mean()) for t in ROUGE_TYPES}
@@ -0,0 +1,187 @@
+"""
+One incremental evaluation pass over every model table.
+Usage (from the folder holding the *_table_15.csv files):
+    python src/run_evaluation.py
+    python src/run_evaluation.py --inputs LED=led_table_15.csv PEGASUS=pegasus_table_15.csv \
+        T5=t5_table_15.csv BART=bart_table_15.csv --metrics rouge topk
+- The tables are read once; every registered metric (ROUGE, BERTScore,
+  Top-K, efficiency) looks up which (arxiv_id, model) cells it already has
+  in the result store (eval_store.py) for its current version and inputs,
+  and computes only the missing or stale ones
+- Metrics with pending work run concurrently (ROUGE additionally on its own
+  process pool); a new summarizer or new papers only cost their own cells
+- The usual per-paper CSVs, summary CSVs and figures are then written from the
+  store: rouge_*, bertscore_*, topk_*, efficiency_summary.csv
+Bump a metric's version below when its implementation changes.
+"""
+import argparse
+import os
+import runpy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from eval_store import ResultStore, STORE_PATH, input_hash
+from table_io import read_table
+
+SRC = Path(__file__).resolve().parent
+DEFAULT_INPUTS = {"LED": "led_table_15.csv", "PEGASUS": "pegasus_table_15.csv", "T5": "t5_table_15.csv"}
+TEXT_COLS = ["reference_abstract", "generated_summary"]
+ROUGE_FIELDS = [f"{t}_{p}" for t in ("rouge1", "rouge2", "rougeL", "rougeLsum")
+                for p in ("precision", "recall", "fmeasure")]
+EFFICIENCY_FIELDS = ["time_sec", "gpu_mem_bytes", "input_tokens", "output_tokens",
+                     "peak_rss_bytes", "encoder_time_sec", "decoder_time_sec", "ttft_sec",
+                     "chunks", "map_time_sec", "reduce_time_sec", "acceptance_rate", "baseline_time_sec"]
+
+_LOAD_LOCK = threading.Lock()
+
+def load_serially(fn, *args):
+    """Model loading is not thread-safe (from_pretrained swaps torch's global
+    default device while it builds the model), so metric threads take turns."""
+    with _LOAD_LOCK:
+        return fn(*args)
+
+# --------- Metrics: each takes the pending rows, returns a frame of its fields ---------
+def rouge_metric(df, args):
+    from rouge_engine import score_tasks
+    # one task per paper, so each reference is tokenized once for all its models
+    groups = list(df.groupby("arxiv_id", sort=False))
+    results = score_tasks([(g["reference_abstract"].iloc[0], g["generated_summary"].tolist())
+                           for _, g in groups], args.workers)
+    index = [i for _, g in groups for i in g.index]
+    return pd.DataFrame([s for scores in results for s in scores], index=index)
+
+def bertscore_metric(df, args):
+    from Compute_BERTScore_on_your_15 import BATCH_SIZE, make_scorer
+    P, R, F = load_serially(make_scorer).score(df["generated_summary"].tolist(), df["reference_abstract"].tolist(),
+                                  batch_size=BATCH_SIZE)
+    return pd.DataFrame({"precision": P.tolist(), "recall": R.tolist(), "f1": F.tolist()}, index=df.index)
+
+def topk_metric(df, args):
+    from sentence_transformers import SentenceTransformer
+    from embedding_store import EmbeddingStore
+    from Compute_TopK_Cumulative_on_your_15 import EMBED_MODEL, topk_means
+    store = EmbeddingStore(EMBED_MODEL, lambda: load_serially(SentenceTransformer, EMBED_MODEL))
+    scores, m, n, k = topk_means(df["reference_abstract"].tolist(), df["generated_summary"].tolist(), store)
+    return pd.DataFrame({"paper_score_topk_mean": [float(x) for x in scores],
+                         "ref_sent_count_m": m, "gen_sent_count_n": n, "k_min_mn": k}, index=df.index)
+
+def efficiency_metric(df, args):
+    # measured at generation time; stored so the summary comes from the same place
+    return pd.DataFrame({c: pd.to_numeric(df[c], errors="coerce") if c in df else None
+                         for c in EFFICIENCY_FIELDS}, index=df.index)
+
+# name -> (version, fields, input columns hashed for staleness, function)
+METRICS = {
+    "rouge": ("1", ROUGE_FIELDS, TEXT_COLS, rouge_metric),
+    "bertscore": ("1", ["precision", "recall", "f1"], TEXT_COLS, bertscore_metric),
+    "topk": ("1", ["paper_score_topk_mean", "ref_sent_count_m", "gen_sent_count_n", "k_min_mn"],
+             TEXT_COLS, topk_metric),
+    "efficiency": ("1", EFFICIENCY_FIELDS, EFFICIENCY_FIELDS, efficiency_metric),
+}
+
+# --------- Reports ---------
+def write_reports(store, tables, metrics):
+    per_model = {name: {label: store.table(label, [f"{name}.{f}" for f in METRICS[name][1]])
+                        .rename(columns=lambda c: c.split(".", 1)[1])
+                        .reindex(df["arxiv_id"])
+                        for label, df in tables.items()}
+                 for name in metrics}
+
+    if "rouge" in per_model:
+        rows = {}
+        for label, d in per_model["rouge"].items():
+            d.reset_index().to_csv(f"rouge_per_paper_{label}.csv", index=False, encoding="utf-8")
+            rows[label] = {t: round(d[f"{t}_fmeasure"].mean() * 100, 2)
+                           for t in ("rouge1", "rouge2", "rougeL", "rougeLsum")}
+        pd.DataFrame(rows).T.to_csv("rouge_summary.csv", index=True, encoding="utf-8")
+
+    if "bertscore" in per_model:
+        rows = {}
+        for label, d in per_model["bertscore"].items():
+            d.reset_index().to_csv(f"bertscore_per_paper_{label}.csv", index=False, encoding="utf-8")
+            rows[label] = {c: round(d[c].mean() * 100, 2) for c in ("precision", "recall", "f1")}
+        pd.DataFrame(rows).T.to_csv("bertscore_summary.csv", encoding="utf-8")
+
+    if "topk" in per_model:
+        sums = {}
+        for label, d in per_model["topk"].items():
+            out = tables[label][["arxiv_id", "title"]].copy()
+            out["paper_score_topk_mean"] = d["paper_score_topk_mean"].values
+            for c in ("ref_sent_count_m", "gen_sent_count_n", "k_min_mn"):
+                out[c] = d[c].values.astype(int)
+            out["model"] = label
+            out.to_csv(f"topk_per_paper_{label}.csv", index=False, encoding="utf-8")
+            sums[label] = float(out["paper_score_topk_mean"].sum())
+        pd.DataFrame({"TopK_cumulative_sum": sums}).round(4).to_csv("topk_summary.csv", encoding="utf-8")
+
+    if "efficiency" in per_model:
+        from Compute_Efficiency_Summary import summarize
+        rows = {label: summarize(d.dropna(axis=1, how="all")) for label, d in per_model["efficiency"].items()}
+        pd.DataFrame(rows).T.to_csv("efficiency_summary.csv", encoding="utf-8")
+
+def render_plots(metrics):
+    import matplotlib
+    matplotlib.use("Agg")  # the plot scripts call plt.show(); keep it headless
+    for name, script in (("rouge", "rouge_summary_plot.py"), ("bertscore", "bertscore_summary_plot.py"),
+                         ("topk", "topk_summary_plot.py")):
+        if name in metrics:
+            runpy.run_path(str(SRC / script), run_name="__main__")
+
+# --------- Main ---------
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--inputs", nargs="+", default=[f"{k}={v}" for k, v in DEFAULT_INPUTS.items()],
+                    help="LABEL=table.csv for every model to evaluate")
+    ap.add_argument("--metrics", nargs="+", choices=list(METRICS), default=list(METRICS))
+    ap.add_argument("--store", default=str(STORE_PATH))
+    ap.add_argument("--workers", type=int, default=os.cpu_count(), help="ROUGE process pool size")
+    ap.add_argument("--force", action="store_true", help="recompute every cell")
+    ap.add_argument("--no_plots", action="store_true")
+    args = ap.parse_args()
+
+    tables = {}
+    for spec in args.inputs:
+        label, _, path = spec.partition("=")
+        tables[label] = read_table(path, ["arxiv_id", "title"] + TEXT_COLS + EFFICIENCY_FIELDS)
+    rows = pd.concat([df.assign(model=label) for label, df in tables.items()], ignore_index=True)
+    store = ResultStore(Path(args.store))
+
+    pending = {}
+    for name in args.metrics:
+        version, fields, cols, _ = METRICS[name]
+        keys = [f"{name}.{f}" for f in fields]
+        hashes = [input_hash(*vals) for vals in
+                  zip(*(rows[c] if c in rows else [None] * len(rows) for c in cols))]
+        rows_h = rows.assign(_hash=hashes)
+        fresh = set() if args.force else store.fresh(keys, version)
+        todo = rows_h[[(a, m, h) not in fresh for a, m, h in zip(rows_h["arxiv_id"], rows_h["model"], hashes)]]
+        print(f"[{name}] v{version}: {len(todo)} of {len(rows)} cells to compute")
+        if len(todo):
+            pending[name] = todo
+
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+        futures = {pool.submit(METRICS[name][3], todo, args): name for name, todo in pending.items()}
+        for fut in as_completed(futures):
+            name = futures[fut]
+            version, fields = METRICS[name][:2]
+            todo, out = pending[name], fut.result()
+            store.put([
+                (a, m, f"{name}.{f}", version, h, None if pd.isna(v) else float(v))
+                for a, m, h, (_, r) in zip(todo["arxiv_id"], todo["model"], todo["_hash"], out.loc[todo.index].iterrows())
+                for f, v in zip(fields, r[fields])
+            ])
+            print(f"[{name}] stored {len(todo)} cells ({time.time() - t0:.1f}s)")
+
+    write_reports(store, tables, args.metrics)
+    store.close()
+    if not args.no_plots:
+        render_plots(args.metrics)
+    print(f"[done] reports written for {', '.join(args.metrics)} | store={args.store}")
+
+if __name__ == "__main__":
+    main()
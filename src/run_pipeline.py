@@ -0,0 +1,496 @@
+"""
+One streaming pass from the arXiv feed to scored summaries.
+Usage:
+    python src/run_pipeline.py --models allenai/led-base-16384 google/pegasus-xsum t5-large --limit 25
+    python src/run_pipeline.py --fixture data/processed/fixed25.jsonl --pdf_latency_ms 300 \
+        --models data/cache/tiny/tiny-t5-target data/cache/tiny/tiny-led-target --no_cache
+    ... --sequential    (the same stages one after another, as the separate scripts run)
+Stages run on their own threads and pass records through bounded queues
+(--queue_size), so a full queue blocks its producer (backpressure):
+    feed -> download -> extract -> summarize:<LABEL> (one per model) -> score
+- feed: arXiv API results for --query (collect_arxiv.QUERY), or the records
+  of a --fixture JSONL, rendered to PDFs and served by fixture_pdf_server.py
+  on a local port (offline)
+- download (--download_workers threads, collect_arxiv's rate limiter and
+  retry backoff) and extract (--extract_workers, collect_arxiv's cached lazy
+  extractor on a process pool); records with abstract and introduction go on
+- summarize:<LABEL>: each model stays loaded for the whole run and takes up
+  to --batch_size records that arrive within --batch_window_ms into one
+  length-bucketed batch (run_summary_with_HF_model.summarize_batch, same
+  result cache); the models take turns on the device, one batch at a time,
+  so they overlap the I/O stages rather than each other
+- score: ROUGE per summary (rouge_engine.py), stored in the evaluation store
+  so run_evaluation.py does not recompute them
+Every --report_s seconds one line of per-stage counts and queue depths; at
+the end a per-stage table (throughput, utilization, mean/max queue depth,
+time blocked on a full queue or starved on an empty one, first output).
+Writes to --out_dir: corpus.jsonl, <label>_summaries.jsonl (run_summary
+format, for df_build_and_save_15.py), scores.csv and pipeline_metrics.csv.
+"""
+import argparse
+import itertools
+import multiprocessing as mp
+import queue
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "data_collection"))
+from record_io import RecordWriter, iter_records
+
+DONE = object()  # end-of-stream marker, one per consumer worker
+
+
+# --------- Stage runtime ---------
+class Stage:
+    """Workers that take items (or batches) from a bounded input queue, apply
+    fn(state, items) and put every output on each downstream stage's queue.
+    setup() builds state once per stage, on the first worker that needs it;
+    teardown(state) runs when the last worker has finished. A stage without
+    upstream is a source: fn(state) yields the items."""
+
+    def __init__(self, name, fn, workers=1, batch=1, window_s=0.0, setup=None, teardown=None, queue_size=0):
+        self.name, self.fn, self.workers = name, fn, workers
+        self.batch, self.window_s = batch, window_s
+        self.setup, self.teardown = setup, teardown
+        self.inq = queue.Queue(maxsize=queue_size)
+        self.queue_size = queue_size
+        self.downstream, self.producers = [], 0
+        self.lock = threading.Lock()
+        self.state, self.state_ready, self.setup_failed = None, False, False
+        self.closed = self.live = 0
+        self.threads = []
+        # metrics
+        self.n_in = self.n_out = self.errors = 0
+        self.busy = self.blocked = self.starved = 0.0
+        self.first_out = self.t_done = None
+        self.depth_samples = []
+
+    def feeds(self, *stages):
+        for s in stages:
+            self.downstream.append(s)
+            s.producers += 1
+        return self
+
+    def start(self, t0):
+        self.t0 = t0
+        self.live = self.workers
+        self.threads = [threading.Thread(target=self._work, name=f"{self.name}-{k}", daemon=True)
+                        for k in range(self.workers)]
+        for t in self.threads:
+            t.start()
+
+    def join(self):
+        for t in self.threads:
+            t.join()
+
+    def _state(self):
+        """(state, ok); a failed setup is reported once and leaves the stage
+        draining its input, so the stages around it still finish."""
+        with self.lock:
+            if not self.state_ready:
+                self.state_ready = True
+                try:
+                    self.state = self.setup() if self.setup else None
+                except Exception as e:
+                    print(f"[{self.name}] setup failed: {type(e).__name__}: {e}")
+                    self.errors += 1
+                    self.setup_failed = True
+            return self.state, not self.setup_failed
+
+    def _producer_done(self):
+        with self.lock:
+            self.closed += 1
+            last = self.closed == self.producers
+        if last:
+            for _ in range(self.workers):
+                self.inq.put(DONE)
+
+    def _emit(self, outputs):
+        for item in outputs:
+            t = time.perf_counter()
+            for s in self.downstream:
+                s.inq.put(item)
+            now = time.perf_counter()
+            with self.lock:
+                self.blocked += now - t
+                self.n_out += 1
+                if self.first_out is None:
+                    self.first_out = now - self.t0
+
+    def _take(self):
+        """(items, last): the next item, plus whatever else arrives within
+        window_s, up to batch; last=True once this worker's DONE was taken."""
+        t = time.perf_counter()
+        item = self.inq.get()
+        with self.lock:
+            self.starved += time.perf_counter() - t
+        if item is DONE:
+            return [], True
+        items = [item]
+        deadline = time.perf_counter() + self.window_s
+        while len(items) < self.batch:
+            wait = deadline - time.perf_counter()
+            try:
+                item = self.inq.get(timeout=wait) if wait > 0 else self.inq.get_nowait()
+            except queue.Empty:
+                break
+            if item is DONE:
+                return items, True
+            items.append(item)
+        return items, False
+
+    def _run(self, fn, *args):
+        t = time.perf_counter()
+        try:
+            outputs = list(fn(*args))
+        except Exception as e:
+            print(f"[{self.name}] error: {type(e).__name__}: {e}")
+            with self.lock:
+                self.errors += 1
+            outputs = []
+        with self.lock:
+            self.busy += time.perf_counter() - t
+        return outputs
+
+    def _work(self):
+        state, ok = self._state()
+        fn = self.fn if ok else (lambda state, items: [])
+        if not self.producers:  # source: the generator's own time counts as busy
+            it = iter(fn(state) if ok else ())
+            while True:
+                out = self._run(lambda: list(itertools.islice(it, 1)))
+                if not out:
+                    break
+                self._emit(out)
+        else:
+            while True:
+                items, last = self._take()
+                if items:
+                    with self.lock:
+                        self.n_in += len(items)
+                    self._emit(self._run(fn, state, items))
+                if last:
+                    break
+        with self.lock:
+            self.live -= 1
+            finished = self.live == 0
+        if finished:
+            if self.teardown and ok:
+                self.teardown(state)
+            self.t_done = time.perf_counter() - self.t0
+            for s in self.downstream:
+                s._producer_done()
+
+    def metrics(self, wall: float) -> dict:
+        span = (self.t_done or wall) - (self.first_out or 0)
+        depth = self.depth_samples or [0]
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "items_in": self.n_in,
+            "items_out": self.n_out,
+            "errors": self.errors,
+            "busy_sec": round(self.busy, 2),
+            "utilization_pct": round(100 * self.busy / max(wall * self.workers, 1e-9), 1),
+            "out_per_sec": round(self.n_out / span, 3) if self.n_out and span > 0 else None,
+            "queue_cap": self.queue_size or None,
+            "queue_mean": round(sum(depth) / len(depth), 2),
+            "queue_max": max(depth),
+            "blocked_put_sec": round(self.blocked, 2),
+            "starved_sec": round(self.starved, 2),
+            "first_out_sec": round(self.first_out, 2) if self.first_out is not None else None,
+            "done_sec": round(self.t_done, 2) if self.t_done is not None else None,
+        }
+
+
+def monitor(stages, t0, stop: threading.Event, report_s: float):
+    """Samples queue depths every 0.1s and prints a progress line every report_s."""
+    next_report = time.perf_counter() + report_s
+    while not stop.wait(0.1):
+        for s in stages:
+            if s.producers:
+                s.depth_samples.append(s.inq.qsize())
+        if time.perf_counter() >= next_report:
+            next_report += report_s
+            parts = [f"{s.name} {s.n_out}" + (f" (q {s.inq.qsize()}/{s.queue_size or 'inf'})" if s.producers else "")
+                     for s in stages]
+            print(f"[t={time.perf_counter() - t0:.1f}s] " + " | ".join(parts))
+
+
+def run_stages(stages, sequential: bool, report_s: float):
+    """Run all stages overlapped, or (sequential) each to completion before the
+    next starts. Returns the wall time."""
+    t0 = time.perf_counter()
+    stop = threading.Event()
+    mon = threading.Thread(target=monitor, args=(stages, t0, stop, report_s), daemon=True)
+    mon.start()
+    if sequential:
+        for s in stages:
+            s.start(t0)
+            s.join()
+    else:
+        for s in stages:
+            s.start(t0)
+        for s in stages:
+            s.join()
+    stop.set()
+    mon.join()
+    return time.perf_counter() - t0
+
+
+# --------- Stage functions ---------
+def family_label(model_name: str) -> str:
+    name = model_name.lower()
+    for family in ("led", "pegasus", "t5", "bart"):
+        if family in name:
+            return family.upper()
+    return Path(model_name.rstrip("/")).name.upper()
+
+
+def feed_stage(args, pdf_dir: Path, base_url):
+    import collect_arxiv as ca
+
+    def records():
+        if args.fixture:
+            for r in itertools.islice(iter_records(args.fixture), args.limit):
+                time.sleep(args.feed_delay_ms / 1000.0)  # stands in for API paging
+                yield {"arxiv_id": r["arxiv_id"], "title": r.get("title"), "abstract": r.get("abstract"),
+                       "introduction": None, "pdf_path": (pdf_dir / f"{r['arxiv_id']}.pdf").as_posix(),
+                       "published": r.get("published"), "categories": r.get("categories"),
+                       "_url": f"{base_url}/pdf/{r['arxiv_id']}.pdf"}
+            return
+        import arxiv
+        search = arxiv.Search(query=args.query, sort_by=arxiv.SortCriterion.SubmittedDate,
+                              sort_order=arxiv.SortOrder.Descending, max_results=args.limit)
+        client = arxiv.Client(page_size=min(args.limit, ca.PAGE_SIZE_MAX), delay_seconds=ca.API_DELAY_S, num_retries=5)
+        for paper in client.results(search):
+            arxiv_id = paper.entry_id.split("/")[-1]
+            yield {"arxiv_id": arxiv_id, "title": paper.title, "abstract": paper.summary, "introduction": None,
+                   "pdf_path": (pdf_dir / f"{arxiv_id}.pdf").as_posix(), "published": str(paper.published),
+                   "categories": paper.categories, "_url": ca.pdf_url_for(paper.pdf_url, arxiv_id)}
+
+    return Stage("feed", lambda state: records())
+
+
+def download_stage(args):
+    import collect_arxiv as ca
+
+    def setup():
+        return {"session": ca.make_session(args.download_workers), "limiter": ca.RateLimiter(ca.PDF_RATE_PER_S)}
+
+    def fn(st, recs):
+        for rec in recs:
+            for attempt in range(1, ca.PDF_RETRIES + 1):
+                try:
+                    err = ca.download_pdf(rec["_url"], Path(rec["pdf_path"]), st["session"], st["limiter"])
+                except Exception as e:
+                    err = f"error: {e}"
+                if err is None:
+                    yield rec
+                    break
+                print(f"[download {rec['arxiv_id']}] attempt {attempt}/{ca.PDF_RETRIES} {err}")
+                if attempt < ca.PDF_RETRIES:
+                    time.sleep(min(ca.PDF_BACKOFF_MAX, ca.PDF_RETRY_SLEEP * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0))
+
+    return Stage("download", fn, workers=args.download_workers, setup=setup,
+                 teardown=lambda st: st["session"].close(), queue_size=args.queue_size)
+
+
+def extract_stage(args, pool, out_dir: Path):
+    import collect_arxiv as ca
+
+    def setup():
+        return {"writer": RecordWriter(out_dir / "corpus.jsonl"), "lock": threading.Lock()}
+
+    def fn(st, recs):
+        for rec in recs:
+            res = pool.submit(ca.extract_pdf, rec["pdf_path"]).result()
+            rec = {k: v for k, v in rec.items() if not k.startswith("_")}
+            rec["introduction"] = res["introduction"]
+            if rec["abstract"] and rec["introduction"]:
+                with st["lock"]:
+                    st["writer"].write(rec)
+                yield rec
+
+    return Stage("extract", fn, workers=args.extract_workers, setup=setup,
+                 teardown=lambda st: st["writer"].close(), queue_size=args.queue_size)
+
+
+def summarize_stage(args, model_name: str, label: str, device: str, device_lock):
+    from transformers import AutoConfig
+    from run_summary_with_HF_model import (
+        default_gen_kwargs, load_model, make_batches, make_record, pick_lengths, prepare_jobs, summarize_batch,
+    )
+    from summary_cache import append_cache, cache_key, load_cache, model_cache_dir, open_cache_part
+    from run_evaluation import load_serially
+
+    margs = argparse.Namespace(model_name=model_name, backend=args.backend, revision=None, onnx_dir=args.onnx_dir)
+
+    def setup():
+        tok, model = load_serially(load_model, margs, device)
+        max_inp, max_out = pick_lengths(model_name)
+        gen_kwargs = default_gen_kwargs(max_out)
+        revision = getattr(load_serially(AutoConfig.from_pretrained, model_name), "_commit_hash", None) or "local"
+        cache_dir = None if args.no_cache else model_cache_dir(Path(args.cache_dir), model_name)
+        return {"tok": tok, "model": model, "max_inp": max_inp, "gen_kwargs": gen_kwargs,
+                "cache": load_cache(cache_dir) if cache_dir else {},
+                "cache_fh": open_cache_part(cache_dir) if cache_dir else None,
+                "key": lambda job: cache_key(model_name, revision, args.backend, gen_kwargs, max_inp, job["text_sha1"])}
+
+    def fn(st, recs):
+        jobs = prepare_jobs(recs, st["tok"], model_name, st["max_inp"])
+        todo = []
+        for job in jobs:
+            job["key"] = st["key"](job)
+            if job["key"] in st["cache"]:
+                yield label, st["cache"][job["key"]]
+            else:
+                todo.append(job)
+        for group in make_batches([len(j["input_ids"]) for j in todo], args.batch_size, args.max_batch_tokens):
+            batch = [todo[k] for k in group]
+            with device_lock:
+                done = list(summarize_batch(batch, st["tok"], st["model"], st["gen_kwargs"], device))
+            for job, summary, stats in done:
+                rec = make_record(job, margs, summary, stats)
+                if st["cache_fh"]:
+                    append_cache(st["cache_fh"], job["key"], rec)
+                yield label, rec
+
+    def teardown(st):
+        if st["cache_fh"]:
+            st["cache_fh"].close()
+
+    return Stage(f"summarize:{label}", fn, batch=args.batch_size, window_s=args.batch_window_ms / 1000.0,
+                 setup=setup, teardown=teardown, queue_size=args.queue_size)
+
+
+def score_stage(args, labels, out_dir: Path):
+    from eval_store import ResultStore, input_hash
+    from rouge_engine import Text, score_text_pair
+    from run_evaluation import METRICS, ROUGE_FIELDS
+
+    version = METRICS["rouge"][0]
+
+    def setup():
+        # the store's SQLite connection belongs to this stage's (single) thread
+        return {"writers": {l: RecordWriter(out_dir / f"{l.lower()}_summaries.jsonl") for l in labels},
+                "store": None if args.no_store else ResultStore(Path(args.store)),
+                "refs": {}, "rows": []}
+
+    def fn(st, items):
+        cells = []
+        for label, rec in items:
+            st["writers"][label].write(rec)
+            ref, cand = rec["reference_abstract"] or "", rec["generated_summary"] or ""
+            if rec["arxiv_id"] not in st["refs"]:
+                st["refs"][rec["arxiv_id"]] = Text(ref)
+            scores = score_text_pair(st["refs"][rec["arxiv_id"]], Text(cand))
+            st["rows"].append({"arxiv_id": rec["arxiv_id"], "model": label, **scores, "time_sec": rec["time_sec"]})
+            h = input_hash(ref, cand)
+            cells += [(rec["arxiv_id"], label, f"rouge.{f}", version, h, float(scores[f])) for f in ROUGE_FIELDS]
+            yield label, rec["arxiv_id"]
+        if st["store"] and cells:
+            st["store"].put(cells)
+
+    def teardown(st):
+        for w in st["writers"].values():
+            w.close()
+        if st["store"]:
+            st["store"].close()
+        pd.DataFrame(st["rows"]).to_csv(out_dir / "scores.csv", index=False, encoding="utf-8")
+
+    return Stage("score", fn, batch=16, setup=setup, teardown=teardown, queue_size=args.queue_size)
+
+
+# --------- Main ---------
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--models", nargs="+", required=True)
+    ap.add_argument("--labels", nargs="+", default=None, help="one per model (default: LED / PEGASUS / T5 by name)")
+    ap.add_argument("--fixture", default=None, help="offline: JSONL of papers served as a local arXiv stand-in")
+    ap.add_argument("--query", default=None, help="arXiv query (default: collect_arxiv.QUERY)")
+    ap.add_argument("--limit", type=int, default=25, help="papers taken from the feed")
+    ap.add_argument("--feed_delay_ms", type=float, default=0, help="fixture: pause before each paper")
+    ap.add_argument("--pdf_latency_ms", type=float, default=0, help="fixture: PDF server response time")
+    ap.add_argument("--download_workers", type=int, default=4)
+    ap.add_argument("--extract_workers", type=int, default=2)
+    ap.add_argument("--batch_size", type=int, default=4, help="records per summarize batch")
+    ap.add_argument("--batch_window_ms", type=float, default=200, help="wait for a fuller batch")
+    ap.add_argument("--max_batch_tokens", type=int, default=16384)
+    ap.add_argument("--queue_size", type=int, default=8, help="capacity of every inter-stage queue")
+    ap.add_argument("--sequential", action="store_true", help="run each stage to completion before the next")
+    ap.add_argument("--backend", default="torch")
+    ap.add_argument("--onnx_dir", default="data/cache/onnx")
+    ap.add_argument("--threads", type=int, default=None, help="torch intra-op threads (shared by all models)")
+    ap.add_argument("--cache_dir", default="data/cache/summaries")
+    ap.add_argument("--no_cache", action="store_true")
+    ap.add_argument("--store", default="data/cache/eval_results.sqlite")
+    ap.add_argument("--no_store", action="store_true", help="do not write ROUGE cells to the evaluation store")
+    ap.add_argument("--out_dir", default="pipeline_out")
+    ap.add_argument("--report_s", type=float, default=5)
+    args = ap.parse_args()
+
+    labels = args.labels or [family_label(m) for m in args.models]
+    if len(labels) != len(args.models) or len(set(labels)) != len(labels):
+        sys.exit("[error] --labels needs one distinct label per model")
+    if args.sequential:
+        args.queue_size = 0  # each stage's whole output waits on disk / in memory, as between scripts
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # workers start on demand, after the stage threads and models exist, so spawn rather than fork
+    pool = ProcessPoolExecutor(max_workers=args.extract_workers, mp_context=mp.get_context("spawn"))
+
+    import collect_arxiv as ca
+    args.query = args.query or ca.QUERY
+    server, base_url, pdf_dir = None, None, ca.PDF_DIR
+    if args.fixture:
+        from fixture_pdf_server import serve, write_fixture_pdfs
+        served = out_dir / "fixture_pdfs"
+        n = write_fixture_pdfs(itertools.islice(iter_records(args.fixture), args.limit), served)
+        server, _ = serve(0, served, None, latency_ms=args.pdf_latency_ms, background=True)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        pdf_dir = out_dir / "pdfs"  # fixture PDFs never mix with the collector's real ones
+        pdf_dir.mkdir(exist_ok=True)
+        print(f"[fixture] {args.fixture}: {n} new PDFs, served from {base_url} (latency {args.pdf_latency_ms}ms)")
+
+    import torch
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    feed = feed_stage(args, pdf_dir, base_url)
+    download = download_stage(args)
+    extract = extract_stage(args, pool, out_dir)
+    device_lock = threading.Lock()
+    summarize = [summarize_stage(args, m, l, device, device_lock) for m, l in zip(args.models, labels)]
+    score = score_stage(args, labels, out_dir)
+    feed.feeds(download)
+    download.feeds(extract)
+    extract.feeds(*summarize)
+    for s in summarize:
+        s.feeds(score)
+    stages = [feed, download, extract, *summarize, score]
+
+    print(f"[start] {'sequential' if args.sequential else 'pipelined'} | models={dict(zip(labels, args.models))} | "
+          f"limit={args.limit} queue_size={args.queue_size or 'unbounded'} device={device}")
+    wall = run_stages(stages, args.sequential, args.report_s)
+    pool.shutdown()
+    if server:
+        server.shutdown()
+
+    report = pd.DataFrame([s.metrics(wall) for s in stages])
+    print("\n" + report.to_string(index=False))
+    report.to_csv(out_dir / "pipeline_metrics.csv", index=False, encoding="utf-8")
+    print(f"\n[done] {score.n_out} summaries scored for {extract.n_out} papers | first result {score.first_out or 0:.2f}s | "
+          f"wall {wall:.2f}s -> {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
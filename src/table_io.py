@@ -0,0 +1,27 @@
+"""
+Read the per-model tables written by df_build_and_save_15.py.
+Each table is saved as <name>.csv and <name>.parquet; read_table prefers the
+Parquet copy (memory-mapped, only the requested columns are decoded) and falls
+back to the CSV for tables built before the Parquet output existed.
+"""
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+def parquet_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".parquet"
+
+def read_table(path: str, columns=None) -> pd.DataFrame:
+    """path: the table's .csv name. columns: the ones needed; names missing
+    from the table are skipped (older runs lack the CPU instrumentation)."""
+    pq_path = parquet_path(path)
+    if os.path.exists(pq_path) and (not os.path.exists(path) or os.path.getmtime(pq_path) >= os.path.getmtime(path)):
+        if columns is not None:
+            names = set(pq.read_schema(pq_path).names)
+            columns = [c for c in columns if c in names]
+        return pq.read_table(pq_path, columns=columns, memory_map=True).to_pandas()
+    if columns is None:
+        return pd.read_csv(path)
+    wanted = set(columns)
+    return pd.read_csv(path, usecols=lambda c: c in wanted)
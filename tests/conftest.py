@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+# the scripts import their siblings by name, as when run from src/ and src/data_collection/
+SRC = Path(__file__).resolve().parents[1] / "src"
+sys.path[:0] = [str(SRC), str(SRC / "data_collection")]
+
+import random
+
+import pytest
+
+WORDS = [f"w{k}" for k in range(300)]
+
+
+def synthetic_paper(k: int, intro_words: int):
+    rnd = random.Random(k)
+    text = lambda n: " ".join(rnd.choice(WORDS) + ("." if i % 12 == 11 else "") for i in range(n))
+    return {"arxiv_id": f"2509.{k:05d}v1", "title": f"Paper {k}", "abstract": text(60),
+            "introduction": text(intro_words), "published": "2025-09-01 00:00:00+00:00", "categories": ["cs.LG"]}
+
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory):
+    """Three papers; the first introduction is longer than T5's 1024-token window."""
+    from record_io import write_records
+    path = tmp_path_factory.mktemp("corpus") / "papers.jsonl"
+    write_records(path, [synthetic_paper(0, 1400), synthetic_paper(1, 300), synthetic_paper(2, 200)])
+    return path
+
+
+@pytest.fixture(scope="session")
+def tiny_t5(corpus, tmp_path_factory):
+    """(target, draft) directories of a tiny random T5 pair (make_tiny_checkpoints.py)."""
+    import make_tiny_checkpoints
+    out = tmp_path_factory.mktemp("tiny")
+    mp = pytest.MonkeyPatch()
+    mp.setattr(sys, "argv", ["make_tiny_checkpoints.py", "--family", "t5", "--input", str(corpus),
+                             "--out_dir", str(out), "--d_model", "64", "--layers", "2"])
+    make_tiny_checkpoints.main()
+    mp.undo()
+    return out / "tiny-t5-target", out / "tiny-t5-draft"
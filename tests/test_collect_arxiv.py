@@ -0,0 +1,115 @@
+import datetime
+import gzip
+import importlib
+import json
+import re
+
+import arxiv
+import pytest
+
+from fixture_pdf_server import serve, write_fixture_pdfs
+from record_io import read_records
+
+UTC = datetime.timezone.utc
+T0 = datetime.datetime(2025, 9, 1, tzinfo=UTC)
+
+
+class Paper:
+    def __init__(self, k: int):
+        self.entry_id = f"http://arxiv.org/abs/2509.{k + 500:05d}v1"
+        self.title = f"Paper {k}"
+        self.summary = f"Abstract of paper {k}."
+        self.published = T0 - datetime.timedelta(hours=k)  # k < 0: newer than the first runs
+        self.categories = ["cs.LG"]
+        self.pdf_url = None
+
+    @property
+    def arxiv_id(self):
+        return self.entry_id.split("/")[-1]
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch):
+    """collect_arxiv with its files under tmp_path, an in-memory arXiv feed
+    (papers) and PDFs from fixture_pdf_server; returns (module, papers, run)."""
+    monkeypatch.chdir(tmp_path)  # the module creates its data dirs on import
+    ca = importlib.import_module("collect_arxiv")
+    proc = tmp_path / "processed"
+    proc.mkdir()
+    for name, path in {"PDF_DIR": tmp_path / "pdfs", "EXTRACT_DIR": tmp_path / "extracted",
+                       "PROC_DIR": proc, "OUT_PATH": proc / "corpus.jsonl",
+                       "CURSOR_PATH": proc / "cursor.json", "SEEN_PATH": proc / "seen.txt",
+                       "RETRY_PATH": proc / "retry.jsonl", "RETRY_DEAD_PATH": proc / "retry_dead.jsonl"}.items():
+        monkeypatch.setattr(ca, name, path)
+    ca.PDF_DIR.mkdir()
+    monkeypatch.setattr(ca, "API_DELAY_S", 0)
+    monkeypatch.setattr(ca, "PDF_RETRY_SLEEP", 0.01)
+    monkeypatch.setattr(ca.RateLimiter, "wait", lambda self: None)
+
+    papers = []
+
+    def results(self, search):
+        m = re.search(r"submittedDate:\[(\d+) TO (\d+)\]", search.query)
+        lo, hi = m.groups() if m else (ca.DATE_MIN, ca.DATE_MAX)
+        hits = [p for p in papers if lo <= ca.arxiv_date(str(p.published)) <= hi]
+        hits.sort(key=lambda p: p.published, reverse=search.sort_order == arxiv.SortOrder.Descending)
+        yield from hits
+
+    monkeypatch.setattr(arxiv.Client, "__init__", lambda self, **kw: None)
+    monkeypatch.setattr(arxiv.Client, "results", results)
+
+    def run(num_records: int, error_rate: float = 0.0):
+        write_fixture_pdfs([{"arxiv_id": p.arxiv_id, "title": p.title, "abstract": p.summary,
+                             "introduction": f"Introduction of {p.title}. " * 20} for p in papers],
+                           tmp_path / "served")
+        server, stats = serve(0, tmp_path / "served", None, error_rate=error_rate, background=True)
+        monkeypatch.setattr(ca, "PDF_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}")
+        monkeypatch.setattr(ca, "NUM_RECORDS", num_records)
+        try:
+            ca.main()
+        finally:
+            server.shutdown()
+        return stats
+
+    return ca, papers, run
+
+
+def corpus_ids(ca):
+    return [r["arxiv_id"] for r in read_records(ca.OUT_PATH)] if ca.OUT_PATH.exists() else []
+
+
+def test_incremental_runs_with_503s_leave_no_duplicates_or_gaps(collector, monkeypatch):
+    ca, papers, run = collector
+    monkeypatch.setattr(ca, "RETRY_MAX_RUNS", 100)
+    papers += [Paper(k) for k in range(20)]
+    for _ in range(3):
+        run(6, error_rate=0.5)
+    papers += [Paper(k) for k in range(-6, 0)]  # newer submissions between runs
+    for _ in range(10):
+        run(6)
+        if len(set(corpus_ids(ca))) == len(papers):
+            break
+
+    ids = corpus_ids(ca)
+    assert len(ids) == len(set(ids))
+    assert set(ids) == {p.arxiv_id for p in papers}
+    assert set(ca.SEEN_PATH.read_text().split()) == set(ids)
+    assert read_records(ca.RETRY_PATH) == []
+
+    cached = [json.loads(gzip.decompress(f.read_bytes())) for f in ca.EXTRACT_DIR.glob("*/*.json.gz")]
+    assert len(cached) == len(papers)
+    assert all(c["introduction"] and c["introduction"].strip() in c["text"] for c in cached)
+
+
+def test_downloads_failing_every_run_are_given_up(collector):
+    ca, papers, run = collector
+    papers += [Paper(k) for k in range(3)]
+    for _ in range(ca.RETRY_MAX_RUNS):
+        run(3, error_rate=1.0)
+    assert read_records(ca.RETRY_PATH) == []
+    assert sorted(e["record"]["arxiv_id"] for e in read_records(ca.RETRY_DEAD_PATH)) \
+        == sorted(p.arxiv_id for p in papers)
+
+    stats = run(3, error_rate=1.0)
+    assert stats["requests"] == 0  # neither the feed nor the retry list offers them again
+    assert corpus_ids(ca) == []
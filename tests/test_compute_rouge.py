@@ -0,0 +1,19 @@
+import pandas as pd
+
+from Compute_ROUGE_on_your_15 import rouge_per_paper
+
+
+def table(ids):
+    return pd.DataFrame({"arxiv_id": ids,
+                         "reference_abstract": [f"reference text of paper {i}" for i in ids],
+                         "generated_summary": [f"summary text of paper {i}" for i in ids]})
+
+
+def test_tables_with_different_papers_are_scored_on_the_common_ones():
+    tables = {"PEGASUS": table(["a", "b", "c", "d"]), "T5": table(["d", "b", "e"])}
+    per_paper = rouge_per_paper(tables, workers=1)
+
+    assert set(per_paper) == {"PEGASUS", "T5"}
+    for df in per_paper.values():
+        assert df["arxiv_id"].tolist() == ["b", "d"]  # first table's order
+        assert (df["rouge1_fmeasure"] > 0).all()
@@ -0,0 +1,25 @@
+from argparse import Namespace
+
+from profiling import profiled_first
+from run_summary_with_HF_model import make_batches
+
+
+def args(**kw):
+    return Namespace(**{"profile_batches": 2, "profile_sample": None, "profile_seed": 0,
+                        "batch_size": 2, "max_batch_tokens": 10**6, **kw})
+
+
+def test_profiled_batches_come_first_and_are_not_only_the_longest():
+    lengths = [10 * k for k in range(1, 21)]
+    batches = make_batches(lengths, 2, 10**6)
+
+    spread, n = profiled_first(lengths, batches, args(profile_batches=3))
+    assert n == 3
+    assert spread[:3] == [batches[0], batches[4], batches[9]]  # longest, middle, shortest
+    assert sorted(spread) == sorted(batches)
+
+    sampled, n = profiled_first(lengths, batches, args(profile_sample=5, profile_seed=7))
+    picked = sorted(i for b in sampled[:n] for i in b)
+    assert len(picked) == 5 and picked != list(range(15, 20))  # not just the five longest
+    assert sorted(i for b in sampled for i in b) == list(range(20))
+    assert profiled_first(lengths, batches, args(profile_sample=5, profile_seed=7)) == (sampled, n)
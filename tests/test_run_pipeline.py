@@ -0,0 +1,25 @@
+import sys
+
+import pandas as pd
+
+import run_pipeline
+from record_io import read_records
+
+
+def test_fixture_feed_through_tiny_model(tiny_t5, corpus, tmp_path, monkeypatch):
+    target, _ = tiny_t5
+    monkeypatch.chdir(tmp_path)  # collect_arxiv creates its data dirs under the working directory
+    out = tmp_path / "out"
+    monkeypatch.setattr(sys, "argv", ["run_pipeline.py", "--fixture", str(corpus), "--models", str(target),
+                                      "--limit", "3", "--no_store", "--no_cache", "--out_dir", str(out)])
+    run_pipeline.main()
+
+    assert len(read_records(out / "corpus.jsonl")) == 3
+    summaries = read_records(out / "t5_summaries.jsonl")
+    assert sorted(r["arxiv_id"] for r in summaries) == sorted(r["arxiv_id"] for r in read_records(corpus))
+    assert len(pd.read_csv(out / "scores.csv")) == 3
+
+    metrics = pd.read_csv(out / "pipeline_metrics.csv").set_index("stage")
+    assert list(metrics.index) == ["feed", "download", "extract", "summarize:T5", "score"]
+    assert (metrics["errors"] == 0).all()
+    assert metrics.loc["score", "items_out"] == 3
@@ -0,0 +1,88 @@
+import sys
+
+import pytest
+import torch
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+import run_summary_with_HF_model as rs
+from record_io import read_records
+
+
+def run_main(monkeypatch, tmp_path, model, output, *flags):
+    monkeypatch.setattr(sys, "argv", ["run_summary_with_HF_model.py", "--model_name", str(model),
+                                      "--input", str(tmp_path / "in.jsonl"), "--output", str(tmp_path / output),
+                                      "--cache_dir", str(tmp_path / "cache"), *flags])
+    rs.main()
+    return {r["arxiv_id"]: r for r in read_records(tmp_path / output)}
+
+
+def greedy(model_dir, rows):
+    tok = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_dir).eval()
+    max_inp, max_out = rs.pick_lengths(str(model_dir))
+    out = {}
+    for job in rs.prepare_jobs(rows, tok, str(model_dir), max_inp):
+        with torch.no_grad():
+            ids = model.generate(torch.tensor([job["input_ids"]]), max_new_tokens=max_out,
+                                 num_beams=1, no_repeat_ngram_size=3)
+        out[job["row"]["arxiv_id"]] = tok.decode(ids[0], skip_special_tokens=True)
+    return out
+
+
+def test_assisted_matches_greedy_and_cache_and_chunked_runs(tiny_t5, corpus, tmp_path, monkeypatch):
+    target, draft = tiny_t5
+    (tmp_path / "in.jsonl").write_bytes(corpus.read_bytes())
+    rows = read_records(corpus)
+
+    assisted = run_main(monkeypatch, tmp_path, target, "assisted.jsonl", "--assistant_model", str(draft))
+    expected = greedy(target, rows)
+    assert {a: r["generated_summary"] for a, r in assisted.items()} == expected
+    for r in assisted.values():
+        assert 0 <= r["acceptance_rate"] <= 1
+        assert r["speedup"] > 0
+        assert 1 <= r["verify_steps"] <= r["output_tokens"]
+
+    # a re-run is served from the cache: same records, nothing generated
+    rerun = run_main(monkeypatch, tmp_path, target, "assisted_again.jsonl", "--assistant_model", str(draft))
+    assert rerun == assisted
+
+    chunked = run_main(monkeypatch, tmp_path, target, "chunked.jsonl", "--chunked", "--reduce", "--batch_size", "4")
+    assert chunked["2509.00000v1"]["chunks"] == 2
+    assert chunked["2509.00000v1"]["reduce_jobs"] == 1  # two chunk summaries fit one window
+    assert {r["chunks"] for a, r in chunked.items() if a != "2509.00000v1"} == {1}
+    for r in chunked.values():
+        assert r["generated_summary"]
+        assert r["map_time_sec"] > 0 and r["reduce_time_sec"] >= 0
+
+
+def test_chunk_overlap_must_be_below_the_window(tiny_t5, corpus, tmp_path, monkeypatch):
+    target, _ = tiny_t5
+    (tmp_path / "in.jsonl").write_bytes(corpus.read_bytes())
+    with pytest.raises(SystemExit, match="--chunk_overlap"):
+        run_main(monkeypatch, tmp_path, target, "chunked.jsonl", "--chunked", "--chunk_overlap", "1024")
+    assert not (tmp_path / "chunked.jsonl").exists()
+
+
+def test_reduce_tree_fits_every_round_in_the_window(tiny_t5, monkeypatch):
+    tok = AutoTokenizer.from_pretrained(tiny_t5[0])
+    model_name, max_inp = str(tiny_t5[0]), 64
+    summary = lambda k: " ".join(f"w{k}" for _ in range(20))
+    papers = [{"idx": 0, "row": {"arxiv_id": "a"}, "chunks": list(range(9))},
+              {"idx": 1, "row": {"arxiv_id": "b"}, "chunks": [9]}]
+    chunk_recs = {c: {"generated_summary": summary(c)} for c in range(10)}
+
+    seen = []
+
+    def fake_generate(jobs, *run, tag):
+        seen.extend(len(j["input_ids"]) for j in jobs)
+        # a "summary" of ten words per job, so a round of n jobs leaves n texts
+        return {j["idx"]: {"generated_summary": " ".join(tok.decode(j["input_ids"], skip_special_tokens=True)
+                                                        .split()[1:11])} for j in jobs}, len(jobs)
+
+    monkeypatch.setattr(rs, "generate", fake_generate)
+    reduced, n = rs.reduce_tree(papers, chunk_recs, tok, model_name, max_inp, run=())
+    assert set(reduced) == {0}
+    assert n == len(reduced[0]) > 2  # nine chunk summaries do not fit one 64-token window
+    assert max(seen) <= max_inp
+    _, _, truncated = rs.prepare_reduce_jobs({0: [summary(0)] * 9}, {0: {}}, tok, model_name, max_inp)
+    assert truncated == 0
@@ -0,0 +1,18 @@
+from record_io import write_records
+from select_fixed25 import sample
+
+
+def paper(k: int, month: str = "2025-01"):
+    return {"arxiv_id": f"2501.{k:05d}", "abstract": "a", "introduction": "i", "published": month}
+
+
+def test_duplicate_ids_do_not_overfill_a_stratum(tmp_path):
+    src = tmp_path / "corpus.jsonl"
+    recs = [paper(k) for k in range(20)]
+    write_records(src, recs + recs[:5])  # 20 papers, 5 of them on two lines
+
+    picked, _ = sample(src, 25, seed=42)
+    assert sorted(r["arxiv_id"] for r in picked) == sorted(r["arxiv_id"] for r in recs)
+
+    picked, _ = sample(src, 25, seed=42, stratify="month")
+    assert len({r["arxiv_id"] for r in picked}) == len(picked) == 20
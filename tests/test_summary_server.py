@@ -0,0 +1,53 @@
+import threading
+import time
+from argparse import Namespace
+
+import summary_server as ss
+
+
+def lane(monkeypatch, summarize=None, **kw):
+    entry = {"name": "fake", "lock": threading.Lock(), "max_inp": 512, "model": None,
+             "tok": lambda text, **_: {"input_ids": [1] * len(text.split())}}
+    if summarize:
+        monkeypatch.setattr(ss, "summarize_batch", summarize)
+    args = Namespace(**{"batch_window_ms": 0, "max_batch": 1, "max_batch_tokens": 16384,
+                        "device": "cpu", "max_queue": 1, **kw})
+    return entry, ss.Lane(entry, {}, False, args)
+
+
+def wait_for(cond, timeout=5.0):
+    t0 = time.perf_counter()
+    while not cond():
+        assert time.perf_counter() - t0 < timeout
+        time.sleep(0.01)
+
+
+def test_full_lane_rejects_requests(monkeypatch):
+    entry, ln = lane(monkeypatch)
+    with entry["lock"]:  # the lane thread takes the first request and waits for the model
+        assert ln.submit(ss.Pending("a b", False))
+        wait_for(ln.queue.empty)
+        assert ln.submit(ss.Pending("c d", False))
+        assert not ln.submit(ss.Pending("e f", False))
+    assert ln.metrics.snapshot(0)["rejected"] == 1
+
+
+def test_failed_batch_only_errors_unanswered_requests(monkeypatch):
+    calls = []
+
+    def summarize(jobs, tok, model, kwargs, device):
+        calls.append(len(jobs))
+        if len(calls) > 1:
+            raise RuntimeError("out of memory")
+        for j in jobs:
+            yield j, "summary", {"input_tokens": 2, "output_tokens": 1}
+
+    # max_batch_tokens below two rows: both requests share a batch but run as two generate calls
+    _, ln = lane(monkeypatch, summarize, batch_window_ms=1000, max_batch=2, max_batch_tokens=3, max_queue=0)
+    first, second = ss.Pending("a b", False), ss.Pending("c d", False)
+    assert ln.submit(first) and ln.submit(second)
+    assert second.events.get(timeout=5)[0] == "error"
+    assert first.events.get(timeout=5)[0] == "done"
+    assert first.events.empty()
+    snap = ln.metrics.snapshot(0)
+    assert (snap["errors"], snap["requests"]) == (1, 1)
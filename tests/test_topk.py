@@ -0,0 +1,33 @@
+import hashlib
+import random
+
+import numpy as np
+
+from Compute_TopK_Cumulative_on_your_15 import paper_topk_mean, topk_means
+from embedding_store import EmbeddingStore
+
+
+class FakeEmbedder:
+    """Deterministic unit vectors per sentence, in place of the sentence-transformer."""
+
+    def encode(self, sentences, convert_to_numpy=True, normalize_embeddings=True):
+        vecs = np.stack([np.random.default_rng(int(hashlib.sha1(s.encode()).hexdigest()[:8], 16))
+                         .standard_normal(32) for s in sentences]).astype(np.float32)
+        return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def text(rnd, sentences):
+    return " ".join(f"Sentence {rnd.randrange(60)} about {rnd.randrange(60)}." for _ in range(sentences))
+
+
+def test_batched_topk_matches_per_paper_bit_for_bit(tmp_path):
+    rnd = random.Random(0)
+    refs = [text(rnd, rnd.randrange(0, 25)) for _ in range(300)]
+    gens = [text(rnd, rnd.randrange(0, 25)) for _ in range(300)]
+    store = EmbeddingStore("fake", FakeEmbedder, cache_root=tmp_path)
+
+    scores, m, n, k = topk_means(refs, gens, store)
+    for i, (ref, gen) in enumerate(zip(refs, gens)):
+        score, mm, nn, kk = paper_topk_mean(ref, gen, store)
+        assert (m[i], n[i], k[i]) == (mm, nn, kk)
+        assert np.float32(scores[i]) == np.float32(score), (i, kk)